@@ -1,85 +1,204 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 import uuid
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
 
+from .caching import TTLCache
 from .config import get_settings
-from .database import get_session
+from .database import get_async_session, get_session
+from .hashing import get_password_hasher
 from .models import User
 from .schemas import TokenPayload
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+# EventSource cannot set headers, so streaming endpoints also accept ?access_token=
+_optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_hasher().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_password_hasher().hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await get_password_hasher().verify_async(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await get_password_hasher().hash_async(password)
 
 
 def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
     settings = get_settings()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
     to_encode = {"sub": subject, "exp": expire}
+    from jose import jwt  # deferred: python-jose pulls in its crypto backends on import
+
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
 
-def authenticate_user(session: Session, email: str, password: str) -> User | None:
-    stmt = select(User).where(User.email == email)
-    user = session.scalar(stmt)
-    if not user:
-        return None
-    if not verify_password(password, user.password_hash):
-        return None
-    return user
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Immutable snapshot of the authenticated user, safe to share between requests."""
 
+    id: uuid.UUID
+    email: str
+    is_admin: bool
+    created_at: datetime
 
-def get_current_user(
-    session: Annotated[Session, Depends(get_session)],
-    token: Annotated[str, Depends(oauth2_scheme)],
-) -> User:
-    settings = get_settings()
-    credentials_exception = HTTPException(
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, email=user.email, is_admin=bool(user.is_admin), created_at=user.created_at)
+
+
+_settings = get_settings()
+# token -> Principal; entries never outlive the token's own exp claim
+_principal_cache: TTLCache[str, Principal] = TTLCache(
+    "principal", maxsize=_settings.principal_cache_size, ttl=_settings.principal_cache_ttl_seconds
+)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _decode_token(token: str) -> tuple[uuid.UUID, int | None]:
+    from jose import JWTError, jwt
+
+    settings = get_settings()
     try:
         payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
         token_data = TokenPayload(**payload)
     except JWTError as exc:  # pragma: no cover - we rethrow consistently
-        raise credentials_exception from exc
+        raise _credentials_exception() from exc
 
     if token_data.sub is None:
-        raise credentials_exception
+        raise _credentials_exception()
 
     try:
-        user_id = uuid.UUID(token_data.sub)
+        return uuid.UUID(token_data.sub), token_data.exp
     except (TypeError, ValueError) as exc:
-        raise credentials_exception from exc
+        raise _credentials_exception() from exc
 
-    stmt = select(User).where(User.id == user_id)
-    user = session.scalar(stmt)
+
+def _remember(token: str, expires_at: int | None, user: User | None) -> Principal:
     if user is None:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+    principal = Principal.from_user(user)
+    ttl = None if expires_at is None else expires_at - datetime.now(timezone.utc).timestamp()
+    _principal_cache.set(token, principal, ttl=ttl)
+    return principal
+
+
+def get_current_user(
+    session: Annotated[Session, Depends(get_session)],
+    token: Annotated[str, Depends(oauth2_scheme)],
+) -> Principal:
+    cached = _principal_cache.get(token)
+    if cached is not None:
+        return cached
+    user_id, expires_at = _decode_token(token)
+    stmt = select(User).where(User.id == user_id)
+    return _remember(token, expires_at, session.scalar(stmt))
 
 
-def get_current_active_user(current_user: Annotated[User, Depends(get_current_user)]) -> User:
+async def get_current_user_async(
+    session: Annotated["AsyncSession", Depends(get_async_session)],
+    token: Annotated[str, Depends(oauth2_scheme)],
+) -> Principal:
+    cached = _principal_cache.get(token)
+    if cached is not None:
+        return cached
+    user_id, expires_at = _decode_token(token)
+    stmt = select(User).where(User.id == user_id)
+    return _remember(token, expires_at, await session.scalar(stmt))
+
+
+def _stream_token(header_token: str | None, query_token: str | None) -> str:
+    token = header_token or query_token
+    if not token:
+        raise _credentials_exception()
+    return token
+
+
+def get_stream_user(
+    session: Annotated[Session, Depends(get_session)],
+    header_token: Annotated[str | None, Depends(_optional_oauth2_scheme)],
+    access_token: Annotated[str | None, Query()] = None,
+) -> Principal:
+    return get_current_user(session, _stream_token(header_token, access_token))
+
+
+async def get_stream_user_async(
+    session: Annotated["AsyncSession", Depends(get_async_session)],
+    header_token: Annotated[str | None, Depends(_optional_oauth2_scheme)],
+    access_token: Annotated[str | None, Query()] = None,
+) -> Principal:
+    return await get_current_user_async(session, _stream_token(header_token, access_token))
+
+
+def cached_principal(token: str) -> Principal | None:
+    """The principal a request with ``token`` already resolved on this worker, without a query."""
+    return _principal_cache.get(token)
+
+
+def invalidate_principal(user_id: uuid.UUID) -> None:
+    _principal_cache.discard_where(lambda principal: principal.id == user_id)
+
+
+# Users changed by a session are dropped from the cache once its transaction commits, not at
+# flush: until then other requests must keep seeing the committed user, and a rollback must
+# not cost them a lookup. This only reaches the worker that made the change; the others
+# serve the old principal for up to PRINCIPAL_CACHE_TTL_SECONDS.
+_CHANGED_USERS = "changed_user_ids"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _track_changed_user(mapper, connection, target: User) -> None:
+    # covers ORM deletes and is_admin/email edits; bulk UPDATE/DELETE statements bypass
+    # these hooks and must call invalidate_principal themselves
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_USERS, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    for user_id in session.info.pop(_CHANGED_USERS, ()):
+        invalidate_principal(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop(_CHANGED_USERS, None)
+
+
+def get_current_active_user(current_user: Annotated[Principal, Depends(get_current_user)]) -> Principal:
     return current_user
 
 
-def get_current_admin(current_user: Annotated[User, Depends(get_current_user)]) -> User:
+def get_current_admin(current_user: Annotated[Principal, Depends(get_current_user)]) -> Principal:
     if not current_user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
     return current_user
+
+
+def get_current_admin_async(current_user: Annotated[Principal, Depends(get_current_user_async)]) -> Principal:
+    return get_current_admin(current_user)
@@ -0,0 +1,117 @@
+"""Small in-process TTL + LRU cache shared by the hot-path caches.
+
+Every cache registers itself by name so tests can reset them all and ``/admin/stats`` (and the
+metrics endpoint) can report hit/miss counters without knowing who owns which cache.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+
+from . import metrics
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_registry: dict[str, "TTLCache"] = {}
+
+
+class TTLCache(Generic[K, V]):
+    def __init__(self, name: str, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _registry[name] = self
+
+    def get(self, key: K) -> V | None:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: K) -> V | None:
+        with self._lock:
+            item = self._data.pop(key, None)
+        return None if item is None else item[1]
+
+    def discard_where(self, predicate: Callable[[V], bool]) -> int:
+        """Drop every entry whose value matches; a linear scan meant for rare invalidations."""
+        with self._lock:
+            stale = [key for key, (_, value) in self._data.items() if predicate(value)]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def clear_all() -> None:
+    for cache in _registry.values():
+        cache.clear()
+
+
+def stats() -> dict[str, dict[str, int]]:
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+@metrics.register_collector
+def _cache_samples():
+    cache_stats = stats()
+    for field in ("hits", "misses", "evictions"):
+        yield metrics.Sample(
+            f"dropspot_cache_{field}_total",
+            "counter",
+            f"In-process cache {field}.",
+            [({"cache": name}, values[field]) for name, values in cache_stats.items()],
+        )
+    yield metrics.Sample(
+        "dropspot_cache_entries",
+        "gauge",
+        "Entries held by each in-process cache.",
+        [({"cache": name}, values["size"]) for name, values in cache_stats.items()],
+    )
+
+
+__all__ = ["TTLCache", "clear_all", "stats"]
@@ -0,0 +1,20 @@
+"""UTC time helpers shared by the services.
+
+SQLite hands ``DateTime(timezone=True)`` columns back naive, Postgres hands them back
+aware; ``ensure_aware`` lets the services compare either against ``utcnow()``.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def ensure_aware(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+__all__ = ["ensure_aware", "utcnow"]
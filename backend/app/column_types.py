@@ -0,0 +1,98 @@
+"""Compact column types for the hot tables.
+
+* ``GUID``: a native ``uuid`` on PostgreSQL and 16 raw bytes everywhere else. SQLAlchemy's
+  own ``UUID`` is 32 hex characters on SQLite, and the declared type gives the column
+  NUMERIC affinity, so ids that happen to be all digits come back as REAL.
+* ``ScaledDecimal``: a fixed-point number stored as an integer count of ``10**-places``.
+  Python sees a float. Ranking compares plain integers instead of Decimals.
+* ``StatusCode``: a string drawn from a fixed list, stored as its small-integer index.
+
+Each type converts in ``process_bind_param`` / ``process_result_value``, so queries,
+bulk inserts and keyset cursors keep using the Python values they always did.
+"""
+
+from __future__ import annotations
+
+import uuid
+from collections.abc import Sequence
+from decimal import Decimal
+
+from sqlalchemy import Integer, LargeBinary, SmallInteger
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+
+class GUID(TypeDecorator):
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        return value if dialect.name == "postgresql" else value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        return uuid.UUID(bytes=bytes(value))
+
+    @property
+    def python_type(self) -> type:
+        return uuid.UUID
+
+
+class ScaledDecimal(TypeDecorator):
+    impl = Integer
+    cache_ok = True
+
+    def __init__(self, places: int = 4) -> None:
+        super().__init__()
+        self.places = places
+        self._scale = 10**places
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int((Decimal(str(value)) * self._scale).to_integral_value())
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else value / self._scale
+
+    @property
+    def python_type(self) -> type:
+        return float
+
+
+class StatusCode(TypeDecorator):
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, names: Sequence[str]) -> None:
+        super().__init__()
+        self.names = tuple(names)
+        self._codes = {name: code for code, name in enumerate(self.names)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self._codes[value]
+        except KeyError:
+            raise ValueError(f"unknown status {value!r}; expected one of {', '.join(self.names)}") from None
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.names[value]
+
+    @property
+    def python_type(self) -> type:
+        return str
+
+
+__all__ = ["GUID", "ScaledDecimal", "StatusCode"]
@@ -1,23 +1,119 @@
 from functools import lru_cache
+from typing import Literal
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     environment: str = Field(default="development", validation_alias="ENVIRONMENT")
-    debug: bool = Field(default=True, validation_alias="DEBUG")
+    debug: bool = Field(default=False, validation_alias="DEBUG")
 
     # database
     database_url: str | None = Field(default=None, validation_alias="DATABASE_URL")
+    # log every statement; separate from DEBUG because it is far too noisy to leave on
+    database_echo: bool = Field(default=False, validation_alias="DATABASE_ECHO")
+    # comma-separated read replicas for the read-heavy routes, picked round-robin; a caller's
+    # reads stay on the primary for read_your_writes_seconds after they write
+    database_replica_urls: str | None = Field(default=None, validation_alias="DATABASE_REPLICA_URLS")
+    read_your_writes_seconds: float = Field(default=5.0, validation_alias="READ_YOUR_WRITES_SECONDS")
+    # pool profile for server databases (PostgreSQL); SQLite file databases use the size only
+    db_pool_size: int = Field(default=10, validation_alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=20, validation_alias="DB_MAX_OVERFLOW")
+    db_pool_timeout_seconds: float = Field(default=10.0, validation_alias="DB_POOL_TIMEOUT_SECONDS")
+    db_pool_pre_ping: bool = Field(default=True, validation_alias="DB_POOL_PRE_PING")
+    db_pool_recycle_seconds: int = Field(default=1_800, validation_alias="DB_POOL_RECYCLE_SECONDS")
+    # applied to every new SQLite connection; WAL lets readers run alongside the writer
+    sqlite_journal_mode: str = Field(default="wal", validation_alias="SQLITE_JOURNAL_MODE")
+    sqlite_synchronous: str = Field(default="normal", validation_alias="SQLITE_SYNCHRONOUS")
+    sqlite_busy_timeout_ms: int = Field(default=5_000, validation_alias="SQLITE_BUSY_TIMEOUT_MS")
+    sqlite_mmap_size: int = Field(default=256 * 1024 * 1024, validation_alias="SQLITE_MMAP_SIZE")
+    # negative values are KiB, as in PRAGMA cache_size
+    sqlite_cache_size: int = Field(default=-64_000, validation_alias="SQLITE_CACHE_SIZE")
+    # "async" serves the routers with AsyncSession on aiosqlite/asyncpg instead of the threadpool
+    database_mode: Literal["sync", "async"] = Field(default="sync", validation_alias="DATABASE_MODE")
+    # defaults to DATABASE_URL with the async driver swapped in
+    async_database_url: str | None = Field(default=None, validation_alias="ASYNC_DATABASE_URL")
+    # create_all when the app starts; unset means everywhere except ENVIRONMENT=production,
+    # where `alembic upgrade head` runs once before the workers are rolled
+    auto_create_schema: bool | None = Field(default=None, validation_alias="AUTO_CREATE_SCHEMA")
+
+    # group commit for waitlist joins: hold joins up to this long and insert them in one
+    # statement (0 disables); the batch is flushed early once max size joins are waiting
+    join_batch_window_ms: float = Field(default=0.0, validation_alias="JOIN_BATCH_WINDOW_MS")
+    join_batch_max_size: int = Field(default=500, validation_alias="JOIN_BATCH_MAX_SIZE")
+    # background thread that builds snapshots (issuing push claims) at claim_open_at and
+    # rewarms the catalog at each window transition; off by default, leaving it all to the first
+    # request. The heap is rebuilt from the drops table every resync to see other workers' edits
+    drop_scheduler_enabled: bool = Field(default=False, validation_alias="DROP_SCHEDULER_ENABLED")
+    drop_scheduler_resync_seconds: float = Field(default=30.0, validation_alias="DROP_SCHEDULER_RESYNC_SECONDS")
+    # also move a drop's waitlist entries to waitlist_archive as soon as claim_close_at passes
+    drop_scheduler_archive_on_close: bool = Field(default=False, validation_alias="DROP_SCHEDULER_ARCHIVE_ON_CLOSE")
+    # rows per transaction when moving closed drops' waitlist entries to waitlist_archive
+    archive_batch_size: int = Field(default=5_000, validation_alias="ARCHIVE_BATCH_SIZE")
+    # remaining-stock ledger consulted before a claim touches the database: "database" always
+    # asks the database; "shared_memory" shares sell-outs between the workers on one host
+    stock_ledger: Literal["database", "shared_memory"] = Field(default="database", validation_alias="STOCK_LEDGER")
+    # the name carries the slot layout version, so workers of an older release never share it
+    stock_ledger_segment: str = Field(default="dropspot-stock-v2", validation_alias="STOCK_LEDGER_SEGMENT")
+    stock_ledger_slots: int = Field(default=4096, validation_alias="STOCK_LEDGER_SLOTS")
+
+    # GET /drops/{id}/events: coalescing window for change bursts, and the periodic refresh
+    # that also catches changes committed by other worker processes
+    drop_events_debounce_ms: float = Field(default=100.0, validation_alias="DROP_EVENTS_DEBOUNCE_MS")
+    drop_events_resync_seconds: float = Field(default=15.0, validation_alias="DROP_EVENTS_RESYNC_SECONDS")
+    # hot /drops routes skip response_model re-validation and encode with orjson when installed
+    fast_json_responses: bool = Field(default=False, validation_alias="FAST_JSON_RESPONSES")
+    # Prometheus text endpoint at /metrics plus the per-request timing middleware. Off by
+    # default: the endpoint has no auth, so only expose it where the scraper alone can reach it
+    metrics_enabled: bool = Field(default=False, validation_alias="METRICS_ENABLED")
+    # admins profile single requests with an X-Profile header; the last PROFILER_KEEP are kept
+    # for GET /admin/profiles. Off by default: the middleware and routes are only installed when set
+    profiler_enabled: bool = Field(default=False, validation_alias="PROFILER_ENABLED")
+    profiler_interval_ms: float = Field(default=1.0, validation_alias="PROFILER_INTERVAL_MS")
+    profiler_keep: int = Field(default=50, validation_alias="PROFILER_KEEP")
+
+    # responses to join/leave/claim POSTs sent with an Idempotency-Key, replayed to retries
+    # (0 size disables); persisting them in the database lets every worker replay them
+    idempotency_cache_size: int = Field(default=10_000, validation_alias="IDEMPOTENCY_CACHE_SIZE")
+    idempotency_ttl_seconds: float = Field(default=3_600.0, validation_alias="IDEMPOTENCY_TTL_SECONDS")
+    idempotency_persist: bool = Field(default=False, validation_alias="IDEMPOTENCY_PERSIST")
+
+    # per-user sliding window over join/leave/claim: the count feeds rapid_actions in the
+    # priority score, and past max actions the request gets a 429 (0 = never reject)
+    rate_limit_window_seconds: float = Field(default=10.0, validation_alias="RATE_LIMIT_WINDOW_SECONDS")
+    rate_limit_max_actions: int = Field(default=30, validation_alias="RATE_LIMIT_MAX_ACTIONS")
+    action_tracker_max_users: int = Field(default=100_000, validation_alias="ACTION_TRACKER_MAX_USERS")
 
     # auth
     jwt_secret_key: str = Field(default="change-me", validation_alias="JWT_SECRET_KEY")
     jwt_algorithm: str = Field(default="HS256", validation_alias="JWT_ALGORITHM")
     access_token_expire_minutes: int = Field(default=60, validation_alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+    # token -> user snapshot cache for authenticated requests (0 size disables it). A committed
+    # user edit clears it on the worker that made it; other workers may serve the old user
+    # (e.g. a revoked admin) for up to the TTL
+    principal_cache_size: int = Field(default=10_000, validation_alias="PRINCIPAL_CACHE_SIZE")
+    principal_cache_ttl_seconds: float = Field(default=60.0, validation_alias="PRINCIPAL_CACHE_TTL_SECONDS")
+    # pre-serialized GET /drops and GET /drops/{id} bodies; the TTL bounds cross-worker staleness
+    catalog_cache_size: int = Field(default=1_024, validation_alias="CATALOG_CACHE_SIZE")
+    catalog_cache_ttl_seconds: float = Field(default=30.0, validation_alias="CATALOG_CACHE_TTL_SECONDS")
+    # bcrypt executor: 0 workers hashes in the request thread, >0 uses a process pool
+    password_hash_workers: int = Field(default=0, validation_alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_pending: int = Field(default=64, validation_alias="PASSWORD_HASH_MAX_PENDING")
 
     # seed inputs (optional env override)
     dropspot_seed: str | None = Field(default=None, validation_alias="DROPSPOT_SEED")
 
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in (self.database_replica_urls or "").split(",") if url.strip()]
+
+    @property
+    def create_schema_on_startup(self) -> bool:
+        if self.auto_create_schema is not None:
+            return self.auto_create_schema
+        return self.environment != "production"
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
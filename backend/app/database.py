@@ -1,33 +1,125 @@
-from collections.abc import Generator
+from __future__ import annotations
+
+import itertools
+import threading
+from collections.abc import AsyncGenerator, Generator
 from contextlib import contextmanager
+from typing import TYPE_CHECKING
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from starlette.requests import Request
+
+from . import metrics
+from .caching import TTLCache
+from .config import Settings, get_settings
 
-from .config import get_settings
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 
 Base = declarative_base()
 
-_settings = get_settings()
-_database_url = _settings.database_url or "sqlite:///./dropspot.db"
-_connect_args: dict[str, object] = {}
-if _database_url.startswith("sqlite"):
-    _connect_args["check_same_thread"] = False
+_DEFAULT_DATABASE_URL = "sqlite:///./dropspot.db"
 
-engine = create_engine(_database_url, echo=_settings.debug, future=True, connect_args=_connect_args)
 
+def database_url() -> str:
+    return get_settings().database_url or _DEFAULT_DATABASE_URL
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    return _is_sqlite(url) and (url.rstrip("/").endswith(":memory:") or url.split("://", 1)[-1] in ("", "/"))
+
+
+def sqlite_pragmas(settings: Settings) -> dict[str, object]:
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": settings.sqlite_cache_size,
+    }
 
-def get_engine():
-    return engine
 
+def _install_sqlite_pragmas(target: Engine, pragmas: dict[str, object]) -> None:
+    @event.listens_for(target, "connect")
+    def _set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
 
-SessionLocal = sessionmaker(bind=engine, class_=Session, autoflush=False, autocommit=False, future=True)
+
+def engine_options(url: str, settings: Settings | None = None) -> dict[str, object]:
+    """create_engine()/create_async_engine() keyword arguments for the configured profile."""
+    settings = settings or get_settings()
+    options: dict[str, object] = {"echo": settings.database_echo}
+    if _is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+        if not _is_sqlite_memory(url):
+            # a file database gets a QueuePool; there is no server to time out or drop it
+            options["pool_size"] = settings.db_pool_size
+            options["max_overflow"] = settings.db_max_overflow
+            options["pool_timeout"] = settings.db_pool_timeout_seconds
+        return options
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle_seconds,
+    )
+    return options
+
+
+def build_engine(url: str, settings: Settings | None = None, **overrides) -> Engine:
+    """Engine for ``url`` using the pool and SQLite profile from settings; ``overrides`` win."""
+    settings = settings or get_settings()
+    new_engine = create_engine(url, **{**engine_options(url, settings), **overrides})
+    if _is_sqlite(url):
+        _install_sqlite_pragmas(new_engine, sqlite_pragmas(settings))
+    return new_engine
+
+
+class _LazySessionmaker(sessionmaker):
+    """A sessionmaker that builds the engine on its first session rather than at import."""
+
+    def __call__(self, **local_kw) -> Session:
+        if "bind" not in self.kw:
+            get_engine()
+        return super().__call__(**local_kw)
+
+
+# Nothing touches the database at import: worker processes only pay for the engine (and
+# its driver import) when they first need a connection.
+engine: Engine | None = None
+_engine_lock = threading.Lock()
+SessionLocal = _LazySessionmaker(class_=Session, autoflush=False, autocommit=False, future=True)
+
+
+def get_engine() -> Engine:
+    global engine
+    if engine is None:
+        with _engine_lock:
+            if engine is None:
+                new_engine = build_engine(database_url())
+                metrics.instrument_pool(new_engine.pool)
+                SessionLocal.configure(bind=new_engine)
+                engine = new_engine
+    return engine
 
 
 def override_engine(new_engine) -> None:
     global engine, SessionLocal
     engine = new_engine
-    SessionLocal = sessionmaker(bind=engine, class_=Session, autoflush=False, autocommit=False, future=True)
+    metrics.instrument_pool(engine.pool)
+    SessionLocal = _LazySessionmaker(bind=engine, class_=Session, autoflush=False, autocommit=False, future=True)
 
 
 def get_session() -> Generator[Session, None, None]:
@@ -38,6 +130,161 @@ def get_session() -> Generator[Session, None, None]:
         session.close()
 
 
+# --- read replicas -------------------------------------------------------------------
+#
+# Read-heavy routes take get_read_session instead of get_session. With DATABASE_REPLICA_URLS
+# set, each such request gets a session on the next replica in turn; without it they use the
+# primary. Write routes depend on pin_reads_to_primary, which sends the caller's reads (keyed
+# by bearer token) to the primary for READ_YOUR_WRITES_SECONDS, so a user who just joined or
+# claimed sees that even while the replicas lag. Pins are per worker process, like the caches.
+
+read_engines: list[Engine] | None = None
+_read_sessions: list[sessionmaker] = []
+_read_counter = itertools.count()
+_MAX_PINNED_CALLERS = 100_000
+_pinned_callers: TTLCache[str, bool] | None = None
+
+
+def _session_factory(bind: Engine) -> sessionmaker:
+    return sessionmaker(bind=bind, class_=Session, autoflush=False, autocommit=False, future=True)
+
+
+def get_read_engines() -> list[Engine]:
+    """Engines for the configured replicas, built on first use; empty without replicas."""
+    if read_engines is None:
+        with _engine_lock:
+            if read_engines is None:
+                override_read_engines([build_engine(url) for url in get_settings().replica_urls])
+    return read_engines
+
+
+def override_read_engines(engines: list[Engine]) -> None:
+    global read_engines, _read_sessions
+    for replica in engines:
+        metrics.instrument_pool(replica.pool)
+    _read_sessions = [_session_factory(replica) for replica in engines]
+    read_engines = list(engines)
+
+
+def _pins() -> TTLCache[str, bool]:
+    global _pinned_callers
+    if _pinned_callers is None:
+        with _engine_lock:
+            if _pinned_callers is None:
+                ttl = get_settings().read_your_writes_seconds
+                _pinned_callers = TTLCache("read_your_writes", maxsize=_MAX_PINNED_CALLERS, ttl=ttl)
+    return _pinned_callers
+
+
+def _caller(request: Request) -> str | None:
+    return request.headers.get("authorization")
+
+
+async def pin_reads_to_primary(request: Request) -> None:
+    """Dependency for write routes: the caller's next reads are served by the primary."""
+    caller = _caller(request)
+    if caller:
+        _pins().set(caller, True)
+
+
+def _pick(factories: list, primary, caller: str | None):
+    if not factories or (caller is not None and _pins().get(caller)):
+        return primary
+    return factories[next(_read_counter) % len(factories)]
+
+
+def get_read_session(request: Request) -> Generator[Session, None, None]:
+    get_read_engines()
+    session = _pick(_read_sessions, SessionLocal, _caller(request))()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+# Sync URL scheme -> async driver. Only imported/constructed when async mode is used, so
+# the sync deployment does not need greenlet, aiosqlite or asyncpg installed.
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+async_engine: AsyncEngine | None = None
+AsyncSessionLocal: async_sessionmaker[AsyncSession] | None = None
+
+
+def to_async_url(url: str) -> str:
+    scheme, separator, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+
+def _build_async_engine(url: str, settings: Settings) -> AsyncEngine:
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    new_engine = create_async_engine(url, **engine_options(url, settings))
+    if _is_sqlite(url):
+        _install_sqlite_pragmas(new_engine.sync_engine, sqlite_pragmas(settings))
+    return new_engine
+
+
+def get_async_engine() -> AsyncEngine:
+    if async_engine is None:
+        settings = get_settings()
+        url = settings.async_database_url or to_async_url(database_url())
+        override_async_engine(_build_async_engine(url, settings))
+    return async_engine
+
+
+def override_async_engine(new_engine: AsyncEngine) -> None:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    global async_engine, AsyncSessionLocal
+    async_engine = new_engine
+    metrics.instrument_pool(new_engine.sync_engine.pool)
+    # expire_on_commit=False: routes serialize ORM objects after commit, outside the greenlet
+    # where a lazy refresh would be allowed to do IO
+    AsyncSessionLocal = async_sessionmaker(bind=new_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    get_async_engine()
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async_read_engines: list[AsyncEngine] | None = None
+_async_read_sessions: list[async_sessionmaker[AsyncSession]] = []
+
+
+def get_async_read_engines() -> list[AsyncEngine]:
+    if async_read_engines is None:
+        settings = get_settings()
+        override_async_read_engines([_build_async_engine(to_async_url(url), settings) for url in settings.replica_urls])
+    return async_read_engines
+
+
+def override_async_read_engines(engines: list[AsyncEngine]) -> None:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    global async_read_engines, _async_read_sessions
+    for replica in engines:
+        metrics.instrument_pool(replica.sync_engine.pool)
+    _async_read_sessions = [
+        async_sessionmaker(bind=replica, autoflush=False, expire_on_commit=False) for replica in engines
+    ]
+    async_read_engines = list(engines)
+
+
+async def get_async_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    get_async_engine()
+    get_async_read_engines()
+    async with _pick(_async_read_sessions, AsyncSessionLocal, _caller(request))() as session:
+        yield session
+
+
 @contextmanager
 def session_scope() -> Generator[Session, None, None]:
     session = SessionLocal()
@@ -52,7 +299,7 @@ def session_scope() -> Generator[Session, None, None]:
 
 
 def init_db() -> None:
+    """``create_all`` for development and tests; deployments run ``alembic upgrade head``."""
     from . import models  # noqa: F401
 
-    engine = get_engine()
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
@@ -1,15 +1,113 @@
-from typing import Annotated
+"""Route wiring shared by both ``DATABASE_MODE``s.
+
+The routers are written once, as ``async def`` handlers that take a :class:`Db` and pass it
+sync functions of the form ``fn(session, *args)``. Only the dependencies behind a
+:class:`RouteDeps` differ between modes: in ``sync`` mode ``Db.run`` calls the function
+with a ``Session`` in the threadpool, in ``async`` mode it goes through
+``AsyncSession.run_sync``, so the ORM code in the services exists once either way.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, TypeVar
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from .database import get_session
+from . import auth as auth_service
+from . import ratelimit
+from .database import get_async_read_session, get_async_session, get_read_session, get_session
 from .models import Drop
 
+if TYPE_CHECKING:
+    # only the async mode loads it (see database.py), so the sync cold start skips it
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+
+class Db:
+    """One request's session, whichever mode opened it."""
+
+    is_async = False
+
+    def __init__(self, session: Session | AsyncSession) -> None:
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def close(self) -> None:
+        self.session.close()
+
+
+class AsyncDb(Db):
+    is_async = True
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await self.session.run_sync(fn, *args, **kwargs)
+
+    async def close(self) -> None:
+        await self.session.close()
+
+
+# async def so that wrapping the session costs no threadpool hop
+async def get_db(session: Session = Depends(get_session)) -> Db:
+    return Db(session)
 
-def get_drop(drop_id: UUID, session: Annotated[Session, Depends(get_session)]) -> Drop:
+
+async def get_read_db(session: Session = Depends(get_read_session)) -> Db:
+    return Db(session)
+
+
+async def get_async_db(session: AsyncSession = Depends(get_async_session)) -> Db:
+    return AsyncDb(session)
+
+
+async def get_async_read_db(session: AsyncSession = Depends(get_async_read_session)) -> Db:
+    return AsyncDb(session)
+
+
+@dataclass(frozen=True)
+class RouteDeps:
+    db: Callable[..., Any]
+    read_db: Callable[..., Any]
+    current_user: Callable[..., Any]
+    stream_user: Callable[..., Any]
+    admin: Callable[..., Any]
+    waitlist_action: Callable[[str], Callable[..., Any]]
+
+
+SYNC = RouteDeps(
+    db=get_db,
+    read_db=get_read_db,
+    current_user=auth_service.get_current_active_user,
+    stream_user=auth_service.get_stream_user,
+    admin=auth_service.get_current_admin,
+    waitlist_action=ratelimit.waitlist_action,
+)
+
+ASYNC = RouteDeps(
+    db=get_async_db,
+    read_db=get_async_read_db,
+    current_user=auth_service.get_current_user_async,
+    stream_user=auth_service.get_stream_user_async,
+    admin=auth_service.get_current_admin_async,
+    waitlist_action=ratelimit.waitlist_action_async,
+)
+
+
+def route_deps(database_mode: str) -> RouteDeps:
+    return ASYNC if database_mode == "async" else SYNC
+
+
+def get_drop_or_404(session: Session, drop_id: UUID) -> Drop:
     drop = session.get(Drop, drop_id)
     if not drop:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Drop not found")
     return drop
+
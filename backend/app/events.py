@@ -0,0 +1,294 @@
+"""Live drop state for ``GET /drops/{id}/events`` (Server-Sent Events).
+
+Every watcher of a drop shares one publisher. The waitlist and admin code call
+``publish(drop_id)`` after a join, leave, claim or edit commits. The publisher then waits
+``DROP_EVENTS_DEBOUNCE_MS`` so a burst collapses into one refresh, and loads the drop and
+every watcher's entry in a single query. So the database sees at most one query per
+drop per debounce window, however many clients are connected. Once the claim window opens,
+ranks and eligibility are read from the allocation snapshot. Before that they are the
+watcher's live position in the waitlist, which later joins can still move.
+
+Each watcher keeps only the latest payload. A slow client skips intermediate states and
+is never handed a backlog.
+
+Claim-window transitions are timed, so the publisher also re-arms itself at the next
+``claim_open_at`` / ``claim_close_at``. It refreshes every ``DROP_EVENTS_RESYNC_SECONDS``
+as well, which picks up changes committed by other worker processes: ``publish`` only
+reaches watchers connected to the same process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import uuid
+from collections.abc import Callable, Iterable
+from datetime import datetime
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .clock import ensure_aware, utcnow
+from .config import get_settings
+from .models import Allocation, Drop, WaitlistEntry
+from .services import allocation as allocation_service
+from .singleton import Singleton
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_SECONDS = 15.0
+_IN_CHUNK = 500
+
+
+def _claim_window(now: datetime, opens: datetime, closes: datetime) -> str:
+    if now < opens:
+        return "upcoming"
+    return "open" if now <= closes else "closed"
+
+
+def format_event(event: str, payload: dict[str, object]) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+class Subscriber:
+    __slots__ = ("drop_id", "user_id", "latest", "changed")
+
+    def __init__(self, drop_id: uuid.UUID, user_id: uuid.UUID) -> None:
+        self.drop_id = drop_id
+        self.user_id = user_id
+        self.latest: dict[str, object] | None = None
+        self.changed = asyncio.Event()
+
+    def push(self, payload: dict[str, object]) -> None:
+        if payload != self.latest:
+            self.latest = payload
+            self.changed.set()
+
+    async def next(self, timeout: float | None = None) -> dict[str, object] | None:
+        """The next changed state, or None if nothing changed within ``timeout``."""
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout)
+        except TimeoutError:
+            return None
+        self.changed.clear()
+        return self.latest
+
+
+class _Channel:
+    __slots__ = ("drop_id", "subscribers", "dirty", "task", "timers")
+
+    def __init__(self, drop_id: uuid.UUID) -> None:
+        self.drop_id = drop_id
+        self.subscribers: set[Subscriber] = set()
+        self.dirty = False
+        self.task: asyncio.Task | None = None
+        self.timers: list[asyncio.TimerHandle] = []
+
+    def cancel_timers(self) -> None:
+        for timer in self.timers:
+            timer.cancel()
+        self.timers.clear()
+
+
+class DropEventBroker:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] | None = None,
+        *,
+        debounce_ms: float,
+        resync_seconds: float,
+    ) -> None:
+        self._session_factory = session_factory
+        self.debounce = debounce_ms / 1000
+        self.resync = resync_seconds
+        self._channels: dict[uuid.UUID, _Channel] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+        self.refreshes = 0
+
+    def _new_session(self) -> Session:
+        if self._session_factory is not None:
+            return self._session_factory()
+        from . import database
+
+        # late-bound so override_engine() is picked up
+        return database.SessionLocal()
+
+    # -- called from any thread ---------------------------------------------------------
+
+    def publish(self, drop_id: uuid.UUID) -> None:
+        """Schedule a refresh of ``drop_id`` for its watchers; a no-op when nobody watches."""
+        with self._lock:
+            loop = self._loop
+            watched = drop_id in self._channels
+        if loop is None or not watched or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._mark_dirty, drop_id)
+        except RuntimeError:  # loop shut down between the check and the call
+            pass
+
+    def watcher_count(self) -> int:
+        with self._lock:
+            return sum(len(channel.subscribers) for channel in self._channels.values())
+
+    # -- event loop only ----------------------------------------------------------------
+
+    async def subscribe(self, drop_id: uuid.UUID, user_id: uuid.UUID) -> Subscriber:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._loop is not loop:
+                # a new server loop (tests, reloads): channels of the old one are dead
+                self._channels.clear()
+                self._loop = loop
+            channel = self._channels.get(drop_id)
+            if channel is None:
+                channel = self._channels[drop_id] = _Channel(drop_id)
+            subscriber = Subscriber(drop_id, user_id)
+            channel.subscribers.add(subscriber)
+        self._mark_dirty(drop_id)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            channel = self._channels.get(subscriber.drop_id)
+            if channel is None:
+                return
+            channel.subscribers.discard(subscriber)
+            if channel.subscribers:
+                return
+            del self._channels[subscriber.drop_id]
+        channel.cancel_timers()
+        if channel.task is not None:
+            channel.task.cancel()
+
+    def _mark_dirty(self, drop_id: uuid.UUID) -> None:
+        channel = self._channels.get(drop_id)
+        if channel is None:
+            return
+        channel.dirty = True
+        if channel.task is None or channel.task.done():
+            channel.task = asyncio.get_running_loop().create_task(self._refresh(channel))
+
+    async def _refresh(self, channel: _Channel) -> None:
+        loop = asyncio.get_running_loop()
+        while channel.dirty and channel.subscribers:
+            await asyncio.sleep(self.debounce)
+            channel.dirty = False
+            watchers = list(channel.subscribers)
+            try:
+                states, next_boundary = await loop.run_in_executor(
+                    None, self._load, channel.drop_id, [s.user_id for s in watchers]
+                )
+            except Exception:
+                logger.exception("failed to refresh live state for drop %s", channel.drop_id)
+                states, next_boundary = None, None
+            self.refreshes += 1
+            if states is not None:
+                for subscriber in watchers:
+                    subscriber.push(states[subscriber.user_id])
+
+            channel.cancel_timers()
+            channel.timers.append(loop.call_later(self.resync, self._mark_dirty, channel.drop_id))
+            if next_boundary is not None:
+                channel.timers.append(loop.call_later(next_boundary, self._mark_dirty, channel.drop_id))
+
+    def _load(
+        self, drop_id: uuid.UUID, user_ids: Iterable[uuid.UUID]
+    ) -> tuple[dict[uuid.UUID, dict[str, object]] | None, float | None]:
+        user_ids = list(set(user_ids))
+        with self._new_session() as session:
+            drop = session.get(Drop, drop_id)
+            if drop is None:
+                gone = {"drop_id": str(drop_id), "status": "drop_deleted"}
+                return {user_id: gone for user_id in user_ids}, None
+
+            now = utcnow()
+            opens, closes = ensure_aware(drop.claim_open_at), ensure_aware(drop.claim_close_at)
+            base = {
+                "drop_id": str(drop_id),
+                "remaining_stock": max(drop.stock - drop.claimed_count, 0),
+                "claim_window": _claim_window(now, opens, closes),
+                "claim_open_at": opens.isoformat(),
+                "claim_close_at": closes.isoformat(),
+            }
+            ranks: dict[uuid.UUID, tuple[str, int | None, bool | None]] = {}
+            for start in range(0, len(user_ids), _IN_CHUNK):
+                ranks.update(self._ranks(session, drop, user_ids[start : start + _IN_CHUNK]))
+
+        states = {}
+        for user_id in user_ids:
+            status, rank, eligible = ranks.get(user_id, ("not_registered", None, None))
+            states[user_id] = {**base, "status": status, "rank": rank, "eligible": eligible}
+        upcoming = [boundary for boundary in (opens, closes) if boundary > now]
+        next_boundary = (min(upcoming) - now).total_seconds() + 0.05 if upcoming else None
+        return states, next_boundary
+
+    @staticmethod
+    def _ranks(
+        session: Session, drop: Drop, user_ids: list[uuid.UUID]
+    ) -> dict[uuid.UUID, tuple[str, int | None, bool | None]]:
+        if drop.allocation_built_at is not None:
+            stmt = (
+                select(Allocation.user_id, WaitlistEntry.status, Allocation.rank, Allocation.eligible)
+                .join(WaitlistEntry, WaitlistEntry.id == Allocation.entry_id)
+                .where(Allocation.drop_id == drop.id, Allocation.user_id.in_(user_ids))
+            )
+            return {user_id: (status, rank, eligible) for user_id, status, rank, eligible in session.execute(stmt)}
+
+        # before the snapshot the order is still moving: report where each watcher stands
+        # right now, ranked on the index within the same single query
+        stmt = select(WaitlistEntry.user_id, WaitlistEntry.status, allocation_service.live_rank()).where(
+            WaitlistEntry.drop_id == drop.id, WaitlistEntry.user_id.in_(user_ids)
+        )
+        return {
+            user_id: (status, rank, rank < drop.stock) for user_id, status, rank in session.execute(stmt)
+        }
+
+
+def _build_broker() -> DropEventBroker:
+    settings = get_settings()
+    return DropEventBroker(
+        debounce_ms=settings.drop_events_debounce_ms,
+        resync_seconds=settings.drop_events_resync_seconds,
+    )
+
+
+_broker: Singleton[DropEventBroker] = Singleton(_build_broker)
+
+
+def get_broker() -> DropEventBroker:
+    return _broker.get()
+
+
+def publish(drop_id: uuid.UUID) -> None:
+    broker = _broker.current()
+    if broker is not None:
+        broker.publish(drop_id)
+
+
+async def stream(broker: DropEventBroker, drop_id: uuid.UUID, user_id: uuid.UUID):
+    """SSE body for one watcher: a ``state`` event per change, comments as keepalives."""
+    subscriber = await broker.subscribe(drop_id, user_id)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            payload = await subscriber.next(timeout=KEEPALIVE_SECONDS)
+            yield ": keepalive\n\n" if payload is None else format_event("state", payload)
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+def streaming_response(drop_id: uuid.UUID, user_id: uuid.UUID) -> StreamingResponse:
+    return StreamingResponse(
+        stream(get_broker(), drop_id, user_id),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx would otherwise hold events back until its buffer fills
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+__all__ = ["DropEventBroker", "Subscriber", "format_event", "get_broker", "publish", "stream", "streaming_response"]
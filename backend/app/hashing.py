@@ -0,0 +1,174 @@
+"""Bounded executor for bcrypt hashing and verification.
+
+A bcrypt round costs ~250ms of CPU, so a login storm run inline starves every other
+request on the worker. ``PasswordHasher`` moves the work to a process pool
+(``PASSWORD_HASH_WORKERS``) and caps the number of submitted-but-unfinished jobs
+(``PASSWORD_HASH_MAX_PENDING``). Past the cap callers get an immediate 503 with
+``Retry-After`` instead of queueing unboundedly (``0`` disables the cap).
+``PASSWORD_HASH_WORKERS=0`` keeps hashing in-process but still applies the cap; sync callers
+hash in their own thread and async callers hand the work to the threadpool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import multiprocessing
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from . import metrics
+from .config import get_settings
+from .singleton import Singleton
+
+
+@functools.cache
+def _pwd_context():
+    # deferred: passlib resolves its bcrypt backend on import, which every worker (and every
+    # hashing subprocess) would otherwise pay for at startup
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    return _pwd_context().hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return _pwd_context().verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending) if max_pending > 0 else None
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the server process is multi-threaded by the time we get here
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _submit(self, fn: Callable[..., object], *args: str) -> Future:
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HTTPException(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        started = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+        try:
+            if self.workers > 0:
+                future = self._get_executor().submit(fn, *args)
+            else:
+                future = Future()
+                try:
+                    future.set_result(fn(*args))
+                except Exception as exc:
+                    future.set_exception(exc)
+        except BaseException:
+            self._finish(started)
+            raise
+        future.add_done_callback(lambda _: self._finish(started))
+        return future
+
+    def _finish(self, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+            self._latency_total += elapsed
+            self._latency_max = max(self._latency_max, elapsed)
+        if self._slots is not None:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._submit(_hash, password).result()
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._submit(_verify, plain_password, hashed_password).result()
+
+    async def hash_async(self, password: str) -> str:
+        if self.workers == 0:
+            # inline hashing would hold the event loop for the whole bcrypt round
+            return await run_in_threadpool(self.hash, password)
+        return await asyncio.wrap_future(self._submit(_hash, password))
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        if self.workers == 0:
+            return await run_in_threadpool(self.verify, plain_password, hashed_password)
+        return await asyncio.wrap_future(self._submit(_verify, plain_password, hashed_password))
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "queue_depth": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "latency_avg_ms": (self._latency_total / self._completed * 1000) if self._completed else 0.0,
+                "latency_max_ms": self._latency_max * 1000,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _build_hasher() -> PasswordHasher:
+    settings = get_settings()
+    return PasswordHasher(settings.password_hash_workers, settings.password_hash_max_pending)
+
+
+_hasher: Singleton[PasswordHasher] = Singleton(_build_hasher, close=PasswordHasher.shutdown)
+
+
+def get_password_hasher() -> PasswordHasher:
+    return _hasher.get()
+
+
+@metrics.register_collector
+def _hasher_samples():
+    stats = get_password_hasher().stats()
+    yield metrics.Sample(
+        "dropspot_password_hash_queue_depth",
+        "gauge",
+        "Password hashes submitted but not finished.",
+        [({}, stats["queue_depth"])],
+    )
+    yield metrics.Sample(
+        "dropspot_password_hash_rejected_total",
+        "counter",
+        "Password hashes refused with 503 because the queue was full.",
+        [({}, stats["rejected"])],
+    )
+
+
+def shutdown_password_hasher() -> None:
+    _hasher.shutdown()
+
+
+__all__ = ["PasswordHasher", "get_password_hasher", "shutdown_password_hasher"]
@@ -0,0 +1,235 @@
+"""``Idempotency-Key`` replay for the waitlist POSTs (join, leave, claim).
+
+Mobile clients retry these on timeouts. A request that carries an ``Idempotency-Key``
+header has its response recorded: status, headers and body bytes. A retry with the same
+key, from the same caller (``Authorization`` header) to the same path, gets exactly those
+bytes back. It skips routing, auth, the rate limiter and the waitlist services. A duplicate
+that arrives while the first request is still running waits for it and then replays its
+response, instead of running the query chain a second time.
+
+Responses are kept in a bounded in-process TTL cache (``IDEMPOTENCY_CACHE_SIZE``,
+``IDEMPOTENCY_TTL_SECONDS``). ``IDEMPOTENCY_PERSIST`` also writes them to the
+``idempotency_keys`` table, so a retry that lands on another worker, or arrives after a
+restart, is still replayed. Waiting on an in-flight duplicate only works within one
+process. Server errors (5xx) and 429s are not recorded: a retry of those runs again.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import metrics
+from .caching import TTLCache
+from .config import get_settings
+from .singleton import Singleton
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+_ROUTES = re.compile(r"^/drops/[^/]+/(join|leave|claim)$")
+_PURGE_INTERVAL_SECONDS = 60.0
+
+
+@dataclass(frozen=True, slots=True)
+class StoredResponse:
+    status: int
+    headers: tuple[tuple[bytes, bytes], ...]
+    body: bytes
+
+
+def _storable(status: int) -> bool:
+    return status < 500 and status != 429
+
+
+class IdempotencyStore:
+    """Recorded responses plus the keys whose first request is still running.
+
+    The middleware calls ``begin`` before running a request and ``finish`` after it;
+    ``lookup`` reads a recorded response without claiming the key.
+    """
+
+    def __init__(self, *, maxsize: int, ttl: float, persist: bool) -> None:
+        self.ttl = ttl
+        self.persist = persist
+        self._cache: TTLCache[str, StoredResponse] = TTLCache("idempotency", maxsize=maxsize, ttl=ttl)
+        self._inflight: dict[str, asyncio.Future[None]] = {}
+        self._last_purge = 0.0
+
+    @staticmethod
+    def key_for(scope: Scope, client_key: bytes) -> str:
+        caller = dict(scope["headers"]).get(b"authorization", b"")
+        digest = hashlib.sha256()
+        for part in (caller, scope["method"].encode(), scope["path"].encode(), client_key):
+            digest.update(len(part).to_bytes(4, "big") + part)
+        return digest.hexdigest()
+
+    async def lookup(self, key: str) -> StoredResponse | None:
+        stored = self._cache.get(key)
+        if stored is None and self.persist:
+            stored = await run_in_threadpool(self._load, key)
+            if stored is not None:
+                self._cache.set(key, stored)
+        return stored
+
+    async def begin(self, key: str) -> StoredResponse | None:
+        """The response to replay for ``key``, or None once the caller owns it and must ``finish`` it.
+
+        A duplicate of a request still in flight in this process waits for it first.
+        """
+        while True:
+            stored = await self.lookup(key)
+            pending = self._inflight.get(key)
+            if stored is None and pending is None:
+                # lookup() may have awaited a database read; finish() caches the response before
+                # the key is released, so this synchronous look closes that gap
+                stored = self._cache.get(key)
+            if stored is not None:
+                return stored
+            if pending is None:
+                self._inflight[key] = asyncio.get_running_loop().create_future()
+                return None
+            await asyncio.shield(pending)
+
+    async def finish(self, key: str, response: StoredResponse | None) -> None:
+        """Record ``response`` (None when it is not replayable) and wake duplicates waiting on ``key``."""
+        try:
+            if response is not None:
+                self._cache.set(key, response)
+                if self.persist:
+                    await run_in_threadpool(self._save, key, response)
+        finally:
+            self._inflight.pop(key).set_result(None)
+
+    def _load(self, key: str) -> StoredResponse | None:
+        from .database import SessionLocal
+        from .models import IdempotencyRecord
+
+        stmt = select(IdempotencyRecord).where(
+            IdempotencyRecord.key == key, IdempotencyRecord.expires_at > datetime.now(timezone.utc)
+        )
+        with SessionLocal() as session:
+            record = session.scalar(stmt)
+            if record is None:
+                return None
+            headers = json.loads(record.headers)
+            return StoredResponse(
+                record.status_code,
+                tuple((name.encode("latin-1"), value.encode("latin-1")) for name, value in headers),
+                record.body,
+            )
+
+    def _save(self, key: str, response: StoredResponse) -> None:
+        from .database import SessionLocal
+        from .models import IdempotencyRecord
+
+        now = datetime.now(timezone.utc)
+        headers = json.dumps([[name.decode("latin-1"), value.decode("latin-1")] for name, value in response.headers])
+        record = IdempotencyRecord(
+            key=key,
+            status_code=response.status,
+            headers=headers,
+            body=response.body,
+            expires_at=now + timedelta(seconds=self.ttl),
+        )
+        with SessionLocal() as session:
+            if time.monotonic() - self._last_purge > _PURGE_INTERVAL_SECONDS:
+                self._last_purge = time.monotonic()
+                session.execute(delete(IdempotencyRecord).where(IdempotencyRecord.expires_at <= now))
+            session.add(record)
+            try:
+                session.commit()
+            except IntegrityError:
+                # another worker ran the same request and stored first; both responses are valid
+                session.rollback()
+
+
+async def _replay(send: Send, stored: StoredResponse) -> None:
+    await send({"type": "http.response.start", "status": stored.status, "headers": list(stored.headers)})
+    await send({"type": "http.response.body", "body": stored.body})
+
+
+async def _reject(send: Send, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    await send({"type": "http.response.start", "status": 400, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        match = _ROUTES.match(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        client_key = dict(scope["headers"]).get(HEADER) if match else None
+        if client_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not client_key or len(client_key) > MAX_KEY_LENGTH:
+            await _reject(send, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+            return
+
+        store = get_idempotency_store()
+        key = store.key_for(scope, client_key)
+        action = match.group(1)
+        stored = await store.begin(key)
+        if stored is not None:
+            metrics.IDEMPOTENT_REPLAYS.inc(action=action)
+            await _replay(send, stored)
+            return
+
+        start: Message | None = None
+        chunks: list[bytes] = []
+        complete = False
+
+        async def capture(message: Message) -> None:
+            nonlocal start, complete
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                complete = not message.get("more_body", False)
+            await send(message)
+
+        response: StoredResponse | None = None
+        try:
+            await self.app(scope, receive, capture)
+            if start is not None and complete and _storable(start["status"]):
+                headers = tuple((bytes(name), bytes(value)) for name, value in start.get("headers", ()))
+                response = StoredResponse(start["status"], headers, b"".join(chunks))
+        finally:
+            await store.finish(key, response)
+
+
+def _build_store() -> IdempotencyStore:
+    settings = get_settings()
+    return IdempotencyStore(
+        maxsize=settings.idempotency_cache_size,
+        ttl=settings.idempotency_ttl_seconds,
+        persist=settings.idempotency_persist,
+    )
+
+
+_store: Singleton[IdempotencyStore] = Singleton(_build_store)
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    return _store.get()
+
+
+def enabled() -> bool:
+    settings = get_settings()
+    return settings.idempotency_cache_size > 0 or settings.idempotency_persist
+
+
+__all__ = ["IdempotencyMiddleware", "IdempotencyStore", "StoredResponse", "enabled", "get_idempotency_store"]
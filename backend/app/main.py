@@ -1,12 +1,36 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from . import caching, idempotency, metrics, profiling
+from .ratelimit import get_action_tracker
+from .config import get_settings
 from .database import init_db
-from .routers import admin, auth, drops
+from .deps import route_deps
+from .routers import admin, auth, drops, profiles
+from .hashing import get_password_hasher, shutdown_password_hasher
+from .services.join_buffer import get_join_buffer, shutdown_join_buffer
+from .services.drop_scheduler import get_drop_scheduler, shutdown_drop_scheduler, start_drop_scheduler
+from .services.stock_ledger import shutdown_stock_ledger, start_stock_ledger
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if get_settings().create_schema_on_startup:
+        init_db()
+    start_stock_ledger()
+    start_drop_scheduler()
+    yield
+    shutdown_drop_scheduler()
+    shutdown_stock_ledger()
+    shutdown_join_buffer()
+    shutdown_password_hasher()
 
 
 def create_application() -> FastAPI:
-    app = FastAPI(title="DropSpot API", version="0.1.0")
+    settings = get_settings()
+    app = FastAPI(title="DropSpot API", version="0.1.0", lifespan=lifespan)
 
     app.add_middleware(
             CORSMiddleware,
@@ -18,21 +42,44 @@ def create_application() -> FastAPI:
             allow_methods=["*"],
             allow_headers=["*"],
     )
+    if settings.profiler_enabled:
+        app.add_middleware(profiling.ProfilingMiddleware)
+    if idempotency.enabled():
+        app.add_middleware(idempotency.IdempotencyMiddleware)
+    if settings.metrics_enabled:
+        app.add_middleware(metrics.MetricsMiddleware)
 
-    app.include_router(auth.router)
-    app.include_router(drops.router)
-    app.include_router(admin.router)
+    deps = route_deps(settings.database_mode)
+    app.include_router(auth.create_router(deps))
+    app.include_router(drops.create_router(deps))
+    app.include_router(admin.create_router(deps))
+    if settings.profiler_enabled:
+        app.include_router(profiles.create_router(deps))
 
     @app.get("/health", tags=["system"])
     def health_check() -> dict[str, str]:
         return {"status": "ok"}
 
-    return app
+    # pool, cache and queue internals are operator detail, not part of the public liveness answer
+    @app.get("/admin/stats", tags=["admin"], dependencies=[Depends(deps.admin)])
+    def runtime_stats() -> dict[str, object]:
+        join_buffer = get_join_buffer()
+        scheduler = get_drop_scheduler()
+        return {
+            "password_hasher": get_password_hasher().stats(),
+            "caches": caching.stats(),
+            "join_buffer": join_buffer.stats() if join_buffer is not None else None,
+            "action_tracker": get_action_tracker().stats(),
+            "drop_scheduler": scheduler.stats() if scheduler is not None else None,
+        }
 
+    if settings.metrics_enabled:
 
-app = create_application()
+        @app.get("/metrics", tags=["system"], include_in_schema=False)
+        def metrics_endpoint() -> Response:
+            return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+    return app
 
 
-@app.on_event("startup")
-def on_startup() -> None:
-    init_db()
+app = create_application()
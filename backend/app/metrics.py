@@ -0,0 +1,373 @@
+"""Prometheus metrics, rendered in the text exposition format at ``GET /metrics``.
+
+Hand-rolled rather than pulling in ``prometheus_client``: the app needs a few counters and
+histograms, and the hot path is a lock plus a ``bisect`` per observation. That is cheap
+enough to leave on in production. ``METRICS_ENABLED`` is off by default, because the
+endpoint is unauthenticated; enable it where only the scraper can reach the workers.
+
+What is collected:
+
+* ``http_request_duration_seconds`` per method / route template / status,
+* SQL statements and SQL time per request, taken from the engine's
+  ``before/after_cursor_execute`` events and attributed to the request through a
+  context variable (the threadpool copies it into sync handlers),
+* the latency of every statement, and the time spent waiting for a pool connection,
+* domain counters for joins, claims, claim conflicts, rate-limited actions and idempotent
+  replays,
+* password hasher, cache, action tracker and join buffer stats, read when the endpoint is
+  scraped from collectors that their own modules register.
+
+Series are per process. Under several workers each one needs scraping, or the worker
+processes need to run under a multiprocess-aware collector.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from collections.abc import Callable, Iterable, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(labels[name] for name in self.labelnames), 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), *, buckets: Sequence[float]
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(labels[name] for name in self.labelnames))
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+@dataclass(slots=True)
+class Sample:
+    name: str
+    kind: str
+    documentation: str
+    values: Iterable[tuple[dict[str, str], float]]
+
+
+Collector = Callable[[], Iterable[Sample]]
+
+_metrics: list[_Metric] = []
+_collectors: list[Collector] = []
+
+
+def _register(metric: _Metric) -> _Metric:
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(collector: Collector) -> Collector:
+    """Add a callback whose samples are read fresh at every scrape."""
+    _collectors.append(collector)
+    return collector
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+HTTP_REQUEST_DURATION = _register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route template.",
+        ("method", "route", "status"),
+        buckets=LATENCY_BUCKETS,
+    )
+)
+REQUEST_SQL_STATEMENTS = _register(
+    Histogram(
+        "http_request_sql_statements",
+        "SQL statements executed while serving one request.",
+        ("method", "route"),
+        buckets=STATEMENT_COUNT_BUCKETS,
+    )
+)
+REQUEST_SQL_DURATION = _register(
+    Histogram(
+        "http_request_sql_duration_seconds",
+        "Total SQL time spent while serving one request.",
+        ("method", "route"),
+        buckets=LATENCY_BUCKETS,
+    )
+)
+SQL_STATEMENT_DURATION = _register(
+    Histogram(
+        "db_statement_duration_seconds",
+        "Latency of individual SQL statements by leading keyword.",
+        ("operation",),
+        buckets=SQL_BUCKETS,
+    )
+)
+POOL_CHECKOUT_WAIT = _register(
+    Histogram(
+        "db_pool_checkout_wait_seconds",
+        "Time spent waiting for a connection from the pool.",
+        buckets=SQL_BUCKETS,
+    )
+)
+WAITLIST_JOINS = _register(
+    Counter("dropspot_waitlist_joins_total", "Waitlist join requests by outcome.", ("result",))
+)
+CLAIMS = _register(Counter("dropspot_claims_total", "Successful claim requests by outcome.", ("result",)))
+CLAIM_CONFLICTS = _register(
+    Counter("dropspot_claim_conflicts_total", "Claims rejected with 409, by reason.", ("reason",))
+)
+RATE_LIMITED = _register(
+    Counter("dropspot_rate_limited_total", "Waitlist actions rejected with 429, by action.", ("action",))
+)
+IDEMPOTENT_REPLAYS = _register(
+    Counter("dropspot_idempotent_replays_total", "Responses replayed for a repeated Idempotency-Key.", ("action",))
+)
+PUSH_ALLOCATION_DURATION = _register(
+    Histogram(
+        "dropspot_push_allocation_seconds",
+        "Time to issue every claim of a push-mode drop at claim open.",
+        buckets=LATENCY_BUCKETS,
+    )
+)
+DROP_TRANSITION_DURATION = _register(
+    Histogram(
+        "dropspot_drop_transition_seconds",
+        "Time the drop scheduler spent on one window transition's hooks.",
+        ("transition",),
+        buckets=LATENCY_BUCKETS,
+    )
+)
+
+
+# --- SQL instrumentation -------------------------------------------------------------
+
+
+@dataclass(slots=True)
+class _RequestStats:
+    statements: int = 0
+    sql_seconds: float = 0.0
+
+
+_request_stats: ContextVar[_RequestStats | None] = ContextVar("dropspot_request_stats", default=None)
+
+
+def _operation(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"} else "OTHER"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["metrics_started"].pop()
+    elapsed = time.perf_counter() - started
+    SQL_STATEMENT_DURATION.observe(elapsed, operation=_operation(statement))
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context) -> None:
+    connection = context.connection
+    if connection is not None and connection.info.get("metrics_started"):
+        connection.info["metrics_started"].pop()
+
+
+def instrument_pool(pool) -> None:
+    """Time ``pool.connect()``; the pool has no event that fires before a checkout blocks."""
+    if getattr(pool, "_metrics_instrumented", False):
+        return
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+    pool._metrics_instrumented = True
+
+
+# --- HTTP middleware -----------------------------------------------------------------
+
+
+def _route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        # older Starlette does not put the matched route in the scope
+        for candidate in getattr(scope.get("app"), "routes", ()):
+            match, _ = candidate.matches(scope)
+            if match is Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = _RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            method, route = scope["method"], _route_template(scope)
+            if route != "/metrics":
+                HTTP_REQUEST_DURATION.observe(elapsed, method=method, route=route, status=str(status_code))
+                REQUEST_SQL_STATEMENTS.observe(stats.statements, method=method, route=route)
+                REQUEST_SQL_DURATION.observe(stats.sql_seconds, method=method, route=route)
+
+
+# --- exposition ----------------------------------------------------------------------
+
+
+def _render_sample(sample: Sample) -> list[str]:
+    lines = [f"# HELP {sample.name} {sample.documentation}", f"# TYPE {sample.name} {sample.kind}"]
+    for labels, value in sample.values:
+        lines.append(f"{sample.name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+    return lines
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        for sample in collector():
+            lines.extend(_render_sample(sample))
+    return "\n".join(lines) + "\n"
+
+
+__all__ = [
+    "CLAIMS",
+    "CLAIM_CONFLICTS",
+    "CONTENT_TYPE",
+    "Counter",
+    "DROP_TRANSITION_DURATION",
+    "Histogram",
+    "IDEMPOTENT_REPLAYS",
+    "MetricsMiddleware",
+    "PUSH_ALLOCATION_DURATION",
+    "RATE_LIMITED",
+    "Sample",
+    "WAITLIST_JOINS",
+    "instrument_pool",
+    "register_collector",
+    "render",
+]
@@ -1,17 +1,31 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, Numeric, String, Text, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from .column_types import GUID, ScaledDecimal, StatusCode
 from .database import Base
 
+# Waitlist statuses in storage order: the index is the value written to the status column.
+# Append new statuses; never reorder.
+WAITLIST_STATUSES = ("waiting", "claimed")
+
 
 class User(Base):
     __tablename__ = "users"
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(GUID(), primary_key=True, default=uuid.uuid4)
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=False)
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
     is_admin: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -24,7 +38,7 @@ class User(Base):
 class Drop(Base):
     __tablename__ = "drops"
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(GUID(), primary_key=True, default=uuid.uuid4)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     description: Mapped[str | None] = mapped_column(Text)
     stock: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -32,11 +46,20 @@ class Drop(Base):
     claim_open_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     claim_close_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     base_priority: Mapped[int] = mapped_column(Integer, default=0)
+    claimed_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # "claim": winners claim on demand; "push": claims are issued to the top-N at claim open
+    allocation_mode: Mapped[str] = mapped_column(
+        String(16), nullable=False, default="claim", server_default="claim"
+    )
+    allocation_built_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    # set once every waitlist entry of the closed drop has moved to waitlist_archive
+    archived_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
 
     waitlist_entries: Mapped[list["WaitlistEntry"]] = relationship(back_populates="drop", cascade="all, delete-orphan")
     claims: Mapped[list["Claim"]] = relationship(back_populates="drop", cascade="all, delete-orphan")
+    archived_entries: Mapped[list["WaitlistArchive"]] = relationship(cascade="all, delete-orphan")
 
 
 class WaitlistEntry(Base):
@@ -45,25 +68,69 @@ class WaitlistEntry(Base):
         UniqueConstraint("user_id", "drop_id", name="uq_waitlist_user_drop"),
     )
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(GUID(), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     drop_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("drops.id", ondelete="CASCADE"), nullable=False)
     joined_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, index=True)
-    priority_score: Mapped[float] = mapped_column(Numeric(10, 4), default=0)
-    status: Mapped[str] = mapped_column(String(50), default="waiting")
+    priority_score: Mapped[float] = mapped_column(ScaledDecimal(4), default=0)
+    status: Mapped[str] = mapped_column(StatusCode(WAITLIST_STATUSES), default="waiting")
 
     user: Mapped[User] = relationship(back_populates="waitlist_entries")
     drop: Mapped[Drop] = relationship(back_populates="waitlist_entries")
 
 
+# Matches the waitlist ordering (highest score first, earliest join breaks ties) so rank
+# queries become index-only range scans instead of filtering every entry of the drop.
+# The trailing id makes the order total, which the admin keyset pages rely on.
+Index(
+    "ix_waitlist_drop_rank",
+    WaitlistEntry.drop_id,
+    WaitlistEntry.priority_score.desc(),
+    WaitlistEntry.joined_at,
+    WaitlistEntry.id,
+)
+
+
+class WaitlistArchive(Base):
+    """Waitlist entries of closed drops, moved out of the hot table (see ``services.archive``).
+
+    One narrow row per (drop, user): no surrogate UUID, the same compact status and score
+    columns as ``waitlist_entries``, and the final rank from the allocation snapshot (NULL
+    when the drop never opened for claims). On SQLite the table is WITHOUT ROWID, so the
+    primary key is the table.
+    """
+
+    __tablename__ = "waitlist_archive"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    drop_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("drops.id", ondelete="CASCADE"), primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    rank: Mapped[int | None] = mapped_column(Integer)
+    status: Mapped[str] = mapped_column(StatusCode(WAITLIST_STATUSES), nullable=False)
+    priority_score: Mapped[float] = mapped_column(ScaledDecimal(4), nullable=False)
+    joined_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+# The order of the admin's archive pages (``roster.archive_page``), so each keyset page is a
+# range scan rather than a sort of the drop's whole archive.
+Index(
+    "ix_waitlist_archive_rank",
+    WaitlistArchive.drop_id,
+    WaitlistArchive.priority_score.desc(),
+    WaitlistArchive.joined_at,
+    WaitlistArchive.user_id,
+)
+
+
 class Claim(Base):
     __tablename__ = "claims"
     __table_args__ = (
         UniqueConstraint("drop_id", "user_id", name="uq_claim_drop_user"),
         UniqueConstraint("claim_code", name="uq_claim_code"),
+        Index("ix_claims_drop_claimed", "drop_id", "claimed_at", "id"),
     )
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(GUID(), primary_key=True, default=uuid.uuid4)
     drop_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("drops.id", ondelete="CASCADE"), nullable=False)
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     claim_code: Mapped[str] = mapped_column(String(32), nullable=False)
@@ -71,3 +138,31 @@ class Claim(Base):
 
     drop: Mapped[Drop] = relationship(back_populates="claims")
     user: Mapped[User] = relationship(back_populates="claims")
+
+
+class Allocation(Base):
+    """Waitlist order frozen when a drop's claim window opens (see ``services.allocation``)."""
+
+    __tablename__ = "drop_allocations"
+    __table_args__ = (
+        Index("ix_drop_allocations_rank", "drop_id", "rank"),
+    )
+
+    drop_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("drops.id", ondelete="CASCADE"), primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    entry_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("waitlist_entries.id", ondelete="CASCADE"), nullable=False)
+    rank: Mapped[int] = mapped_column(Integer, nullable=False)
+    eligible: Mapped[bool] = mapped_column(Boolean, nullable=False)
+
+
+class IdempotencyRecord(Base):
+    """A response kept for ``Idempotency-Key`` replays when ``IDEMPOTENCY_PERSIST`` is on."""
+
+    __tablename__ = "idempotency_keys"
+
+    # sha256 of the caller, route and client key; see app.idempotency
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    status_code: Mapped[int] = mapped_column(Integer, nullable=False)
+    headers: Mapped[str] = mapped_column(Text, nullable=False)
+    body: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
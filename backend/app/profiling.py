@@ -0,0 +1,275 @@
+"""Per-request profiles, triggered by admins with an ``X-Profile`` header.
+
+A request that carries ``X-Profile`` and an admin's bearer token is profiled. The admin
+check only reads the principal cache, so a header sent by anyone else never costs a
+database session. The flip side is that an admin's token must already be cached on this
+worker (any earlier authenticated request does that); until then the request runs
+unprofiled. Requests without the header only pay for a scan of the request headers.
+``PROFILER_ENABLED`` is off by default; when off the middleware is not installed.
+
+A profiled request gets a sampling thread. Every ``PROFILER_INTERVAL_MS`` it reads the
+stacks of the threads working on the request: the event loop thread, plus every
+threadpool thread that issues SQL for it (SQL is the moment a sync handler's thread shows
+itself). A threadpool thread is sampled from its first statement until the request ends,
+skipping the moments it sits idle; under concurrent load it can pick up another request's
+work in that window. Each SQL statement is recorded with its duration. The finished profile goes into
+a ring buffer of the last ``PROFILER_KEEP`` profiles, and the response carries its id in
+``X-Profile-Id``. ``GET /admin/profiles/{id}`` returns the samples as collapsed stacks
+(``frame;frame;frame count`` per line), the input format of ``flamegraph.pl``,
+speedscope and inferno.
+
+Samples of the event loop thread include time spent idle, waiting for the threadpool or
+the database, so they show wall-clock time rather than CPU time. Profiles live in the
+worker process that served the request.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import get_settings
+from .singleton import Singleton
+
+HEADER = b"x-profile"
+ID_HEADER = b"x-profile-id"
+# a request streaming for minutes (GET /drops/{id}/events) stops being sampled here
+MAX_SAMPLES = 100_000
+MAX_STATEMENTS = 1_000
+
+
+@dataclass(slots=True)
+class Statement:
+    sql: str
+    duration_ms: float
+
+
+@dataclass(slots=True)
+class Profile:
+    id: str
+    method: str
+    path: str
+    started_at: datetime
+    interval_ms: float
+    status: int | None = None
+    duration_ms: float = 0.0
+    samples: Counter[str] = field(default_factory=Counter)
+    statements: list[Statement] = field(default_factory=list)
+    threads: dict[int, str] = field(default_factory=dict)
+
+    def add_thread(self) -> None:
+        ident = threading.get_ident()
+        if ident not in self.threads:
+            self.threads[ident] = threading.current_thread().name
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def summary(self) -> dict[str, object]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "interval_ms": self.interval_ms,
+            "samples": sum(self.samples.values()),
+            "sql_ms": sum(statement.duration_ms for statement in self.statements),
+            "statements": [{"sql": s.sql, "duration_ms": s.duration_ms} for s in self.statements],
+        }
+
+
+_active: ContextVar[Profile | None] = ContextVar("dropspot_profile", default=None)
+
+
+_PATH_PREFIXES = sorted(
+    {
+        os.path.join(path, "")
+        for path in (*sysconfig.get_paths().values(), os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    },
+    key=len,
+    reverse=True,
+)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            filename = filename[len(prefix) :]
+            break
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+def _idle_worker(frame) -> bool:
+    # a threadpool thread parked on its job queue between requests
+    while frame is not None:
+        if frame.f_code.co_name == "get" and frame.f_code.co_filename.endswith("queue.py"):
+            return True
+        frame = frame.f_back
+    return False
+
+
+def _stack(frame, thread_name: str) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.append(f"thread:{thread_name}")
+    return ";".join(reversed(names))
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, profile: Profile) -> None:
+        super().__init__(name=f"profiler-{profile.id[:8]}", daemon=True)
+        self.profile = profile
+        self.loop_thread = threading.get_ident()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        interval = self.profile.interval_ms / 1000
+        samples = self.profile.samples
+        taken = 0
+        while not self._stopped.wait(interval) and taken < MAX_SAMPLES:
+            frames = sys._current_frames()
+            for ident, name in list(self.profile.threads.items()):
+                frame = frames.get(ident)
+                if frame is not None and (ident == self.loop_thread or not _idle_worker(frame)):
+                    samples[_stack(frame, name)] += 1
+                    taken += 1
+            del frames
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _active.get()
+    if profile is not None and context is not None:
+        profile.add_thread()
+        context._dropspot_profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _active.get()
+    started = getattr(context, "_dropspot_profile_started", None)
+    if profile is not None and started is not None and len(profile.statements) < MAX_STATEMENTS:
+        profile.statements.append(Statement(statement, (time.perf_counter() - started) * 1000))
+
+
+_listeners_lock = threading.Lock()
+
+
+def _install_listeners() -> None:
+    # only once the middleware exists, so PROFILER_ENABLED=false leaves the engine untouched
+    with _listeners_lock:
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfileStore:
+    """The last ``maxsize`` profiles, by id."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._profiles: OrderedDict[str, Profile] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.maxsize:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Profile | None:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> list[Profile]:
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+
+
+def _bearer_token(scope: Scope) -> str | None:
+    value = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = value.partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
+
+
+def _is_admin(token: str) -> bool:
+    from . import auth
+
+    principal = auth.cached_principal(token)
+    return principal is not None and principal.is_admin
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        _install_listeners()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not any(name == HEADER for name, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+        token = _bearer_token(scope)
+        if token is None or not _is_admin(token):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(
+            id=uuid.uuid4().hex,
+            method=scope["method"],
+            path=scope["path"],
+            started_at=datetime.now(timezone.utc),
+            interval_ms=get_settings().profiler_interval_ms,
+        )
+        profile.add_thread()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {**message, "headers": [*message.get("headers", ()), (ID_HEADER, profile.id.encode())]}
+            await send(message)
+
+        sampler = _Sampler(profile)
+        context_token = _active.set(profile)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            profile.duration_ms = (time.perf_counter() - started) * 1000
+            _active.reset(context_token)
+            get_profile_store().add(profile)
+
+
+_store: Singleton[ProfileStore] = Singleton(lambda: ProfileStore(get_settings().profiler_keep))
+
+
+def get_profile_store() -> ProfileStore:
+    return _store.get()
+
+
+__all__ = ["Profile", "ProfileStore", "ProfilingMiddleware", "Statement", "get_profile_store"]
@@ -0,0 +1,163 @@
+"""Per-user sliding-window counter for waitlist actions.
+
+Join, leave and claim requests are recorded here before the handler touches the database.
+The count serves two purposes:
+
+* ``rapid_actions`` in the priority score: the user's earlier actions inside the window
+  are passed to ``compute_priority_score``, so join/leave churn costs queue position,
+* a hard cap: past ``RATE_LIMIT_MAX_ACTIONS`` per ``RATE_LIMIT_WINDOW_SECONDS`` the request
+  gets a 429 with ``Retry-After`` and never reaches the database (``0`` disables the cap,
+  the counts still feed scoring).
+
+Each user keeps two fixed-window counters (the previous and the current window). The
+sliding count is the current one plus the previous one weighted by how much of it still
+overlaps the window: O(1) time and three numbers of state per user. Users are spread over
+lock-striped shards. Each shard is an LRU capped at ``ACTION_TRACKER_MAX_USERS / shards``
+entries, so a flood of new accounts evicts the quietest users rather than growing memory.
+
+Counts are per process, like the caches; with several workers a user gets the cap per
+worker.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+
+from fastapi import Depends, HTTPException, status
+
+from . import auth as auth_service
+from . import metrics
+from .auth import Principal
+from .config import get_settings
+from .singleton import Singleton
+
+
+class _Shard:
+    __slots__ = ("lock", "windows", "evictions")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # key -> [window index, previous window count, current window count]
+        self.windows: OrderedDict[Hashable, list[int]] = OrderedDict()
+        self.evictions = 0
+
+
+class ActionTracker:
+    def __init__(self, *, window_seconds: float, limit: int, max_keys: int, shards: int = 16) -> None:
+        self.window = window_seconds
+        self.limit = limit
+        self.shard_size = max(1, max_keys // shards)
+        self._shards = [_Shard() for _ in range(shards)]
+        self.limited = 0
+
+    def _shard(self, key: Hashable) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _estimate(self, state: list[int], now: float) -> float:
+        index, previous, current = state
+        now_index = int(now // self.window)
+        if now_index > index:
+            previous, current = (current if now_index == index + 1 else 0), 0
+        overlap = 1.0 - (now % self.window) / self.window
+        return previous * overlap + current
+
+    def record(self, key: Hashable, now: float | None = None) -> int:
+        """Count one action for ``key``; returns the sliding count including it."""
+        now = time.monotonic() if now is None else now
+        now_index = int(now // self.window)
+        shard = self._shard(key)
+        with shard.lock:
+            state = shard.windows.get(key)
+            if state is None:
+                state = shard.windows[key] = [now_index, 0, 0]
+                if len(shard.windows) > self.shard_size:
+                    shard.windows.popitem(last=False)
+                    shard.evictions += 1
+            else:
+                shard.windows.move_to_end(key)
+                if now_index > state[0]:
+                    state[1] = state[2] if now_index == state[0] + 1 else 0
+                    state[2] = 0
+                    state[0] = now_index
+            state[2] += 1
+            return math.ceil(self._estimate(state, now))
+
+    def count(self, key: Hashable, now: float | None = None) -> int:
+        now = time.monotonic() if now is None else now
+        shard = self._shard(key)
+        with shard.lock:
+            state = shard.windows.get(key)
+            return 0 if state is None else math.ceil(self._estimate(state, now))
+
+    def hit(self, key: Hashable, action: str) -> int:
+        """Record an action and enforce the cap; returns the user's earlier actions in the window."""
+        count = self.record(key)
+        if self.limit > 0 and count > self.limit:
+            self.limited += 1
+            metrics.RATE_LIMITED.inc(action=action)
+            raise HTTPException(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many waitlist actions, slow down",
+                headers={"Retry-After": str(max(1, math.ceil(self.window)))},
+            )
+        return count - 1
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.windows.clear()
+
+    def stats(self) -> dict[str, int]:
+        tracked = evictions = 0
+        for shard in self._shards:
+            with shard.lock:
+                tracked += len(shard.windows)
+                evictions += shard.evictions
+        return {"tracked": tracked, "evictions": evictions, "limited": self.limited}
+
+
+def _build_tracker() -> ActionTracker:
+    settings = get_settings()
+    return ActionTracker(
+        window_seconds=settings.rate_limit_window_seconds,
+        limit=settings.rate_limit_max_actions,
+        max_keys=settings.action_tracker_max_users,
+    )
+
+
+_tracker: Singleton[ActionTracker] = Singleton(_build_tracker)
+
+
+def get_action_tracker() -> ActionTracker:
+    return _tracker.get()
+
+
+@metrics.register_collector
+def _tracker_samples():
+    stats = get_action_tracker().stats()
+    yield metrics.Sample(
+        "dropspot_action_tracker_users", "gauge", "Users held by the action tracker.", [({}, stats["tracked"])]
+    )
+
+
+def waitlist_action(action: str):
+    """Dependency that records ``action`` for the caller; resolves to their earlier action count."""
+
+    def dependency(current_user: Principal = Depends(auth_service.get_current_active_user)) -> int:
+        return get_action_tracker().hit(current_user.id, action)
+
+    return dependency
+
+
+def waitlist_action_async(action: str):
+    async def dependency(current_user: Principal = Depends(auth_service.get_current_user_async)) -> int:
+        return get_action_tracker().hit(current_user.id, action)
+
+    return dependency
+
+
+__all__ = ["ActionTracker", "get_action_tracker", "waitlist_action", "waitlist_action_async"]
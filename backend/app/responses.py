@@ -0,0 +1,81 @@
+"""Opt-in fast JSON path for the hot ``/drops`` routes (``FAST_JSON_RESPONSES``).
+
+By default those routes return Pydantic models or dicts. FastAPI then validates them
+against ``response_model`` a second time, converts the result to JSON-compatible Python
+and encodes it with the stdlib ``json`` module. In fast mode the handlers build the payload
+as a plain dict from values they already trust and return a ``FastJSONResponse``, which
+FastAPI sends as is. The decorators keep their ``response_model``, so the OpenAPI schema
+does not change.
+
+``orjson`` is optional (``pip install .[fast]``). Without it the fast path still skips the
+re-validation and falls back to the stdlib encoder.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from .config import get_settings
+from .models import Drop
+from .schemas import DropRead
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        # same spelling as Pydantic: "Z" for UTC
+        return value.isoformat().replace("+00:00", "Z")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def enabled() -> bool:
+    return get_settings().fast_json_responses
+
+
+def respond(model: type[BaseModel], payload: dict[str, Any]) -> BaseModel | FastJSONResponse:
+    """``payload`` as ``model`` on the default path, or sent straight through in fast mode."""
+    return FastJSONResponse(payload) if enabled() else model(**payload)
+
+
+def respond_dict(payload: dict[str, Any]) -> dict[str, Any] | FastJSONResponse:
+    return FastJSONResponse(payload) if enabled() else payload
+
+
+# read off the schema, so a field added to DropRead is sent by the fast path too
+_DROP_FIELDS = tuple(DropRead.model_fields)
+
+
+def drop_payload(drop: Drop) -> dict[str, Any]:
+    """``DropRead`` fields of a loaded drop, without a validation pass."""
+    return {name: getattr(drop, name) for name in _DROP_FIELDS}
+
+
+__all__ = ["FastJSONResponse", "drop_payload", "dumps", "enabled", "respond", "respond_dict"]
@@ -1,52 +1,148 @@
+from dataclasses import asdict
+from typing import Literal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from .. import auth as auth_service
-from ..database import get_session
+from .. import events
+from ..database import pin_reads_to_primary
+from ..deps import Db, RouteDeps, get_drop_or_404
 from ..models import Drop
-from ..schemas import DropCreate, DropRead, DropUpdate
+from ..schemas import (
+    AdminArchivedPage,
+    AdminClaimPage,
+    AdminWaitlistPage,
+    ArchiveRun,
+    DropCreate,
+    DropRead,
+    DropUpdate,
+)
+from ..services import allocation as allocation_service
+from ..services import archive as archive_service
+from ..services import catalog, drop_scheduler, roster
+from ..services.stock_ledger import get_stock_ledger
 
-router = APIRouter(prefix="/admin/drops", tags=["admin"], dependencies=[Depends(auth_service.get_current_admin)])
 
-
-@router.get("", response_model=list[DropRead])
-def list_drops(session: Session = Depends(get_session)):
+def _list_drops(session: Session) -> list[Drop]:
     stmt = select(Drop).order_by(Drop.claim_open_at.desc())
-    return session.scalars(stmt).all()
+    return list(session.scalars(stmt).all())
 
 
-@router.post("", response_model=DropRead, status_code=status.HTTP_201_CREATED)
-def create_drop(payload: DropCreate, session: Session = Depends(get_session)):
+def _create_drop(session: Session, payload: DropCreate) -> Drop:
     drop = Drop(**payload.model_dump())
     session.add(drop)
     session.commit()
+    catalog.invalidate()
     session.refresh(drop)
+    drop_scheduler.reschedule(drop)
     return drop
 
 
-@router.put("/{drop_id}", response_model=DropRead)
-def update_drop(drop_id: UUID, payload: DropUpdate, session: Session = Depends(get_session)):
-    drop = session.get(Drop, drop_id)
-    if not drop:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Drop not found")
-
+def _update_drop(session: Session, drop_id: UUID, payload: DropUpdate) -> Drop:
+    drop = get_drop_or_404(session, drop_id)
     updates = payload.model_dump(exclude_unset=True)
     for key, value in updates.items():
         setattr(drop, key, value)
+    allocation_service.apply_drop_update(session, drop, set(updates))
     session.add(drop)
     session.commit()
+    catalog.invalidate()
+    if "stock" in updates:
+        get_stock_ledger().forget(drop.id)
+    events.publish(drop.id)
     session.refresh(drop)
+    drop_scheduler.reschedule(drop)
     return drop
 
 
-@router.delete("/{drop_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_drop(drop_id: UUID, session: Session = Depends(get_session)):
-    drop = session.get(Drop, drop_id)
-    if not drop:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Drop not found")
-    session.delete(drop)
+def _delete_drop(session: Session, drop_id: UUID) -> None:
+    session.delete(get_drop_or_404(session, drop_id))
     session.commit()
-    return None
+    catalog.invalidate()
+    get_stock_ledger().forget(drop_id)
+    drop_scheduler.unschedule(drop_id)
+    events.publish(drop_id)
+
+
+def create_router(deps: RouteDeps) -> APIRouter:
+    router = APIRouter(prefix="/admin/drops", tags=["admin"], dependencies=[Depends(deps.admin)])
+
+    @router.get("", response_model=list[DropRead])
+    async def list_drops(db: Db = Depends(deps.read_db)):
+        return await db.run(_list_drops)
+
+    @router.post(
+        "", response_model=DropRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(pin_reads_to_primary)]
+    )
+    async def create_drop(payload: DropCreate, db: Db = Depends(deps.db)):
+        return await db.run(_create_drop, payload)
+
+    @router.put("/{drop_id}", response_model=DropRead, dependencies=[Depends(pin_reads_to_primary)])
+    async def update_drop(drop_id: UUID, payload: DropUpdate, db: Db = Depends(deps.db)):
+        return await db.run(_update_drop, drop_id, payload)
+
+    @router.delete(
+        "/{drop_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(pin_reads_to_primary)]
+    )
+    async def delete_drop(drop_id: UUID, db: Db = Depends(deps.db)):
+        await db.run(_delete_drop, drop_id)
+        return None
+
+    @router.post("/archive", response_model=list[ArchiveRun], dependencies=[Depends(pin_reads_to_primary)])
+    async def archive_closed_drops(
+        batch_size: int | None = Query(None, ge=1, le=100_000),
+        db: Db = Depends(deps.db),
+    ):
+        """Move the waitlist entries of every closed drop into ``waitlist_archive``."""
+        reports = await db.run(archive_service.archive_closed_drops, batch_size=batch_size)
+        return [asdict(report) for report in reports]
+
+    @router.get("/{drop_id}/waitlist", response_model=AdminWaitlistPage)
+    async def list_waitlist(
+        drop_id: UUID,
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: str | None = None,
+        db: Db = Depends(deps.db),
+    ):
+        await db.run(get_drop_or_404, drop_id)
+        return await db.run(roster.waitlist_page, drop_id, limit=limit, cursor=cursor)
+
+    @router.get("/{drop_id}/claims", response_model=AdminClaimPage)
+    async def list_claims(
+        drop_id: UUID,
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: str | None = None,
+        db: Db = Depends(deps.db),
+    ):
+        await db.run(get_drop_or_404, drop_id)
+        return await db.run(roster.claims_page, drop_id, limit=limit, cursor=cursor)
+
+    @router.get("/{drop_id}/archive", response_model=AdminArchivedPage)
+    async def list_archived_waitlist(
+        drop_id: UUID,
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: str | None = None,
+        db: Db = Depends(deps.db),
+    ):
+        await db.run(get_drop_or_404, drop_id)
+        return await db.run(roster.archive_page, drop_id, limit=limit, cursor=cursor)
+
+    @router.get("/{drop_id}/{kind}/export", response_class=StreamingResponse)
+    async def export_roster(
+        drop_id: UUID,
+        kind: Literal["waitlist", "claims", "archive"],
+        format: roster.ExportFormat = "csv",
+        db: Db = Depends(deps.db),
+    ):
+        await db.run(get_drop_or_404, drop_id)
+        media_type, headers = roster.export_headers(kind, drop_id, format)
+        # the body outlives this handler, so it streams on the session itself rather than through db.run
+        export_rows = roster.export_rows_async if db.is_async else roster.export_rows
+        return StreamingResponse(
+            export_rows(db.session, kind, drop_id, format), media_type=media_type, headers=headers
+        )
+
+    return router
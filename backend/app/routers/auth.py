@@ -5,21 +5,16 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from .. import auth as auth_service
-from ..database import get_session
+from ..deps import Db, RouteDeps
 from ..models import User
 from ..schemas import Token, UserCreate, UserRead
 
-router = APIRouter(prefix="/auth", tags=["auth"])
 
+def _find_user(session: Session, email: str) -> User | None:
+    return session.scalar(select(User).where(User.email == email))
 
-@router.post("/signup", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def signup(payload: UserCreate, session: Session = Depends(get_session)):
-    stmt = select(User).where(User.email == payload.email)
-    existing = session.scalar(stmt)
-    if existing:
-        raise HTTPException(status.HTTP_409_CONFLICT, detail="Email already registered")
 
-    user = User(email=payload.email, password_hash=auth_service.get_password_hash(payload.password), is_admin=payload.is_admin)
+def _add_user(session: Session, user: User) -> User:
     session.add(user)
     try:
         session.commit()
@@ -30,15 +25,28 @@ def signup(payload: UserCreate, session: Session = Depends(get_session)):
     return user
 
 
-@router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
-    user = auth_service.authenticate_user(session, form_data.username, form_data.password)
-    if not user:
-        raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
-    access_token = auth_service.create_access_token(str(user.id))
-    return Token(access_token=access_token)
+def create_router(deps: RouteDeps) -> APIRouter:
+    router = APIRouter(prefix="/auth", tags=["auth"])
+
+    @router.post("/signup", response_model=UserRead, status_code=status.HTTP_201_CREATED)
+    async def signup(payload: UserCreate, db: Db = Depends(deps.db)):
+        if await db.run(_find_user, payload.email):
+            raise HTTPException(status.HTTP_409_CONFLICT, detail="Email already registered")
+
+        password_hash = await auth_service.get_password_hash_async(payload.password)
+        user = User(email=payload.email, password_hash=password_hash, is_admin=payload.is_admin)
+        return await db.run(_add_user, user)
+
+    @router.post("/login", response_model=Token)
+    async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Db = Depends(deps.db)):
+        user = await db.run(_find_user, form_data.username)
+        if not user or not await auth_service.verify_password_async(form_data.password, user.password_hash):
+            raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
+        access_token = auth_service.create_access_token(str(user.id))
+        return Token(access_token=access_token)
 
+    @router.get("/me", response_model=UserRead)
+    async def me(current_user: auth_service.Principal = Depends(deps.current_user)):
+        return current_user
 
-@router.get("/me", response_model=UserRead)
-def me(current_user: User = Depends(auth_service.get_current_active_user)):
-    return current_user
+    return router
@@ -1,94 +1,113 @@
-from datetime import datetime, timezone
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
 
-from .. import auth as auth_service
-from ..database import get_session
-from ..models import Drop, WaitlistEntry
+from .. import events, responses
+from ..database import pin_reads_to_primary
+from ..deps import Db, RouteDeps, get_drop_or_404
 from ..schemas import ClaimResponse, DropRead, JoinLeaveResponse
+from ..services import catalog
 from ..services import waitlist as waitlist_service
 
-router = APIRouter(prefix="/drops", tags=["drops"])
 
-
-def _now() -> datetime:
-    return datetime.now(timezone.utc)
-
-
-@router.get("", response_model=list[DropRead])
-def list_active_drops(session: Session = Depends(get_session)):
-    stmt = select(Drop).where(Drop.claim_close_at >= _now()).order_by(Drop.claim_open_at.asc())
-    drops = session.scalars(stmt).all()
-    return drops
-
-
-@router.get("/{drop_id}", response_model=DropRead)
-def get_drop(drop_id: UUID, session: Session = Depends(get_session)):
-    drop = session.get(Drop, drop_id)
-    if not drop:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Drop not found")
-    return drop
-
-
-@router.post("/{drop_id}/join", response_model=JoinLeaveResponse)
-def join_waitlist(
-    drop_id: UUID,
-    session: Session = Depends(get_session),
-    current_user=Depends(auth_service.get_current_active_user),
-):
-    drop = session.get(Drop, drop_id)
-    if not drop:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Drop not found")
-
-    entry, already = waitlist_service.join_waitlist(session, current_user, drop)
-    status_text = "already_joined" if already else "joined"
-    return JoinLeaveResponse(status=status_text, already_joined=already)
-
-
-@router.post("/{drop_id}/leave", response_model=JoinLeaveResponse)
-def leave_waitlist(
-    drop_id: UUID,
-    session: Session = Depends(get_session),
-    current_user=Depends(auth_service.get_current_active_user),
-):
-    drop = session.get(Drop, drop_id)
-    if not drop:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Drop not found")
-
-    removed = waitlist_service.leave_waitlist(session, current_user, drop)
-    status_text = "left" if removed else "not_in_waitlist"
-    return JoinLeaveResponse(status=status_text, already_joined=removed)
-
-
-@router.post("/{drop_id}/claim", response_model=ClaimResponse)
-def claim(
-    drop_id: UUID,
-    session: Session = Depends(get_session),
-    current_user=Depends(auth_service.get_current_active_user),
-):
-    drop = session.get(Drop, drop_id)
-    if not drop:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Drop not found")
-
-    claim_obj = waitlist_service.claim_drop(session, current_user, drop)
-    return ClaimResponse(claim_code=claim_obj.claim_code, claimed_at=claim_obj.claimed_at)
-
-
-@router.get("/{drop_id}/waitlist/me")
-def my_waitlist_status(
-    drop_id: UUID,
-    session: Session = Depends(get_session),
-    current_user=Depends(auth_service.get_current_active_user),
-):
-    stmt = select(WaitlistEntry).where(WaitlistEntry.user_id == current_user.id, WaitlistEntry.drop_id == drop_id)
-    entry = session.scalar(stmt)
-    if not entry:
-        return {"status": "not_registered"}
-    return {
-        "status": entry.status,
-        "priority_score": float(entry.priority_score),
-        "joined_at": entry.joined_at,
-    }
+def create_router(deps: RouteDeps) -> APIRouter:
+    router = APIRouter(prefix="/drops", tags=["drops"])
+
+    # The catalog is filled from the primary: a lagging replica's body would be cached for
+    # the full TTL, even right after an admin write on this worker cleared it. Hits open no
+    # connection, so the replicas only lose the occasional miss.
+    @router.get("", response_model=list[DropRead])
+    async def list_active_drops(
+        db: Db = Depends(deps.db),
+        if_none_match: str | None = Header(default=None),
+    ):
+        return catalog.to_response(await db.run(catalog.active_drops), if_none_match)
+
+    @router.get("/{drop_id}", response_model=DropRead)
+    async def get_drop(
+        drop_id: UUID,
+        db: Db = Depends(deps.db),
+        if_none_match: str | None = Header(default=None),
+    ):
+        entry = await db.run(catalog.drop_detail, drop_id)
+        if entry is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Drop not found")
+        return catalog.to_response(entry, if_none_match)
+
+    @router.post("/{drop_id}/join", response_model=JoinLeaveResponse, dependencies=[Depends(pin_reads_to_primary)])
+    async def join_waitlist(
+        drop_id: UUID,
+        db: Db = Depends(deps.db),
+        current_user=Depends(deps.current_user),
+        rapid_actions: int = Depends(deps.waitlist_action("join")),
+    ):
+        drop = await db.run(get_drop_or_404, drop_id)
+        entry = waitlist_service.new_entry(current_user, drop, rapid_actions=rapid_actions)
+        buffer = waitlist_service.buffered_join_available(drop)
+        if buffer is not None:
+            # awaited here rather than inside db.run, where it would hold a thread or the event loop
+            result = await buffer.join_async(entry)
+        else:
+            result = await db.run(waitlist_service.insert_entry, drop, entry)
+        entry, already = waitlist_service.record_join(result)
+        status_text = "already_joined" if already else "joined"
+        return responses.respond(JoinLeaveResponse, {"status": status_text, "already_joined": already})
+
+    @router.post(
+        "/{drop_id}/leave",
+        response_model=JoinLeaveResponse,
+        dependencies=[Depends(deps.waitlist_action("leave")), Depends(pin_reads_to_primary)],
+    )
+    async def leave_waitlist(
+        drop_id: UUID,
+        db: Db = Depends(deps.db),
+        current_user=Depends(deps.current_user),
+    ):
+        drop = await db.run(get_drop_or_404, drop_id)
+        removed = await db.run(waitlist_service.leave_waitlist, current_user, drop)
+        status_text = "left" if removed else "not_in_waitlist"
+        return responses.respond(JoinLeaveResponse, {"status": status_text, "already_joined": removed})
+
+    @router.post(
+        "/{drop_id}/claim",
+        response_model=ClaimResponse,
+        dependencies=[Depends(deps.waitlist_action("claim")), Depends(pin_reads_to_primary)],
+    )
+    async def claim(
+        drop_id: UUID,
+        db: Db = Depends(deps.db),
+        current_user=Depends(deps.current_user),
+    ):
+        claim_obj = await db.run(waitlist_service.claim_drop_by_id, current_user, drop_id)
+        return responses.respond(
+            ClaimResponse, {"claim_code": claim_obj.claim_code, "claimed_at": claim_obj.claimed_at}
+        )
+
+    @router.get("/{drop_id}/events", response_class=StreamingResponse)
+    async def drop_events(
+        drop_id: UUID,
+        db: Db = Depends(deps.db),
+        current_user=Depends(deps.stream_user),
+    ):
+        """Server-Sent Events with the caller's rank, remaining stock and claim window state."""
+        if await db.run(catalog.drop_detail, drop_id) is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Drop not found")
+        # hand the connection back now; the stream itself never touches this session
+        await db.close()
+        return events.streaming_response(drop_id, current_user.id)
+
+    @router.get("/{drop_id}/waitlist/me")
+    async def my_waitlist_status(
+        drop_id: UUID,
+        read_db: Db = Depends(deps.read_db),
+        db: Db = Depends(deps.db),
+        current_user=Depends(deps.current_user),
+    ):
+        payload = await read_db.run(waitlist_service.waitlist_status, current_user, drop_id, build_snapshot=False)
+        if payload is None:
+            # the claim window just opened: the snapshot is built (and read back) on the primary
+            payload = await db.run(waitlist_service.waitlist_status, current_user, drop_id)
+        return responses.respond_dict(payload)
+
+    return router
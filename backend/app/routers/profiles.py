@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from ..deps import RouteDeps
+from ..profiling import get_profile_store
+from ..schemas import ProfileSummary
+
+
+def create_router(deps: RouteDeps) -> APIRouter:
+    router = APIRouter(prefix="/admin/profiles", tags=["admin"], dependencies=[Depends(deps.admin)])
+
+    @router.get("", response_model=list[ProfileSummary])
+    async def list_profiles():
+        """Profiles kept by this worker, newest first, with the SQL each request issued."""
+        return [profile.summary() for profile in get_profile_store().list()]
+
+    @router.get("/{profile_id}", response_class=PlainTextResponse)
+    async def get_profile(profile_id: str):
+        """Collapsed stacks, ready for ``flamegraph.pl`` or speedscope."""
+        profile = get_profile_store().get(profile_id)
+        if profile is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Profile not found")
+        return PlainTextResponse(profile.collapsed())
+
+    return router
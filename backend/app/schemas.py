@@ -1,8 +1,11 @@
 from datetime import datetime
+from typing import Literal
 from uuid import UUID
 
 from pydantic import BaseModel, EmailStr, Field
 
+AllocationMode = Literal["claim", "push"]
+
 
 class Token(BaseModel):
     access_token: str
@@ -40,6 +43,7 @@ class DropBase(BaseModel):
 
 class DropCreate(DropBase):
     base_priority: int = 0
+    allocation_mode: AllocationMode = "claim"
 
 
 class DropUpdate(BaseModel):
@@ -50,11 +54,13 @@ class DropUpdate(BaseModel):
     claim_open_at: datetime | None = None
     claim_close_at: datetime | None = None
     base_priority: int | None = None
+    allocation_mode: AllocationMode | None = None
 
 
 class DropRead(DropBase):
     id: UUID
     base_priority: int
+    allocation_mode: AllocationMode
     created_at: datetime
     updated_at: datetime
 
@@ -76,6 +82,71 @@ class ClaimRead(BaseModel):
     claimed_at: datetime
 
 
+class AdminWaitlistEntry(BaseModel):
+    entry_id: UUID
+    user_id: UUID
+    email: str
+    priority_score: float
+    joined_at: datetime
+    status: str
+
+
+class AdminWaitlistPage(BaseModel):
+    items: list[AdminWaitlistEntry]
+    next_cursor: str | None = None
+
+
+class AdminClaim(BaseModel):
+    claim_id: UUID
+    user_id: UUID
+    email: str
+    claim_code: str
+    claimed_at: datetime
+
+
+class AdminClaimPage(BaseModel):
+    items: list[AdminClaim]
+    next_cursor: str | None = None
+
+
+class AdminArchivedEntry(BaseModel):
+    user_id: UUID
+    email: str
+    rank: int | None = None
+    priority_score: float
+    joined_at: datetime
+    status: str
+
+
+class AdminArchivedPage(BaseModel):
+    items: list[AdminArchivedEntry]
+    next_cursor: str | None = None
+
+
+class ArchiveRun(BaseModel):
+    drop_id: UUID
+    entries: int
+    elapsed_ms: float
+
+
+class ProfileStatement(BaseModel):
+    sql: str
+    duration_ms: float
+
+
+class ProfileSummary(BaseModel):
+    id: str
+    method: str
+    path: str
+    status: int | None = None
+    started_at: datetime
+    duration_ms: float
+    interval_ms: float
+    samples: int
+    sql_ms: float
+    statements: list[ProfileStatement]
+
+
 class ClaimRequest(BaseModel):
     drop_id: UUID
 
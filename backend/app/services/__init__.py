@@ -1,3 +1,3 @@
-from . import seed, waitlist
+from . import allocation, archive, catalog, roster, seed, stock_ledger, waitlist
 
-__all__ = ["seed", "waitlist"]
+__all__ = ["allocation", "archive", "catalog", "roster", "seed", "stock_ledger", "waitlist"]
@@ -0,0 +1,293 @@
+"""Frozen allocation snapshot.
+
+Once a drop's claim window opens its waitlist order is settled, so it is materialised a
+single time into ``drop_allocations`` (entry -> rank -> eligible). Claims and status
+checks then read one row by primary key instead of re-ranking the waitlist.
+
+Later changes are applied incrementally so the snapshot always equals what a fresh
+ranking would produce:
+
+* a late join is slotted in at its rank and pushes the rows behind it down,
+* a leave pulls the rows behind it up (both lock the drop row, so they apply one at a time),
+* a stock change re-flags eligibility in one statement,
+* moving ``claim_open_at`` back into the future discards the snapshot.
+
+Drops in ``push`` allocation mode also get their claims issued while the snapshot is
+built: every eligible row becomes a ``Claim`` in the same transaction, so ``POST /claim``
+only reads the pre-issued code. Entries that become eligible later (a late join near the
+top, a leave, a stock increase) still claim on demand.
+"""
+
+from __future__ import annotations
+
+import logging
+import secrets
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import ColumnElement, ScalarSelect, Select, delete, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session, aliased
+
+from .. import metrics
+from ..clock import ensure_aware, utcnow
+from ..models import Allocation, Claim, Drop, WaitlistEntry
+
+logger = logging.getLogger(__name__)
+
+
+def generate_claim_code() -> str:
+    return secrets.token_hex(8)
+
+
+def _capped_count(stmt: Select, limit: int | None) -> ScalarSelect:
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return select(func.count()).select_from(stmt.subquery()).scalar_subquery()
+
+
+def entry_rank(session: Session, entry: WaitlistEntry, *, limit: int | None = None) -> int:
+    """Number of entries ranked ahead of ``entry`` (0 means first in line).
+
+    The two terms are separate range scans on ``ix_waitlist_drop_rank`` rather than one
+    OR predicate, which the planner cannot answer from the index. With ``limit`` each scan
+    stops early, so the result is only exact below ``limit`` -- enough for an eligibility
+    check against stock, at O(log n + limit) regardless of waitlist length.
+    """
+    higher = select(literal(1)).where(
+        WaitlistEntry.drop_id == entry.drop_id,
+        WaitlistEntry.priority_score > entry.priority_score,
+    )
+    tied_earlier = select(literal(1)).where(
+        WaitlistEntry.drop_id == entry.drop_id,
+        WaitlistEntry.priority_score == entry.priority_score,
+        WaitlistEntry.joined_at < entry.joined_at,
+    )
+    ahead_stmt = select(_capped_count(higher, limit) + _capped_count(tied_earlier, limit))
+    return session.scalar(ahead_stmt) or 0
+
+
+def live_rank() -> ColumnElement[int]:
+    """``entry_rank`` of each ``WaitlistEntry`` row in the enclosing query, as a column.
+
+    Ranks many entries in one statement: each row costs the same two index range scans as
+    ``entry_rank``, uncapped, so O(log n + rank) rather than a pass over the waitlist.
+    """
+    ahead = aliased(WaitlistEntry)
+    higher = select(func.count()).where(
+        ahead.drop_id == WaitlistEntry.drop_id,
+        ahead.priority_score > WaitlistEntry.priority_score,
+    )
+    tied_earlier = select(func.count()).where(
+        ahead.drop_id == WaitlistEntry.drop_id,
+        ahead.priority_score == WaitlistEntry.priority_score,
+        ahead.joined_at < WaitlistEntry.joined_at,
+    )
+    return higher.scalar_subquery() + tied_earlier.scalar_subquery()
+
+
+def snapshot_due(drop: Drop, now: datetime | None = None) -> bool:
+    return drop.allocation_built_at is None and (now or utcnow()) >= ensure_aware(drop.claim_open_at)
+
+
+def ensure_snapshot(session: Session, drop: Drop) -> bool:
+    """Build the snapshot if the claim window is open and it does not exist yet.
+
+    Returns True when this call built it. Safe to race: the guarded UPDATE on the drop row
+    lets exactly one transaction insert the rows and commit. A loser leaves the caller's
+    transaction alone and only expires ``drop``, whose ``allocation_built_at`` it now knows
+    to be stale. For a push drop the claims are issued in the winner's transaction.
+    """
+    if not snapshot_due(drop):
+        return False
+
+    built_at = utcnow()
+    claim_build = (
+        update(Drop)
+        .where(Drop.id == drop.id, Drop.allocation_built_at.is_(None))
+        .values(allocation_built_at=built_at, updated_at=Drop.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    if session.execute(claim_build).rowcount != 1:
+        session.expire(drop)
+        return False
+
+    ranked = select(
+        WaitlistEntry.drop_id,
+        WaitlistEntry.user_id,
+        WaitlistEntry.id.label("entry_id"),
+        (func.row_number().over(order_by=(WaitlistEntry.priority_score.desc(), WaitlistEntry.joined_at.asc())) - 1).label("rank"),
+    ).where(WaitlistEntry.drop_id == drop.id).subquery()
+    session.execute(
+        insert(Allocation).from_select(
+            ["drop_id", "user_id", "entry_id", "rank", "eligible"],
+            select(ranked.c.drop_id, ranked.c.user_id, ranked.c.entry_id, ranked.c.rank, ranked.c.rank < drop.stock),
+        )
+    )
+    if drop.allocation_mode == "push":
+        started = time.perf_counter()
+        issued = issue_claims(session, drop)
+        session.commit()
+        elapsed = time.perf_counter() - started
+        metrics.PUSH_ALLOCATION_DURATION.observe(elapsed)
+        logger.info("push allocation for drop %s issued %d claims in %.1f ms", drop.id, issued, elapsed * 1000)
+    else:
+        session.commit()
+    return True
+
+
+def issue_claims(session: Session, drop: Drop) -> int:
+    """Turn the top eligible snapshot rows into claims, up to the remaining stock; caller commits.
+
+    Users who already hold a claim are skipped: if an admin moves ``claim_open_at`` back into
+    the future after the claims were issued, the snapshot is discarded but the claims stay,
+    and the rebuilt snapshot only tops them up. One read of the remaining stock, one ordered
+    read of the rows to issue, one UPDATE of the entries' status, one bulk INSERT of the
+    claims and one UPDATE of the drop's stock counter. Returns the number issued.
+    """
+    remaining = session.scalar(select(Drop.stock - Drop.claimed_count).where(Drop.id == drop.id))
+    if remaining is None or remaining <= 0:
+        return 0
+    unclaimed = (
+        select(Allocation.user_id, Allocation.entry_id)
+        .where(
+            Allocation.drop_id == drop.id,
+            Allocation.eligible.is_(True),
+            ~exists().where(Claim.drop_id == Allocation.drop_id, Claim.user_id == Allocation.user_id),
+        )
+        .order_by(Allocation.rank)
+        .limit(remaining)
+    )
+    issuing = session.execute(unclaimed).all()
+    if not issuing:
+        return 0
+
+    # before the INSERT, which would hide these rows from ``unclaimed``
+    session.execute(
+        update(WaitlistEntry)
+        .where(WaitlistEntry.id.in_(select(unclaimed.subquery().c.entry_id)))
+        .values(status="claimed")
+        .execution_options(synchronize_session=False)
+    )
+    claimed_at = utcnow()
+    session.execute(
+        insert(Claim),
+        [
+            {
+                "id": uuid.uuid4(),
+                "drop_id": drop.id,
+                "user_id": user_id,
+                "claim_code": generate_claim_code(),
+                "claimed_at": claimed_at,
+            }
+            for user_id, _ in issuing
+        ],
+    )
+    session.execute(
+        update(Drop)
+        .where(Drop.id == drop.id)
+        .values(claimed_count=Drop.claimed_count + len(issuing), updated_at=Drop.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    return len(issuing)
+
+
+def _shift(session: Session, drop: Drop, *, from_rank: int, delta: int) -> None:
+    session.execute(
+        update(Allocation)
+        .where(Allocation.drop_id == drop.id, Allocation.rank >= from_rank)
+        .values(rank=Allocation.rank + delta, eligible=(Allocation.rank + delta) < drop.stock)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def lock_snapshot(session: Session, drop: Drop) -> datetime | None:
+    """Lock the drop row for a join or leave and return its ``allocation_built_at``.
+
+    The value read with the lock is the one to branch on: a snapshot build committing
+    between the request loading ``drop`` and its write would otherwise be missed, leaving
+    a late joiner with no snapshot row. Late joins and leaves also read the ranks they
+    shift, so holding the row makes them apply one at a time (as does the snapshot build,
+    through its UPDATE). Held until the caller commits.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        # SQLite ignores FOR UPDATE and runs a bare SELECT outside any transaction; a no-op
+        # UPDATE takes the database write lock instead
+        stmt = (
+            update(Drop)
+            .where(Drop.id == drop.id)
+            .values(updated_at=Drop.updated_at)
+            .returning(Drop.allocation_built_at)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        stmt = select(Drop.allocation_built_at).where(Drop.id == drop.id).with_for_update()
+    return session.scalar(stmt)
+
+
+def place_entry(session: Session, drop: Drop, entry: WaitlistEntry) -> None:
+    """Slot a late joiner into an existing snapshot at its rank.
+
+    The caller holds the drop row (``lock_snapshot``) and commits.
+    """
+    rank = entry_rank(session, entry)
+    _shift(session, drop, from_rank=rank, delta=1)
+    session.execute(
+        insert(Allocation).values(
+            drop_id=drop.id,
+            user_id=entry.user_id,
+            entry_id=entry.id,
+            rank=rank,
+            eligible=rank < drop.stock,
+        )
+    )
+
+
+def remove_entry(session: Session, drop: Drop, user_id) -> None:
+    """Drop a leaving user's row and close the gap behind it.
+
+    The caller holds the drop row (``lock_snapshot``) and commits.
+    """
+    rank = session.scalar(
+        delete(Allocation)
+        .where(Allocation.drop_id == drop.id, Allocation.user_id == user_id)
+        .returning(Allocation.rank)
+        .execution_options(synchronize_session=False)
+    )
+    if rank is not None:
+        _shift(session, drop, from_rank=rank + 1, delta=-1)
+
+
+def apply_drop_update(session: Session, drop: Drop, changed: set[str]) -> None:
+    """Keep an existing snapshot in line with an admin edit; caller commits.
+
+    ``base_priority`` is folded into each entry's score at join time, so editing it only
+    affects later joiners, and those are placed individually as they arrive.
+    """
+    if drop.allocation_built_at is None:
+        return
+    if "claim_open_at" in changed and utcnow() < ensure_aware(drop.claim_open_at):
+        session.execute(delete(Allocation).where(Allocation.drop_id == drop.id))
+        drop.allocation_built_at = None
+        return
+    if "stock" in changed:
+        session.execute(
+            update(Allocation)
+            .where(Allocation.drop_id == drop.id)
+            .values(eligible=Allocation.rank < drop.stock)
+            .execution_options(synchronize_session=False)
+        )
+
+
+__all__ = [
+    "apply_drop_update",
+    "ensure_snapshot",
+    "entry_rank",
+    "generate_claim_code",
+    "issue_claims",
+    "live_rank",
+    "lock_snapshot",
+    "place_entry",
+    "remove_entry",
+    "snapshot_due",
+]
@@ -0,0 +1,160 @@
+"""Move the waitlist entries of closed drops out of ``waitlist_entries``.
+
+Once a drop's ``claim_close_at`` has passed, join, leave and claim answer 409/400, but its
+entries still sit in the hot table and its indexes (``uq_waitlist_user_drop``,
+``ix_waitlist_drop_rank``). Every join and rank lookup on live drops walks past them.
+``archive_closed_drops`` copies them into ``waitlist_archive`` in chunks of
+``ARCHIVE_BATCH_SIZE``. The archive is a narrow table keyed by (drop, user) that keeps the
+status, score and final rank. Each chunk is deleted from ``drop_allocations`` and
+``waitlist_entries`` with ``DELETE ... RETURNING``, and what the deletes returned is
+inserted into the archive in the same transaction. Then ``drops.archived_at`` is set.
+
+Each chunk commits on its own, so a run can stop at any point and the next run picks up
+where it left off. Runs may also overlap (the drop scheduler of every worker, the admin
+endpoint, cron): a run that reaches rows another one is deleting waits for it and gets
+none of them back, so every entry is archived exactly once. Claims are not touched; they
+are the record of who won.
+
+Run it from cron with ``python -m app.services.archive``, or through
+``POST /admin/drops/archive``.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from ..clock import utcnow
+from ..config import get_settings
+from ..models import Allocation, Drop, WaitlistArchive, WaitlistEntry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class ArchiveReport:
+    drop_id: uuid.UUID
+    entries: int
+    elapsed_ms: float
+
+
+def closed_drops(session: Session, now: datetime | None = None) -> list[uuid.UUID]:
+    stmt = (
+        select(Drop.id)
+        .where(Drop.archived_at.is_(None), Drop.claim_close_at < (now or utcnow()))
+        .order_by(Drop.claim_close_at)
+    )
+    return list(session.scalars(stmt))
+
+
+def archive_drop(session: Session, drop_id: uuid.UUID, *, batch_size: int) -> int:
+    """Move every entry of one closed drop, one committed chunk at a time; returns how many this run moved."""
+    chunk_stmt = select(WaitlistEntry.id).where(WaitlistEntry.drop_id == drop_id).limit(batch_size)
+    moved = 0
+    while entry_ids := session.scalars(chunk_stmt).all():
+        ranks = dict(
+            session.execute(
+                delete(Allocation)
+                .where(Allocation.entry_id.in_(entry_ids))
+                .returning(Allocation.entry_id, Allocation.rank)
+                .execution_options(synchronize_session=False)
+            ).all()
+        )
+        # only what this run deleted; rows an overlapping run took come back empty
+        rows = session.execute(
+            delete(WaitlistEntry)
+            .where(WaitlistEntry.id.in_(entry_ids))
+            .returning(
+                WaitlistEntry.id,
+                WaitlistEntry.user_id,
+                WaitlistEntry.status,
+                WaitlistEntry.priority_score,
+                WaitlistEntry.joined_at,
+            )
+            .execution_options(synchronize_session=False)
+        ).all()
+        if rows:
+            session.execute(
+                insert(WaitlistArchive),
+                [
+                    {
+                        "drop_id": drop_id,
+                        "user_id": row.user_id,
+                        "rank": ranks.get(row.id),
+                        "status": row.status,
+                        "priority_score": row.priority_score,
+                        "joined_at": row.joined_at,
+                    }
+                    for row in rows
+                ],
+            )
+        session.commit()
+        moved += len(rows)
+
+    session.execute(
+        update(Drop)
+        .where(Drop.id == drop_id, Drop.archived_at.is_(None))
+        # an archive run is not an edit of the drop
+        .values(archived_at=utcnow(), updated_at=Drop.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    return moved
+
+
+def archive_closed_drops(
+    session: Session, *, batch_size: int | None = None, now: datetime | None = None
+) -> list[ArchiveReport]:
+    """Archive every closed drop that has not been archived yet."""
+    batch_size = batch_size or get_settings().archive_batch_size
+    reports = []
+    for drop_id in closed_drops(session, now):
+        started = time.perf_counter()
+        moved = archive_drop(session, drop_id, batch_size=batch_size)
+        reports.append(ArchiveReport(drop_id, moved, (time.perf_counter() - started) * 1000))
+        logger.info("archived %d waitlist entries of drop %s", moved, drop_id)
+    return reports
+
+
+def archived_status(session: Session, user_id: uuid.UUID, drop_id: uuid.UUID) -> dict[str, object] | None:
+    """``waitlist_status`` payload for an archived entry, or None."""
+    row = session.get(WaitlistArchive, (drop_id, user_id))
+    if row is None:
+        return None
+    result: dict[str, object] = {
+        "status": row.status,
+        "priority_score": row.priority_score,
+        "joined_at": row.joined_at,
+        "archived": True,
+    }
+    if row.rank is not None:
+        result["rank"] = row.rank
+    return result
+
+
+def main() -> None:
+    from ..database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    with SessionLocal() as session:
+        reports = archive_closed_drops(session)
+    print(f"archived {sum(report.entries for report in reports)} entries of {len(reports)} drops")
+
+
+__all__ = [
+    "ArchiveReport",
+    "archive_closed_drops",
+    "archive_drop",
+    "archived_status",
+    "closed_drops",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Pre-serialized drop catalog for the public read routes.
+
+``GET /drops`` and ``GET /drops/{id}`` take most public traffic while drops only change
+through the admin routes, so their JSON bodies are cached as bytes together with an
+ETag. Admin writes call ``invalidate()``. The active list also expires on its own at the
+earliest ``claim_close_at`` it contains, because that is when the ``claim_close_at >= now``
+filter would drop a row. ``CATALOG_CACHE_TTL_SECONDS`` caps how long another worker's
+admin write can go unseen.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from dataclasses import dataclass
+from uuid import UUID
+
+from fastapi import Response, status
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import responses
+from ..caching import TTLCache
+from ..clock import ensure_aware, utcnow
+from ..config import get_settings
+from ..models import Drop
+from ..schemas import DropRead
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogEntry:
+    body: bytes
+    etag: str
+
+
+_ACTIVE_KEY = "active"
+_list_adapter = TypeAdapter(list[DropRead])
+_drop_adapter = TypeAdapter(DropRead)
+
+_settings = get_settings()
+_cache: TTLCache[object, CatalogEntry] = TTLCache(
+    "catalog", maxsize=_settings.catalog_cache_size, ttl=_settings.catalog_cache_ttl_seconds
+)
+# bumped by invalidate(); a load that started before a write must not store its result
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def _entry(body: bytes) -> CatalogEntry:
+    return CatalogEntry(body=body, etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+
+def _serialize_list(drops: list[Drop]) -> bytes:
+    if responses.enabled():
+        return responses.dumps([responses.drop_payload(drop) for drop in drops])
+    return _list_adapter.dump_json(_list_adapter.validate_python(drops, from_attributes=True))
+
+
+def _serialize(drop: Drop) -> bytes:
+    if responses.enabled():
+        return responses.dumps(responses.drop_payload(drop))
+    return _drop_adapter.dump_json(_drop_adapter.validate_python(drop, from_attributes=True))
+
+
+def _store(key: object, entry: CatalogEntry, generation: int, ttl: float | None = None) -> None:
+    with _generation_lock:
+        if generation == _generation:
+            _cache.set(key, entry, ttl=ttl)
+
+
+def active_drops(session: Session) -> CatalogEntry:
+    cached = _cache.get(_ACTIVE_KEY)
+    if cached is not None:
+        return cached
+
+    generation = _generation
+    now = utcnow()
+    stmt = select(Drop).where(Drop.claim_close_at >= now).order_by(Drop.claim_open_at.asc())
+    drops = session.scalars(stmt).all()
+    entry = _entry(_serialize_list(drops))
+
+    next_close = min((ensure_aware(drop.claim_close_at) for drop in drops), default=None)
+    ttl = None if next_close is None else (next_close - now).total_seconds()
+    _store(_ACTIVE_KEY, entry, generation, ttl=ttl)
+    return entry
+
+
+def drop_detail(session: Session, drop_id: UUID) -> CatalogEntry | None:
+    key = ("drop", drop_id)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    generation = _generation
+    drop = session.get(Drop, drop_id)
+    if drop is None:
+        return None
+    entry = _entry(_serialize(drop))
+    _store(key, entry, generation)
+    return entry
+
+
+def warm(session: Session, drop_id: UUID) -> None:
+    """Reload the active list and one drop's detail now, ahead of the requests that would miss."""
+    _cache.pop(_ACTIVE_KEY)
+    _cache.pop(("drop", drop_id))
+    active_drops(session)
+    drop_detail(session, drop_id)
+
+
+def invalidate() -> None:
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        _cache.clear()
+
+
+def not_modified(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {value.strip().removeprefix("W/") for value in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def to_response(entry: CatalogEntry, if_none_match: str | None) -> Response:
+    # no-cache: clients may store the body but must revalidate, which is a cheap 304
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if not_modified(if_none_match, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+__all__ = ["CatalogEntry", "active_drops", "drop_detail", "invalidate", "not_modified", "to_response", "warm"]
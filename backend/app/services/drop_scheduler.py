@@ -0,0 +1,341 @@
+"""Work done when a drop's windows open and close, ahead of the traffic that would wait for it.
+
+Requests evaluate ``waitlist_open_at``, ``claim_open_at`` and ``claim_close_at`` lazily, so
+whoever arrives first after a transition pays for it: building the allocation snapshot
+(and, for push drops, issuing every claim) and reloading the catalog. The scheduler thread
+keeps a heap of the upcoming transitions of every unarchived drop. It sleeps until the
+earliest one and runs that transition's hooks in a fresh session:
+
+* ``waitlist_open``: reload the drop's catalog entries.
+* ``claim_open``: build the allocation snapshot, then reload the catalog.
+* ``claim_close``: reload the catalog, so the active list loses the drop on time. With
+  ``DROP_SCHEDULER_ARCHIVE_ON_CLOSE`` the drop's entries also move to ``waitlist_archive``.
+
+Admin writes call ``reschedule()`` / ``unschedule()``. Every
+``DROP_SCHEDULER_RESYNC_SECONDS`` the heap is rebuilt from the ``drops`` table, which picks
+up edits made through other workers. A transition whose time has passed with its work
+still undone (a snapshot missed while no worker was running) is queued to run at once.
+
+Every worker runs a scheduler so that each warms its own caches, so the same transition
+fires once per worker. The database work tolerates that: ``ensure_snapshot``'s conditional
+UPDATE lets one worker build the snapshot, and ``archive_drop`` moves each entry with
+``DELETE ... RETURNING``, so overlapping archive runs split the rows rather than copy them
+twice. Runs after the first find nothing left to do.
+
+``DROP_SCHEDULER_ENABLED`` is off by default.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import events, metrics
+from ..clock import ensure_aware, utcnow
+from ..config import get_settings
+from ..models import Drop
+from ..singleton import Singleton
+from . import allocation as allocation_service
+from . import archive as archive_service
+from . import catalog
+
+logger = logging.getLogger(__name__)
+
+TRANSITIONS = ("waitlist_open", "claim_open", "claim_close")
+
+Hook = Callable[[Session, Drop], None]
+_hooks: dict[str, list[Hook]] = {transition: [] for transition in TRANSITIONS}
+
+
+def on(transition: str) -> Callable[[Hook], Hook]:
+    """Register a hook to run, in registration order, when ``transition`` comes due."""
+
+    def register(hook: Hook) -> Hook:
+        _hooks[transition].append(hook)
+        return hook
+
+    return register
+
+
+@dataclass(order=True, slots=True)
+class Transition:
+    at: datetime
+    seq: int
+    drop_id: uuid.UUID = field(compare=False)
+    kind: str = field(compare=False)
+    version: int = field(compare=False)
+
+
+@dataclass(slots=True)
+class TransitionReport:
+    drop_id: uuid.UUID
+    kind: str
+    elapsed_ms: float
+
+
+@dataclass(frozen=True, slots=True)
+class _Schedule:
+    waitlist_open_at: datetime
+    claim_open_at: datetime
+    claim_close_at: datetime
+    allocation_built_at: datetime | None
+    archived_at: datetime | None
+
+    @classmethod
+    def of(cls, drop: Drop) -> _Schedule:
+        return cls(
+            drop.waitlist_open_at, drop.claim_open_at, drop.claim_close_at, drop.allocation_built_at, drop.archived_at
+        )
+
+
+class DropScheduler:
+    def __init__(
+        self, session_factory: Callable[[], Session], *, resync_seconds: float, archive_on_close: bool = False
+    ) -> None:
+        self._session_factory = session_factory
+        self.resync_seconds = resync_seconds
+        self.archive_on_close = archive_on_close
+        self.reports: list[TransitionReport] = []
+        self.fired = 0
+        self._heap: list[Transition] = []
+        self._versions: dict[uuid.UUID, int] = {}
+        # admin writes made while load() reads the table; they win over the rows it read
+        self._recent: dict[uuid.UUID, _Schedule | None] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _transitions(self, schedule: _Schedule, now: datetime) -> list[tuple[str, datetime]]:
+        if schedule.archived_at is not None:
+            return []
+        waitlist_open = ensure_aware(schedule.waitlist_open_at)
+        claim_open = ensure_aware(schedule.claim_open_at)
+        claim_close = ensure_aware(schedule.claim_close_at)
+        due = []
+        if waitlist_open > now:
+            due.append(("waitlist_open", waitlist_open))
+        if claim_open > now:
+            due.append(("claim_open", claim_open))
+        elif schedule.allocation_built_at is None and claim_close >= now:
+            due.append(("claim_open", now))
+        if claim_close > now:
+            due.append(("claim_close", claim_close))
+        elif self.archive_on_close:
+            due.append(("claim_close", now))
+        return due
+
+    def _push(self, drop_id: uuid.UUID, schedule: _Schedule, now: datetime) -> None:
+        # caller holds the lock; bumping the version orphans the drop's older heap items
+        version = self._versions[drop_id] = self._versions.get(drop_id, 0) + 1
+        for kind, at in self._transitions(schedule, now):
+            heapq.heappush(self._heap, Transition(at, next(self._seq), drop_id, kind, version))
+
+    def load(self, now: datetime | None = None) -> int:
+        """Rebuild the heap from the ``drops`` table; returns the number of transitions queued."""
+        with self._lock:
+            self._recent = {}
+        stmt = select(
+            Drop.id,
+            Drop.waitlist_open_at,
+            Drop.claim_open_at,
+            Drop.claim_close_at,
+            Drop.allocation_built_at,
+            Drop.archived_at,
+        ).where(Drop.archived_at.is_(None))
+        with self._session_factory() as session:
+            schedules: dict[uuid.UUID, _Schedule | None] = {
+                drop_id: _Schedule(*times) for drop_id, *times in session.execute(stmt)
+            }
+        now = now or utcnow()
+        with self._lock:
+            schedules.update(self._recent)
+            self._heap = []
+            self._versions = {}
+            for drop_id, schedule in schedules.items():
+                if schedule is not None:
+                    self._push(drop_id, schedule, now)
+            return len(self._heap)
+
+    def reschedule(self, drop: Drop) -> None:
+        """Replace the drop's queued transitions after it was created or edited."""
+        schedule = _Schedule.of(drop)
+        with self._lock:
+            self._recent[drop.id] = schedule
+            self._push(drop.id, schedule, utcnow())
+        self._wake.set()
+
+    def unschedule(self, drop_id: uuid.UUID) -> None:
+        with self._lock:
+            self._recent[drop_id] = None
+            self._versions[drop_id] = self._versions.get(drop_id, 0) + 1
+
+    def pending(self) -> list[Transition]:
+        """Queued transitions that will still fire, earliest first."""
+        with self._lock:
+            return sorted(item for item in self._heap if self._versions.get(item.drop_id) == item.version)
+
+    def _pop_due(self, now: datetime) -> Transition | None:
+        with self._lock:
+            while self._heap and self._heap[0].at <= now:
+                item = heapq.heappop(self._heap)
+                if self._versions.get(item.drop_id) == item.version:
+                    return item
+        return None
+
+    def run_due(self, now: datetime | None = None) -> list[TransitionReport]:
+        """Fire every transition due by ``now``; returns what this call ran."""
+        reports = []
+        while (item := self._pop_due(now or utcnow())) is not None:
+            report = self._fire(item, now or utcnow())
+            if report is not None:
+                reports.append(report)
+        return reports
+
+    def _fire(self, item: Transition, now: datetime) -> TransitionReport | None:
+        started = time.perf_counter()
+        with self._session_factory() as session:
+            drop = session.get(Drop, item.drop_id)
+            # gone, archived, or moved later through another worker (the next load requeues it)
+            if drop is None or drop.archived_at is not None:
+                return None
+            if ensure_aware(getattr(drop, f"{item.kind}_at")) > now:
+                return None
+            for hook in _hooks[item.kind]:
+                try:
+                    hook(session, drop)
+                except Exception:
+                    session.rollback()
+                    logger.exception("%s hook %s failed for drop %s", item.kind, hook.__name__, item.drop_id)
+            if item.kind == "claim_close" and self.archive_on_close:
+                try:
+                    archive_service.archive_drop(session, item.drop_id, batch_size=get_settings().archive_batch_size)
+                except Exception:
+                    session.rollback()
+                    logger.exception("archiving closed drop %s failed", item.drop_id)
+        elapsed = time.perf_counter() - started
+        metrics.DROP_TRANSITION_DURATION.observe(elapsed, transition=item.kind)
+        self.fired += 1
+        logger.info("ran %s for drop %s in %.1f ms", item.kind, item.drop_id, elapsed * 1000)
+        return TransitionReport(item.drop_id, item.kind, elapsed * 1000)
+
+    def _seconds_until_next(self) -> float:
+        with self._lock:
+            if not self._heap:
+                return float("inf")
+            return (self._heap[0].at - utcnow()).total_seconds()
+
+    def _run(self) -> None:
+        next_load = 0.0
+        while not self._stop.is_set():
+            if time.monotonic() >= next_load:
+                try:
+                    self.load()
+                except Exception:
+                    logger.exception("drop scheduler could not load the drops")
+                next_load = time.monotonic() + self.resync_seconds if self.resync_seconds > 0 else float("inf")
+            try:
+                self.reports.extend(self.run_due())
+            except Exception:
+                logger.exception("drop scheduler run failed")
+            del self.reports[:-100]
+            timeout = min(self._seconds_until_next(), next_load - time.monotonic())
+            # Event.wait overflows on inf; an hour is as good as forever with reschedule() waking us
+            self._wake.wait(min(max(timeout, 0.0), 3_600.0))
+            self._wake.clear()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="drop-scheduler", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self) -> dict[str, int]:
+        return {"pending": len(self.pending()), "fired": self.fired}
+
+
+@on("claim_open")
+def build_snapshot(session: Session, drop: Drop) -> None:
+    """Freeze the waitlist order, issuing a push drop's claims, before the first claim needs it."""
+    if allocation_service.ensure_snapshot(session, drop):
+        events.publish(drop.id)
+
+
+@on("waitlist_open")
+@on("claim_open")
+@on("claim_close")
+def warm_catalog(session: Session, drop: Drop) -> None:
+    catalog.warm(session, drop.id)
+
+
+def _build_scheduler() -> DropScheduler:
+    from .. import database
+
+    settings = get_settings()
+    # late-bound so override_engine() in tests and benchmarks is picked up
+    scheduler = DropScheduler(
+        lambda: database.SessionLocal(),
+        resync_seconds=settings.drop_scheduler_resync_seconds,
+        archive_on_close=settings.drop_scheduler_archive_on_close,
+    )
+    scheduler.start()
+    return scheduler
+
+
+_scheduler: Singleton[DropScheduler] = Singleton(_build_scheduler, close=DropScheduler.close)
+
+
+def get_drop_scheduler() -> DropScheduler | None:
+    return _scheduler.current()
+
+
+def start_drop_scheduler() -> DropScheduler | None:
+    """Start the process-wide scheduler; None when ``DROP_SCHEDULER_ENABLED`` is false."""
+    if not get_settings().drop_scheduler_enabled:
+        return None
+    return _scheduler.get()
+
+
+def shutdown_drop_scheduler() -> None:
+    _scheduler.shutdown()
+
+
+def reschedule(drop: Drop) -> None:
+    scheduler = _scheduler.current()
+    if scheduler is not None:
+        scheduler.reschedule(drop)
+
+
+def unschedule(drop_id: uuid.UUID) -> None:
+    scheduler = _scheduler.current()
+    if scheduler is not None:
+        scheduler.unschedule(drop_id)
+
+
+__all__ = [
+    "DropScheduler",
+    "TRANSITIONS",
+    "Transition",
+    "TransitionReport",
+    "get_drop_scheduler",
+    "on",
+    "reschedule",
+    "shutdown_drop_scheduler",
+    "start_drop_scheduler",
+    "unschedule",
+]
@@ -0,0 +1,245 @@
+"""Group commit for waitlist joins.
+
+When a waitlist opens, thousands of joins arrive within seconds, and each one is a
+single-row transaction with its own fsync. ``JoinBuffer`` holds joins for up to
+``JOIN_BATCH_WINDOW_MS`` (or until ``JOIN_BATCH_MAX_SIZE`` are waiting) and writes them
+all with one ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` in one transaction. Rows
+the insert skipped are users who had already joined. They are read back, so every caller
+still gets the same ``(entry, already_joined)`` answer as the unbuffered path. A batch
+that fails is retried one join at a time, so an error reaches only the join that caused it.
+
+The caller computes ``joined_at`` and the priority score before it submits, so buffering
+adds latency but does not change ordering. Drops with an allocation snapshot skip the
+buffer: each late join there updates the ranks of the rows behind it. A snapshot built
+while a batch is in flight is handled inside the batch's transaction. See ``_write``.
+
+``JOIN_BATCH_WINDOW_MS=0`` (the default) disables buffering. The buffer writes through the
+sync engine from its own thread in both database modes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .. import metrics
+from ..config import get_settings
+from ..models import Drop, WaitlistEntry
+from ..singleton import Singleton
+from . import allocation as allocation_service
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+logger = logging.getLogger(__name__)
+
+_COLUMNS = ("id", "user_id", "drop_id", "joined_at", "priority_score", "status")
+
+
+@dataclass(slots=True)
+class _PendingJoin:
+    entry: WaitlistEntry
+    future: Future = field(default_factory=Future)
+
+
+class JoinBuffer:
+    def __init__(self, session_factory: Callable[[], Session], *, window_ms: float, max_batch: int) -> None:
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch = max(max_batch, 1)
+        self._queue: queue.SimpleQueue[_PendingJoin | None] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._batches = 0
+        self._joins = 0
+        self._largest_batch = 0
+
+    @staticmethod
+    def supports(dialect_name: str) -> bool:
+        return dialect_name in _INSERTS
+
+    def _submit(self, entry: WaitlistEntry) -> Future:
+        pending = _PendingJoin(entry)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("join buffer is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="waitlist-join-buffer", daemon=True)
+                self._thread.start()
+            self._queue.put(pending)
+        return pending.future
+
+    def join(self, entry: WaitlistEntry) -> tuple[WaitlistEntry, bool]:
+        return self._submit(entry).result()
+
+    async def join_async(self, entry: WaitlistEntry) -> tuple[WaitlistEntry, bool]:
+        return await asyncio.wrap_future(self._submit(entry))
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stopping = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _flush(self, batch: list[_PendingJoin]) -> None:
+        try:
+            results = self._write([pending.entry for pending in batch])
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0].future.set_exception(exc)
+                return
+            # one bad row fails the whole INSERT; retry one by one, in arrival order so the
+            # first join per user still wins, and only that row's caller sees the error
+            logger.warning("join batch of %d failed, retrying its joins one by one", len(batch), exc_info=True)
+            for pending in batch:
+                self._flush([pending])
+            return
+        with self._lock:
+            self._batches += 1
+            self._joins += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+        for pending, result in zip(batch, results):
+            pending.future.set_result(result)
+
+    def _write(self, entries: list[WaitlistEntry]) -> list[tuple[WaitlistEntry, bool]]:
+        # first request per (user, drop) wins, exactly as if they had arrived one by one
+        firsts: dict[tuple, WaitlistEntry] = {}
+        for entry in entries:
+            firsts.setdefault((entry.user_id, entry.drop_id), entry)
+        drop_ids = {entry.drop_id for entry in firsts.values()}
+
+        with self.session_factory() as session, session.begin():
+            # holds off a concurrent snapshot build (its guarded UPDATE on the drop row) until
+            # this batch commits. FOR UPDATE rather than FOR SHARE: late joins placed below
+            # take the same lock, and two batches upgrading a shared lock would deadlock.
+            # SQLite ignores it and serialises writers.
+            session.execute(select(Drop.id).where(Drop.id.in_(drop_ids)).with_for_update())
+
+            insert = _INSERTS[session.get_bind().dialect.name]
+            stmt = (
+                insert(WaitlistEntry)
+                .values([{column: getattr(entry, column) for column in _COLUMNS} for entry in firsts.values()])
+                .on_conflict_do_nothing(index_elements=["user_id", "drop_id"])
+                .returning(WaitlistEntry.user_id, WaitlistEntry.drop_id)
+            )
+            inserted = {tuple(row) for row in session.execute(stmt)}
+
+            existing: dict[tuple, WaitlistEntry] = {}
+            conflicts = [key for key in firsts if key not in inserted]
+            if conflicts:
+                rows = session.scalars(
+                    select(WaitlistEntry).where(tuple_(WaitlistEntry.user_id, WaitlistEntry.drop_id).in_(conflicts))
+                )
+                existing = {(row.user_id, row.drop_id): row for row in rows}
+
+            # a snapshot that committed between the caller's check and the lock above
+            built = session.scalars(
+                select(Drop).where(Drop.id.in_(drop_ids), Drop.allocation_built_at.is_not(None))
+            ).all()
+            for drop in built:
+                # in queue order, so every rank is computed against an up to date snapshot
+                late = sorted(
+                    (firsts[key] for key in inserted if key[1] == drop.id),
+                    key=lambda entry: (-entry.priority_score, entry.joined_at),
+                )
+                for entry in late:
+                    allocation_service.place_entry(session, drop, entry)
+            session.expunge_all()
+
+        results: list[tuple[WaitlistEntry, bool]] = []
+        claimed: set[tuple] = set()
+        for entry in entries:
+            key = (entry.user_id, entry.drop_id)
+            if key in inserted and key not in claimed:
+                claimed.add(key)
+                results.append((entry, False))
+            else:
+                results.append((existing.get(key, firsts[key]), True))
+        return results
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            return {
+                "window_ms": self.window * 1000,
+                "batches": self._batches,
+                "joins": self._joins,
+                "avg_batch": self._joins / self._batches if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+            }
+
+    def close(self) -> None:
+        """Flush whatever is queued and stop the writer thread."""
+        with self._lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+
+def _build_buffer() -> JoinBuffer | None:
+    from .. import database
+
+    if not JoinBuffer.supports(database.get_engine().dialect.name):
+        return None
+    settings = get_settings()
+    # late-bound so override_engine() in tests and benchmarks is picked up
+    return JoinBuffer(
+        lambda: database.SessionLocal(),
+        window_ms=settings.join_batch_window_ms,
+        max_batch=settings.join_batch_max_size,
+    )
+
+
+_buffer: Singleton[JoinBuffer] = Singleton(_build_buffer, close=JoinBuffer.close)
+
+
+def get_join_buffer() -> JoinBuffer | None:
+    """The process-wide buffer, or None when batching is off or the dialect lacks upserts."""
+    if get_settings().join_batch_window_ms <= 0:
+        return None
+    return _buffer.get()
+
+
+@metrics.register_collector
+def _buffer_samples():
+    # reports the buffer once a join started it, rather than starting it for a scrape
+    buffer = _buffer.current()
+    if buffer is not None:
+        yield metrics.Sample(
+            "dropspot_join_batches_total", "counter", "Join buffer flushes.", [({}, buffer.stats()["batches"])]
+        )
+
+
+def shutdown_join_buffer() -> None:
+    _buffer.shutdown()
+
+
+__all__ = ["JoinBuffer", "get_join_buffer", "shutdown_join_buffer"]
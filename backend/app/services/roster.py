@@ -0,0 +1,256 @@
+"""Admin reads of a drop's waitlist and claims.
+
+Pages use keyset pagination. Waitlist pages follow the queue order
+``(priority_score DESC, joined_at, id)``, served by ``ix_waitlist_drop_rank``. Claim pages
+follow ``(claimed_at, id)``, served by ``ix_claims_drop_claimed``. The cursor is the
+opaque sort key of the last row, so page N costs the same as page 1 and rows that move
+between requests are neither skipped nor repeated.
+
+Closed drops whose entries were moved by ``services.archive`` page and export the same way
+from ``waitlist_archive`` (ordered by score, joined_at, user_id).
+
+Exports stream the same ordering as CSV or NDJSON. Rows are plain Core tuples fetched
+with ``yield_per``: a server-side cursor on PostgreSQL, incremental fetches on SQLite.
+Memory stays flat whatever the waitlist size.
+"""
+
+from __future__ import annotations
+
+import base64
+import csv
+import io
+import json
+import uuid
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import TYPE_CHECKING, Literal
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_, or_, select
+from sqlalchemy.orm import Session
+
+from ..models import Claim, User, WaitlistArchive, WaitlistEntry
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+ExportFormat = Literal["csv", "ndjson"]
+EXPORT_BATCH_SIZE = 1_000
+
+WAITLIST_COLUMNS = ("entry_id", "user_id", "email", "priority_score", "joined_at", "status")
+CLAIM_COLUMNS = ("claim_id", "user_id", "email", "claim_code", "claimed_at")
+ARCHIVE_COLUMNS = ("user_id", "email", "rank", "priority_score", "joined_at", "status")
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def encode_cursor(values: Sequence[object]) -> str:
+    raw = json.dumps([_plain(value) for value in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[str]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as exc:
+        raise _invalid_cursor() from exc
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, str) for v in values):
+        raise _invalid_cursor()
+    return values
+
+
+def _plain(value: object) -> object:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Decimal, float)):
+        return str(value)
+    return value
+
+
+def _waitlist_select(drop_id: uuid.UUID) -> Select:
+    return (
+        select(
+            WaitlistEntry.id.label("entry_id"),
+            WaitlistEntry.user_id,
+            User.email,
+            WaitlistEntry.priority_score,
+            WaitlistEntry.joined_at,
+            WaitlistEntry.status,
+        )
+        .join(User, User.id == WaitlistEntry.user_id)
+        .where(WaitlistEntry.drop_id == drop_id)
+        .order_by(WaitlistEntry.priority_score.desc(), WaitlistEntry.joined_at.asc(), WaitlistEntry.id.asc())
+    )
+
+
+def _claims_select(drop_id: uuid.UUID) -> Select:
+    return (
+        select(Claim.id.label("claim_id"), Claim.user_id, User.email, Claim.claim_code, Claim.claimed_at)
+        .join(User, User.id == Claim.user_id)
+        .where(Claim.drop_id == drop_id)
+        .order_by(Claim.claimed_at.asc(), Claim.id.asc())
+    )
+
+
+def _archive_select(drop_id: uuid.UUID) -> Select:
+    return (
+        select(
+            WaitlistArchive.user_id,
+            User.email,
+            WaitlistArchive.rank,
+            WaitlistArchive.priority_score,
+            WaitlistArchive.joined_at,
+            WaitlistArchive.status,
+        )
+        .join(User, User.id == WaitlistArchive.user_id)
+        .where(WaitlistArchive.drop_id == drop_id)
+        .order_by(WaitlistArchive.priority_score.desc(), WaitlistArchive.joined_at.asc(), WaitlistArchive.user_id.asc())
+    )
+
+
+def _after_waitlist_cursor(cursor: str):
+    score, joined_at, entry_id = decode_cursor(cursor, 3)
+    try:
+        score_value, joined_value, id_value = Decimal(score), datetime.fromisoformat(joined_at), uuid.UUID(entry_id)
+    except (InvalidOperation, ValueError) as exc:
+        raise _invalid_cursor() from exc
+    return or_(
+        WaitlistEntry.priority_score < score_value,
+        and_(
+            WaitlistEntry.priority_score == score_value,
+            or_(
+                WaitlistEntry.joined_at > joined_value,
+                and_(WaitlistEntry.joined_at == joined_value, WaitlistEntry.id > id_value),
+            ),
+        ),
+    )
+
+
+def _after_claims_cursor(cursor: str):
+    claimed_at, claim_id = decode_cursor(cursor, 2)
+    try:
+        claimed_value, id_value = datetime.fromisoformat(claimed_at), uuid.UUID(claim_id)
+    except ValueError as exc:
+        raise _invalid_cursor() from exc
+    return or_(Claim.claimed_at > claimed_value, and_(Claim.claimed_at == claimed_value, Claim.id > id_value))
+
+
+def _after_archive_cursor(cursor: str):
+    score, joined_at, user_id = decode_cursor(cursor, 3)
+    try:
+        score_value, joined_value, id_value = Decimal(score), datetime.fromisoformat(joined_at), uuid.UUID(user_id)
+    except (InvalidOperation, ValueError) as exc:
+        raise _invalid_cursor() from exc
+    return or_(
+        WaitlistArchive.priority_score < score_value,
+        and_(
+            WaitlistArchive.priority_score == score_value,
+            or_(
+                WaitlistArchive.joined_at > joined_value,
+                and_(WaitlistArchive.joined_at == joined_value, WaitlistArchive.user_id > id_value),
+            ),
+        ),
+    )
+
+
+def _page(session: Session, stmt: Select, limit: int, sort_key) -> dict[str, object]:
+    rows = session.execute(stmt.limit(limit + 1)).all()
+    items = [row._asdict() for row in rows[:limit]]
+    next_cursor = encode_cursor(sort_key(rows[limit - 1])) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def waitlist_page(session: Session, drop_id: uuid.UUID, *, limit: int, cursor: str | None = None) -> dict[str, object]:
+    stmt = _waitlist_select(drop_id)
+    if cursor:
+        stmt = stmt.where(_after_waitlist_cursor(cursor))
+    return _page(session, stmt, limit, lambda row: (row.priority_score, row.joined_at, row.entry_id))
+
+
+def claims_page(session: Session, drop_id: uuid.UUID, *, limit: int, cursor: str | None = None) -> dict[str, object]:
+    stmt = _claims_select(drop_id)
+    if cursor:
+        stmt = stmt.where(_after_claims_cursor(cursor))
+    return _page(session, stmt, limit, lambda row: (row.claimed_at, row.claim_id))
+
+
+def archive_page(session: Session, drop_id: uuid.UUID, *, limit: int, cursor: str | None = None) -> dict[str, object]:
+    stmt = _archive_select(drop_id)
+    if cursor:
+        stmt = stmt.where(_after_archive_cursor(cursor))
+    return _page(session, stmt, limit, lambda row: (row.priority_score, row.joined_at, row.user_id))
+
+
+# --- exports -------------------------------------------------------------------------
+
+
+def _export_select(kind: str, drop_id: uuid.UUID) -> tuple[Select, tuple[str, ...]]:
+    if kind == "waitlist":
+        return _waitlist_select(drop_id), WAITLIST_COLUMNS
+    if kind == "archive":
+        return _archive_select(drop_id), ARCHIVE_COLUMNS
+    return _claims_select(drop_id), CLAIM_COLUMNS
+
+
+class _Encoder:
+    def __init__(self, fmt: ExportFormat, columns: tuple[str, ...]) -> None:
+        self.fmt = fmt
+        self.columns = columns
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+
+    def header(self) -> str:
+        return self.encode_rows([self.columns]) if self.fmt == "csv" else ""
+
+    def encode_rows(self, rows: Iterable[Sequence[object]]) -> str:
+        if self.fmt == "ndjson":
+            return "".join(
+                json.dumps(dict(zip(self.columns, map(_plain, row))), separators=(",", ":")) + "\n" for row in rows
+            )
+        self._writer.writerows([_plain(value) for value in row] for row in rows)
+        chunk = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return chunk
+
+
+def export_rows(session: Session, kind: str, drop_id: uuid.UUID, fmt: ExportFormat) -> Iterator[str]:
+    stmt, columns = _export_select(kind, drop_id)
+    encoder = _Encoder(fmt, columns)
+    yield encoder.header()
+    result = session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for partition in result.partitions():
+        yield encoder.encode_rows(partition)
+
+
+async def export_rows_async(
+    session: AsyncSession, kind: str, drop_id: uuid.UUID, fmt: ExportFormat
+) -> AsyncIterator[str]:
+    stmt, columns = _export_select(kind, drop_id)
+    encoder = _Encoder(fmt, columns)
+    yield encoder.header()
+    result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    async for partition in result.partitions():
+        yield encoder.encode_rows(partition)
+
+
+def export_headers(kind: str, drop_id: uuid.UUID, fmt: ExportFormat) -> tuple[str, dict[str, str]]:
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    extension = "csv" if fmt == "csv" else "ndjson"
+    return media_type, {"Content-Disposition": f'attachment; filename="drop-{drop_id}-{kind}.{extension}"'}
+
+
+__all__ = [
+    "ExportFormat",
+    "archive_page",
+    "claims_page",
+    "decode_cursor",
+    "encode_cursor",
+    "export_headers",
+    "export_rows",
+    "export_rows_async",
+    "waitlist_page",
+]
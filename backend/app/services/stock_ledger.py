@@ -0,0 +1,254 @@
+"""Remaining-stock ledger shared by the workers, so sold-out claims fail before the database.
+
+``claim_drop`` asks the ledger first. For a drop it knows is sold out, the claim costs one
+indexed read (the caller's existing claim, to keep repeat claims idempotent) instead of the
+allocation lookup and the conditional stock UPDATE. Only committed claims lower the ledger,
+so it may lag the database but never runs ahead of it: a stale value costs a trip to the
+database, never a false 409. ``_reserve_claim_slot`` still decides who gets the last unit.
+
+Every drop also has a generation, which ``forget()`` bumps after an admin edit. A claim reads
+the generation before its first statement and passes it to ``observe()``. An observation
+made before the edit committed is then dropped, so it cannot reinstate "sold out" on a
+drop whose stock was just raised.
+
+Backends (``STOCK_LEDGER``):
+
+* ``database`` (default): knows nothing, every claim goes to the database.
+* ``shared_memory``: ``(drop id, remaining)`` slots in a named ``multiprocessing.shared_memory``
+  segment, updated under an ``fcntl`` file lock. Every worker on the host maps the same
+  segment and reconciles it against the ``claims`` table when it starts. POSIX only.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import struct
+import tempfile
+import threading
+import uuid
+from collections.abc import Callable
+from contextlib import contextmanager
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models import Claim, Drop
+from ..singleton import Singleton
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseLedger:
+    """The null ledger: every claim goes to the database, which holds the only count."""
+
+    name = "database"
+
+    def remaining(self, drop_id: uuid.UUID) -> int | None:
+        return None
+
+    def state(self, drop_id: uuid.UUID) -> tuple[int | None, int]:
+        return None, 0
+
+    def observe(self, drop_id: uuid.UUID, remaining: int, generation: int | None = None) -> None:
+        pass
+
+    def set(self, drop_id: uuid.UUID, remaining: int) -> None:
+        pass
+
+    def forget(self, drop_id: uuid.UUID) -> None:
+        pass
+
+    def reconcile(self, session_factory: Callable[[], Session]) -> int:
+        return 0
+
+    def close(self) -> None:
+        pass
+
+
+_SLOT = struct.Struct("<16sqq")  # drop id bytes, remaining (-1 = unknown), generation
+_EMPTY_ID = bytes(16)
+_UNKNOWN = -1
+
+
+class SharedMemoryLedger:
+    """Open-addressed table of per-drop remaining stock in a named shared memory segment."""
+
+    name = "shared_memory"
+
+    def __init__(self, segment: str, *, slots: int = 4096) -> None:
+        import fcntl  # POSIX only; imported here so the module itself stays portable
+        from multiprocessing import resource_tracker, shared_memory
+
+        self._fcntl = fcntl
+        try:
+            self._shm = shared_memory.SharedMemory(name=segment, create=True, size=slots * _SLOT.size)
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name=segment)
+        # the segment outlives any single worker; without this the tracker unlinks it when
+        # the first worker to exit shuts down (fixed by track=False in Python 3.13)
+        resource_tracker.unregister(self._shm._name, "shared_memory")
+        self.slots = self._shm.size // _SLOT.size
+        self._lock_path = os.path.join(tempfile.gettempdir(), f"{segment}.lock")
+        self._lock_fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._thread_lock = threading.Lock()  # flock is per open file, not per thread
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            self._fcntl.flock(self._lock_fd, self._fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                self._fcntl.flock(self._lock_fd, self._fcntl.LOCK_UN)
+
+    def _find(self, key: bytes, *, insert: bool) -> int | None:
+        """Slot index holding ``key`` (or the free slot for it when inserting); caller locks."""
+        start = int.from_bytes(key[:8], "little") % self.slots
+        buf = self._shm.buf
+        for probe in range(self.slots):
+            index = (start + probe) % self.slots
+            slot_key, _, _ = _SLOT.unpack_from(buf, index * _SLOT.size)
+            if slot_key == key:
+                return index
+            if slot_key == _EMPTY_ID:
+                return index if insert else None
+        return None  # full: callers treat the drop as unknown
+
+    def _read(self, index: int) -> tuple[int, int]:
+        key, remaining, generation = _SLOT.unpack_from(self._shm.buf, index * _SLOT.size)
+        return (_UNKNOWN, 0) if key == _EMPTY_ID else (remaining, generation)
+
+    def _write(self, index: int, key: bytes, remaining: int, generation: int) -> None:
+        _SLOT.pack_into(self._shm.buf, index * _SLOT.size, key, remaining, generation)
+
+    def remaining(self, drop_id: uuid.UUID) -> int | None:
+        return self.state(drop_id)[0]
+
+    def state(self, drop_id: uuid.UUID) -> tuple[int | None, int]:
+        """The drop's remaining stock (None when unknown) and its current generation."""
+        with self._locked():
+            index = self._find(drop_id.bytes, insert=False)
+            value, generation = (_UNKNOWN, 0) if index is None else self._read(index)
+        return (None if value == _UNKNOWN else value), generation
+
+    def observe(self, drop_id: uuid.UUID, remaining: int, generation: int | None = None) -> None:
+        """Record a committed remaining count; the ledger only ever moves down this way.
+
+        With ``generation`` (from ``state()`` before the count was read), the observation is
+        dropped if ``forget()`` ran in between.
+        """
+        remaining = max(remaining, 0)
+        with self._locked():
+            index = self._find(drop_id.bytes, insert=True)
+            if index is None:
+                return
+            current, current_generation = self._read(index)
+            if generation is not None and generation != current_generation:
+                return
+            if current == _UNKNOWN or remaining < current:
+                self._write(index, drop_id.bytes, remaining, current_generation)
+
+    def set(self, drop_id: uuid.UUID, remaining: int, generation: int | None = None) -> None:
+        """Overwrite the remaining count, up or down; skipped like ``observe`` on a stale generation."""
+        with self._locked():
+            index = self._find(drop_id.bytes, insert=True)
+            if index is None:
+                return
+            current_generation = self._read(index)[1]
+            if generation is not None and generation != current_generation:
+                return
+            self._write(index, drop_id.bytes, max(remaining, 0), current_generation)
+
+    def _generations(self) -> dict[bytes, int]:
+        with self._locked():
+            buf = self._shm.buf
+            slots = (_SLOT.unpack_from(buf, index * _SLOT.size) for index in range(self.slots))
+            return {key: generation for key, _, generation in slots if key != _EMPTY_ID}
+
+    def forget(self, drop_id: uuid.UUID) -> None:
+        """Mark the drop unknown after an admin edit and void the observations in flight.
+
+        The slot is claimed even for a drop the ledger has not seen yet, so a claim that read
+        generation 0 before the edit still sees the bump. It is kept so probing still works.
+        """
+        with self._locked():
+            index = self._find(drop_id.bytes, insert=True)
+            if index is not None:
+                self._write(index, drop_id.bytes, _UNKNOWN, self._read(index)[1] + 1)
+
+    def reconcile(self, session_factory: Callable[[], Session]) -> int:
+        """Reset every drop's remaining stock from ``stock - count(claims)``; returns the count.
+
+        A drop ``forget()`` bumped while the query ran keeps its unknown count: an admin
+        raising stock meanwhile must not get a stale "sold out" written back over the edit.
+        """
+        generations = self._generations()
+        claimed = select(Claim.drop_id, func.count().label("claimed")).group_by(Claim.drop_id).subquery()
+        stmt = select(Drop.id, Drop.stock - func.coalesce(claimed.c.claimed, 0)).outerjoin(
+            claimed, claimed.c.drop_id == Drop.id
+        )
+        with session_factory() as session:
+            rows = session.execute(stmt).all()
+        for drop_id, remaining in rows:
+            self.set(drop_id, remaining, generations.get(drop_id.bytes, 0))
+        return len(rows)
+
+    def close(self) -> None:
+        # never unlink here: the other workers still map the segment
+        self._shm.close()
+        os.close(self._lock_fd)
+
+    def unlink(self) -> None:
+        """Remove the segment and its lock file once no worker uses them (tests, decommissioning)."""
+        from multiprocessing import shared_memory
+
+        segment = shared_memory.SharedMemory(name=self._shm.name)
+        segment.close()
+        segment.unlink()  # also drops the tracker registration made by the attach above
+        if os.path.exists(self._lock_path):
+            os.unlink(self._lock_path)
+
+
+StockLedger = DatabaseLedger | SharedMemoryLedger
+
+
+def _build_ledger() -> StockLedger:
+    settings = get_settings()
+    if settings.stock_ledger == "shared_memory":
+        return SharedMemoryLedger(settings.stock_ledger_segment, slots=settings.stock_ledger_slots)
+    return DatabaseLedger()
+
+
+_ledger: Singleton[StockLedger] = Singleton(_build_ledger, close=lambda ledger: ledger.close())
+
+
+def get_stock_ledger() -> StockLedger:
+    return _ledger.get()
+
+
+def start_stock_ledger() -> StockLedger:
+    """Attach the configured ledger and reconcile it with the claims table."""
+    from .. import database
+
+    ledger = get_stock_ledger()
+    # late-bound so override_engine() in tests and benchmarks is picked up
+    drops = ledger.reconcile(lambda: database.SessionLocal())
+    if ledger.name != "database":
+        logger.info("stock ledger %s reconciled %d drops", ledger.name, drops)
+    return ledger
+
+
+def shutdown_stock_ledger() -> None:
+    _ledger.shutdown()
+
+
+__all__ = [
+    "DatabaseLedger",
+    "SharedMemoryLedger",
+    "StockLedger",
+    "get_stock_ledger",
+    "shutdown_stock_ledger",
+    "start_stock_ledger",
+]
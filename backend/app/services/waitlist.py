@@ -1,77 +1,109 @@
 from __future__ import annotations
 
-import secrets
-from datetime import datetime, timezone
+import uuid
+from typing import TYPE_CHECKING
 
 from fastapi import HTTPException, status
-from sqlalchemy import func, select
+from sqlalchemy import exists, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from ..models import Claim, Drop, User, WaitlistEntry
+from .. import events, metrics
+from ..clock import ensure_aware, utcnow
+from ..models import Allocation, Claim, Drop, User, WaitlistEntry
+from . import allocation as allocation_service
+from . import archive as archive_service
+from .join_buffer import JoinBuffer, get_join_buffer
 from .seed import compute_priority_score
+from .stock_ledger import get_stock_ledger
 
-
-def _generate_claim_code() -> str:
-    return secrets.token_hex(8)
+if TYPE_CHECKING:
+    from ..auth import Principal
 
 
-def _utcnow() -> datetime:
-    return datetime.now(timezone.utc)
+def _generate_claim_code() -> str:
+    return allocation_service.generate_claim_code()
 
 
 def _ensure_claim_window_open(drop: Drop) -> None:
-    now = _utcnow()
-    claim_open = _ensure_aware(drop.claim_open_at)
-    claim_close = _ensure_aware(drop.claim_close_at)
+    now = utcnow()
+    claim_open = ensure_aware(drop.claim_open_at)
+    claim_close = ensure_aware(drop.claim_close_at)
     if not (claim_open <= now <= claim_close):
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Claim window closed")
 
 
-def _entry_rank(session: Session, entry: WaitlistEntry) -> int:
-    ahead_stmt = (
-        select(func.count())
-        .select_from(WaitlistEntry)
-        .where(WaitlistEntry.drop_id == entry.drop_id)
-        .where(
-            (WaitlistEntry.priority_score > entry.priority_score)
-            | (
-                (WaitlistEntry.priority_score == entry.priority_score)
-                & (WaitlistEntry.joined_at < entry.joined_at)
-            )
-        )
-    )
-    ahead_count = session.scalar(ahead_stmt) or 0
-    return ahead_count
+def _ensure_waitlist_open(drop: Drop) -> None:
+    # a closed drop's entries are archived; a row written after that would stay live forever
+    if utcnow() > ensure_aware(drop.claim_close_at):
+        raise HTTPException(status.HTTP_409_CONFLICT, detail="Waitlist closed")
 
 
-def join_waitlist(session: Session, user: User, drop: Drop) -> tuple[WaitlistEntry, bool]:
-    now = _utcnow()
-    waitlist_open_at = _ensure_aware(drop.waitlist_open_at)
+def new_entry(user: User | Principal, drop: Drop, *, rapid_actions: int = 0) -> WaitlistEntry:
+    """Build (but do not add) the entry for a join arriving now.
+
+    ``joined_at`` and the score are fixed here, at arrival, so a join that waits in the
+    join buffer orders exactly as if it had been written immediately. ``rapid_actions`` is
+    the user's recent join/leave/claim count from ``ratelimit.ActionTracker``. Raises 409
+    once the drop's claim window has closed.
+    """
+    _ensure_waitlist_open(drop)
+    now = utcnow()
+    waitlist_open_at = ensure_aware(drop.waitlist_open_at)
     signup_latency_ms = max(int((now - waitlist_open_at).total_seconds() * 1000), 0)
-    account_created_at = _ensure_aware(user.created_at)
+    account_created_at = ensure_aware(user.created_at)
     account_age_days = max((now - account_created_at).days, 0)
-    rapid_actions = 0  # would be tracked via rate limiter / audit table
     priority = compute_priority_score(
         base=drop.base_priority,
         signup_latency_ms=signup_latency_ms,
         account_age_days=account_age_days,
         rapid_actions=rapid_actions,
     )
+    return WaitlistEntry(
+        id=uuid.uuid4(),
+        user_id=user.id,
+        drop_id=drop.id,
+        joined_at=now,
+        priority_score=priority,
+        status="waiting",
+    )
 
-    stmt = select(WaitlistEntry).where(WaitlistEntry.user_id == user.id, WaitlistEntry.drop_id == drop.id)
+
+def buffered_join_available(drop: Drop) -> JoinBuffer | None:
+    # late joins into a snapshot shift ranks one by one, so they are not worth batching
+    if drop.allocation_built_at is not None:
+        return None
+    return get_join_buffer()
+
+
+def record_join(result: tuple[WaitlistEntry, bool]) -> tuple[WaitlistEntry, bool]:
+    entry, already = result
+    metrics.WAITLIST_JOINS.inc(result="already_joined" if already else "joined")
+    if not already:
+        events.publish(entry.drop_id)
+    return result
+
+
+def join_waitlist(
+    session: Session, user: User | Principal, drop: Drop, *, rapid_actions: int = 0
+) -> tuple[WaitlistEntry, bool]:
+    entry = new_entry(user, drop, rapid_actions=rapid_actions)
+    buffer = buffered_join_available(drop)
+    if buffer is not None:
+        return record_join(buffer.join(entry))
+    return record_join(insert_entry(session, drop, entry))
+
+
+def insert_entry(session: Session, drop: Drop, entry: WaitlistEntry) -> tuple[WaitlistEntry, bool]:
+    stmt = select(WaitlistEntry).where(WaitlistEntry.user_id == entry.user_id, WaitlistEntry.drop_id == drop.id)
     existing = session.scalar(stmt)
     if existing:
         return existing, True
 
-    entry = WaitlistEntry(
-        user_id=user.id,
-        drop_id=drop.id,
-        priority_score=priority,
-    )
+    allocation_built_at = allocation_service.lock_snapshot(session, drop)
     session.add(entry)
     try:
-        session.commit()
+        session.flush()
     except IntegrityError as exc:
         session.rollback()
         existing = session.scalar(stmt)
@@ -79,53 +111,241 @@ def join_waitlist(session: Session, user: User, drop: Drop) -> tuple[WaitlistEnt
             return existing, True
         raise HTTPException(status.HTTP_409_CONFLICT, detail="Waitlist join conflict") from exc
 
-    session.refresh(entry)
+    if allocation_built_at is not None:
+        allocation_service.place_entry(session, drop, entry)
+    # every column was set in new_entry; detach so the commit does not expire them
+    session.expunge(entry)
+    session.commit()
     return entry, False
 
 
-def leave_waitlist(session: Session, user: User, drop: Drop) -> bool:
+def leave_waitlist(session: Session, user: User | Principal, drop: Drop) -> bool:
+    _ensure_waitlist_open(drop)
     stmt = select(WaitlistEntry).where(WaitlistEntry.user_id == user.id, WaitlistEntry.drop_id == drop.id)
     entry = session.scalar(stmt)
     if not entry:
         return False
 
+    drop_id = drop.id
+    if allocation_service.lock_snapshot(session, drop) is not None:
+        allocation_service.remove_entry(session, drop, user.id)
     session.delete(entry)
     session.commit()
+    events.publish(drop_id)
     return True
 
 
-def claim_drop(session: Session, user: User, drop: Drop) -> Claim:
+def waitlist_status(
+    session: Session, user: User | Principal, drop_id, *, build_snapshot: bool = True
+) -> dict[str, object] | None:
+    """The caller's entry, rank and eligibility.
+
+    Once the claim window is open the snapshot is built first. With ``build_snapshot=False``
+    (a replica session) that case returns None instead, for the caller to retry on the primary.
+    """
+    stmt = (
+        select(WaitlistEntry, Allocation, Drop.claim_open_at, Drop.allocation_built_at)
+        .join(Drop, Drop.id == WaitlistEntry.drop_id)
+        .outerjoin(
+            Allocation,
+            (Allocation.drop_id == WaitlistEntry.drop_id) & (Allocation.user_id == WaitlistEntry.user_id),
+        )
+        .where(WaitlistEntry.user_id == user.id, WaitlistEntry.drop_id == drop_id)
+    )
+    row = session.execute(stmt).first()
+    if row is None:
+        return archive_service.archived_status(session, user.id, drop_id) or {"status": "not_registered"}
+
+    entry, allocation, claim_open_at, allocation_built_at = row
+    if allocation_built_at is None and utcnow() >= ensure_aware(claim_open_at):
+        if not build_snapshot:
+            return None
+        allocation_service.ensure_snapshot(session, entry.drop)
+        entry, allocation, _, _ = session.execute(stmt).one()
+
+    result: dict[str, object] = {
+        "status": entry.status,
+        "priority_score": float(entry.priority_score),
+        "joined_at": entry.joined_at,
+    }
+    if allocation is not None:
+        result["rank"] = allocation.rank
+        result["eligible"] = allocation.eligible
+    return result
+
+
+def _reserve_claim_slot(session: Session, drop: Drop) -> tuple[int, int] | None:
+    """Atomically take one unit of stock; returns (claimed_count, stock), or None when sold out."""
+    stmt = (
+        update(Drop)
+        .where(Drop.id == drop.id, Drop.claimed_count < Drop.stock)
+        # keep updated_at untouched: a claim is not an edit of the drop
+        .values(claimed_count=Drop.claimed_count + 1, updated_at=Drop.updated_at)
+        .returning(Drop.claimed_count, Drop.stock)
+        .execution_options(synchronize_session=False)
+    )
+    row = session.execute(stmt).first()
+    return None if row is None else (row.claimed_count, row.stock)
+
+
+def _sold_out_claim(session: Session, user: User | Principal, drop: Drop) -> Claim:
+    """Answer a claim on a drop the stock ledger knows is sold out: the caller's claim, or 409."""
+    existing_claim = session.scalar(select(Claim).where(Claim.user_id == user.id, Claim.drop_id == drop.id))
+    if existing_claim:
+        metrics.CLAIMS.inc(result="existing")
+        return existing_claim
+    metrics.CLAIM_CONFLICTS.inc(reason="sold_out")
+    raise HTTPException(status.HTTP_409_CONFLICT, detail="No remaining claim slots")
+
+
+def claim_drop(
+    session: Session, user: User | Principal, drop: Drop, *, ledger_generation: int | None = None
+) -> Claim:
+    """Claim ``drop`` for ``user``, or return their existing claim.
+
+    The stock ledger is only fed counts returned by this claim's own UPDATE, tagged with
+    ``ledger_generation``. Pass it if the ledger was read before ``drop`` was loaded.
+    """
     _ensure_claim_window_open(drop)
+    ledger = get_stock_ledger()
+    remaining, generation = ledger.state(drop.id)
+    if ledger_generation is not None:
+        generation = ledger_generation
+    if remaining == 0:
+        return _sold_out_claim(session, user, drop)
+    allocation_service.ensure_snapshot(session, drop)
 
-    stmt = select(WaitlistEntry).where(WaitlistEntry.user_id == user.id, WaitlistEntry.drop_id == drop.id)
-    entry = session.scalar(stmt)
-    if not entry:
+    lookup_stmt = (
+        select(Allocation.eligible, Claim)
+        .outerjoin(Claim, (Claim.drop_id == Allocation.drop_id) & (Claim.user_id == Allocation.user_id))
+        .where(Allocation.drop_id == drop.id, Allocation.user_id == user.id)
+    )
+    row = session.execute(lookup_stmt).first()
+    if row is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Waitlist entry not found")
 
-    existing_claim_stmt = select(Claim).where(Claim.user_id == user.id, Claim.drop_id == drop.id)
-    existing_claim = session.scalar(existing_claim_stmt)
+    eligible, existing_claim = row
     if existing_claim:
+        metrics.CLAIMS.inc(result="existing")
         return existing_claim
 
-    total_claims_stmt = select(func.count()).select_from(Claim).where(Claim.drop_id == drop.id)
-    total_claims = session.scalar(total_claims_stmt) or 0
-    if total_claims >= drop.stock:
+    # drop may predate an admin edit, so this 409 is not recorded in the ledger
+    if not eligible or drop.claimed_count >= drop.stock:
+        metrics.CLAIM_CONFLICTS.inc(reason="not_eligible" if not eligible else "sold_out")
         raise HTTPException(status.HTTP_409_CONFLICT, detail="No remaining claim slots")
 
-    rank = _entry_rank(session, entry)
-    if rank >= drop.stock:
+    # The conditional UPDATE is the only stock check that matters under concurrency: it
+    # serialises on the drop row, so two workers can never both take the last slot.
+    reserved = _reserve_claim_slot(session, drop)
+    if reserved is None:
+        session.rollback()
+        ledger.observe(drop.id, 0, generation)
+        metrics.CLAIM_CONFLICTS.inc(reason="sold_out")
         raise HTTPException(status.HTTP_409_CONFLICT, detail="No remaining claim slots")
+    return _record_claim(session, user, drop.id, *reserved, ledger_generation=generation)
 
-    claim_code = _generate_claim_code()
-    claim = Claim(user_id=user.id, drop_id=drop.id, claim_code=claim_code)
+
+def _record_claim(
+    session: Session,
+    user: User | Principal,
+    drop_id: uuid.UUID,
+    claimed_count: int,
+    stock: int,
+    *,
+    ledger_generation: int,
+) -> Claim:
+    """Write the claim for a reserved slot, mark the entry claimed and commit."""
+    claim = Claim(
+        id=uuid.uuid4(),
+        user_id=user.id,
+        drop_id=drop_id,
+        claim_code=_generate_claim_code(),
+        claimed_at=utcnow(),
+    )
     session.add(claim)
-    entry.status = "claimed"
-    session.add(entry)
+    session.execute(
+        update(WaitlistEntry)
+        .where(WaitlistEntry.user_id == user.id, WaitlistEntry.drop_id == drop_id)
+        .values(status="claimed")
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        session.flush()
+    except IntegrityError as exc:
+        # a concurrent request from the same user won; rolling back also releases our slot
+        session.rollback()
+        existing_claim = session.scalar(
+            select(Claim).where(Claim.user_id == user.id, Claim.drop_id == drop_id)
+        )
+        if existing_claim:
+            metrics.CLAIMS.inc(result="existing")
+            return existing_claim
+        metrics.CLAIM_CONFLICTS.inc(reason="race")
+        raise HTTPException(status.HTTP_409_CONFLICT, detail="Claim conflict") from exc
+
+    # detach before commit so the caller can read the claim without a refresh round trip
+    session.expunge(claim)
     session.commit()
-    session.refresh(claim)
-    session.refresh(entry)
+    get_stock_ledger().observe(drop_id, stock - claimed_count, ledger_generation)
+    metrics.CLAIMS.inc(result="created")
+    events.publish(drop_id)
     return claim
 
 
-def _ensure_aware(dt: datetime) -> datetime:
-    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+def _reserve_eligible_slot(session: Session, user: User | Principal, drop_id: uuid.UUID) -> tuple[int, int] | None:
+    """Take a unit of stock if the caller can claim right now; returns (claimed_count, stock).
+
+    One UPDATE checks the claim window, the stock, the caller's eligibility in the snapshot
+    and the absence of an earlier claim. None means one of those failed, or there is no
+    snapshot yet, and ``claim_drop`` has to work out which.
+    """
+    now = utcnow()
+    stmt = (
+        update(Drop)
+        .where(
+            Drop.id == drop_id,
+            Drop.claim_open_at <= now,
+            Drop.claim_close_at >= now,
+            Drop.claimed_count < Drop.stock,
+            exists().where(
+                Allocation.drop_id == drop_id, Allocation.user_id == user.id, Allocation.eligible.is_(True)
+            ),
+            ~exists().where(Claim.drop_id == drop_id, Claim.user_id == user.id),
+        )
+        .values(claimed_count=Drop.claimed_count + 1, updated_at=Drop.updated_at)
+        .returning(Drop.claimed_count, Drop.stock)
+        .execution_options(synchronize_session=False)
+    )
+    row = session.execute(stmt).first()
+    return None if row is None else (row.claimed_count, row.stock)
+
+
+def claim_drop_by_id(session: Session, user: User | Principal, drop_id: uuid.UUID) -> Claim:
+    """``claim_drop`` for the claim endpoints, which start from the id alone.
+
+    The caller's claim is looked up first: a push drop issued it at claim open, so its
+    winners only read the code and never write the drop row. Otherwise a winner claiming an
+    open drop takes three more statements: the reserving UPDATE, the entry's status and the
+    claim INSERT. Anything else (no snapshot yet, a loser, a closed window) falls back to
+    loading the drop and running ``claim_drop``, which tells those cases apart.
+    """
+    # read before the drop row, so a restock between the two voids this claim's observation
+    remaining, generation = get_stock_ledger().state(drop_id)
+    lookup_stmt = (
+        select(Drop, Claim)
+        .outerjoin(Claim, (Claim.drop_id == Drop.id) & (Claim.user_id == user.id))
+        .where(Drop.id == drop_id)
+    )
+    row = session.execute(lookup_stmt).first()
+    if row is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Drop not found")
+    drop, existing_claim = row
+    if existing_claim is not None:
+        metrics.CLAIMS.inc(result="existing")
+        return existing_claim
+
+    if remaining != 0:
+        reserved = _reserve_eligible_slot(session, user, drop_id)
+        if reserved is not None:
+            return _record_claim(session, user, drop_id, *reserved, ledger_generation=generation)
+    return claim_drop(session, user, drop, ledger_generation=generation)
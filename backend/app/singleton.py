@@ -0,0 +1,47 @@
+"""Process-wide instances that are built on first use and torn down at shutdown.
+
+The hasher pool, the join buffer, the drop scheduler, the stock ledger and the like each
+exist once per worker process. None of them is built at import, so importing the app
+stays free of threads, pools and database work.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class Singleton(Generic[T]):
+    """``get()`` builds the instance once; ``shutdown()`` drops it and hands it to ``close``.
+
+    ``build`` may return None (the feature is off, or unsupported here); nothing is kept
+    then and the next ``get()`` asks again.
+    """
+
+    def __init__(self, build: Callable[[], T | None], close: Callable[[T], object] | None = None) -> None:
+        self._build = build
+        self._close = close
+        self._instance: T | None = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T | None:
+        with self._lock:
+            if self._instance is None:
+                self._instance = self._build()
+            return self._instance
+
+    def current(self) -> T | None:
+        """The instance if one was built, without building it."""
+        return self._instance
+
+    def shutdown(self) -> None:
+        with self._lock:
+            instance, self._instance = self._instance, None
+        if instance is not None and self._close is not None:
+            self._close(instance)
+
+
+__all__ = ["Singleton"]
@@ -0,0 +1,146 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks are plain scripts, run from the ``backend`` directory::
+
+    python -m benchmarks.claim_concurrency --database-url postgresql://localhost/dropspot_bench
+
+They default to a throwaway SQLite file so they can run without any setup.
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import tempfile
+import uuid
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+
+from app.database import Base
+from app.models import Drop, User, WaitlistEntry
+
+
+def bench_uuid() -> uuid.UUID:
+    """A uuid4 whose hex form SQLite cannot mistake for a number.
+
+    Before migration 0005 the id columns held hex text in columns with NUMERIC affinity on
+    SQLite, so the roughly one-in-a-million hex strings made only of digits (plus at most
+    one ``e``) were stored as REAL. Benchmarks that load millions of rows into that legacy
+    schema would hit one for certain.
+    """
+    while True:
+        value = uuid.uuid4()
+        if sum(char in "abcdf" for char in value.hex) > 0:
+            return value
+
+
+def temp_sqlite_url(prefix: str = "dropspot-bench-") -> str:
+    tmpdir = tempfile.mkdtemp(prefix=prefix)
+    return f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+
+def make_engine(database_url: str | None, **kwargs) -> Engine:
+    url = database_url or temp_sqlite_url()
+    connect_args: dict[str, object] = {}
+    if url.startswith("sqlite"):
+        connect_args["check_same_thread"] = False
+    engine = create_engine(url, future=True, connect_args=connect_args, **kwargs)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_ms(values: Sequence[float]) -> dict[str, float]:
+    return {
+        "n": len(values),
+        "mean": statistics.fmean(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+def print_table(headers: Sequence[str], rows: Iterable[Sequence[object]]) -> None:
+    rendered = [[_fmt(cell) for cell in row] for row in rows]
+    widths = [max(len(h), *(len(r[i]) for r in rendered)) if rendered else len(h) for i, h in enumerate(headers)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rendered:
+        print("  ".join(cell.ljust(w) for cell, w in zip(row, widths)))
+
+
+def _fmt(value: object) -> str:
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def create_open_drop(engine: Engine, *, stock: int, title: str = "Benchmark drop") -> uuid.UUID:
+    """Insert a drop whose waitlist and claim windows are both open right now."""
+    now = datetime.now(timezone.utc)
+    drop_id = bench_uuid()
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Drop),
+            [
+                {
+                    "id": drop_id,
+                    "title": title,
+                    "stock": stock,
+                    "waitlist_open_at": now - timedelta(hours=1),
+                    "claim_open_at": now - timedelta(minutes=1),
+                    "claim_close_at": now + timedelta(hours=1),
+                    "base_priority": 0,
+                    "claimed_count": 0,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            ],
+        )
+    return drop_id
+
+
+def populate_waitlist(engine: Engine, drop_id: uuid.UUID, size: int, *, batch_size: int = 10_000) -> list[uuid.UUID]:
+    """Bulk-insert ``size`` users plus waitlist entries with distinct priorities; returns user ids."""
+    now = datetime.now(timezone.utc)
+    user_ids: list[uuid.UUID] = []
+    run = uuid.uuid4().hex[:8]
+    for start in range(0, size, batch_size):
+        users = []
+        entries = []
+        for i in range(start, min(size, start + batch_size)):
+            user_id = bench_uuid()
+            user_ids.append(user_id)
+            users.append(
+                {
+                    "id": user_id,
+                    "email": f"bench-{run}-{i}@example.com",
+                    "password_hash": "x",
+                    "is_admin": False,
+                    "created_at": now,
+                }
+            )
+            entries.append(
+                {
+                    "id": bench_uuid(),
+                    "user_id": user_id,
+                    "drop_id": drop_id,
+                    "joined_at": now + timedelta(microseconds=i),
+                    "priority_score": (i * 7919) % 1000,
+                    "status": "waiting",
+                }
+            )
+        with engine.begin() as conn:
+            conn.execute(insert(User), users)
+            conn.execute(insert(WaitlistEntry), entries)
+    return user_ids
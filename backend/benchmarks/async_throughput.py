@@ -0,0 +1,113 @@
+"""Request throughput of the sync (threadpool) and async (AsyncSession) database modes.
+
+Drives the real application in-process through ``httpx.ASGITransport`` with many
+concurrent clients, so the sync mode is bounded by Starlette's threadpool exactly as it is
+under uvicorn.
+
+    python -m benchmarks.async_throughput --concurrency 200 --requests 4000
+    python -m benchmarks.async_throughput --database-url postgresql://localhost/dropspot_bench
+
+The async run uses the same database through aiosqlite / asyncpg (``to_async_url``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+
+import httpx
+from sqlalchemy.orm import Session
+
+from app import database
+from app.auth import create_access_token
+from app.config import get_settings
+from app.models import Drop
+from app.services import allocation
+
+from ._common import create_open_drop, make_engine, populate_waitlist, print_table, summarize_ms, temp_sqlite_url
+
+
+async def _drive(app, paths: list[tuple[str, dict[str, str]]], concurrency: int) -> tuple[float, list[float], Counter]:
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in paths:
+        queue.put_nowait(item)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker() -> None:
+            while not queue.empty():
+                path, headers = queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return elapsed, latencies, statuses
+
+
+def run(mode: str, database_url: str, total: int, concurrency: int, users: int) -> list[object]:
+    engine = make_engine(database_url, pool_size=concurrency, max_overflow=0)
+    database.override_engine(engine)
+    drop_id = create_open_drop(engine, stock=10)
+    user_ids = populate_waitlist(engine, drop_id, users)
+    with Session(engine) as session:
+        # build the allocation snapshot up front so the run measures steady-state reads
+        allocation.ensure_snapshot(session, session.get(Drop, drop_id))
+    tokens = [create_access_token(str(user_id)) for user_id in user_ids]
+
+    os.environ["DATABASE_MODE"] = mode
+    get_settings.cache_clear()
+    if mode == "async":
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        async_engine = create_async_engine(database.to_async_url(database_url), pool_size=concurrency, max_overflow=0)
+        database.override_async_engine(async_engine)
+
+    from app.main import create_application
+
+    app = create_application()
+    # half anonymous catalog reads, half authenticated status polls
+    paths = [
+        ("/drops", {}) if i % 2 == 0 else (f"/drops/{drop_id}/waitlist/me", {"Authorization": f"Bearer {tokens[i % len(tokens)]}"})
+        for i in range(total)
+    ]
+
+    async def _run():
+        result = await _drive(app, paths, concurrency)
+        if mode == "async":
+            await database.get_async_engine().dispose()
+        return result
+
+    elapsed, latencies, statuses = asyncio.run(_run())
+    engine.dispose()
+    stats = summarize_ms(latencies)
+    return [mode, engine.dialect.name, concurrency, total / elapsed, stats["p50"], stats["p95"], stats["p99"], dict(statuses)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="sync URL; defaults to a temporary SQLite file")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--modes", default="sync,async")
+    args = parser.parse_args()
+
+    rows = []
+    for mode in args.modes.split(","):
+        url = args.database_url or temp_sqlite_url()
+        rows.append(run(mode, url, args.requests, args.concurrency, args.users))
+    print_table(["mode", "backend", "concurrency", "req/s", "p50 ms", "p95 ms", "p99 ms", "statuses"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Thundering-herd benchmark for the claim path.
+
+Every waitlisted user tries to claim at once from a pool of worker threads. A share of
+the winners immediately leave the waitlist again, which promotes the next users in line
+into the eligible top-``stock`` set -- exactly the interleaving that used to let two
+workers both read ``count(claims) < stock`` and oversell.
+
+    python -m benchmarks.claim_concurrency --users 2000 --stock 200 --workers 32
+    python -m benchmarks.claim_concurrency --database-url postgresql://localhost/dropspot_bench
+
+``--strategy naive`` runs the old read-count-then-insert logic for comparison.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import secrets
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models import Claim, Drop, WaitlistEntry
+from app.services import allocation as allocation_service
+from app.services import waitlist as waitlist_service
+
+from ._common import create_open_drop, make_engine, populate_waitlist, print_table
+
+
+def _naive_claim(session: Session, user, drop: Drop) -> Claim:
+    """The pre-counter claim logic: check-then-act on ``count(claims)``."""
+    entry = session.scalar(
+        select(WaitlistEntry).where(WaitlistEntry.user_id == user.id, WaitlistEntry.drop_id == drop.id)
+    )
+    if not entry:
+        raise HTTPException(404, detail="Waitlist entry not found")
+    total_claims = session.scalar(select(func.count()).select_from(Claim).where(Claim.drop_id == drop.id)) or 0
+    if total_claims >= drop.stock:
+        raise HTTPException(409, detail="No remaining claim slots")
+    if allocation_service.entry_rank(session, entry) >= drop.stock:
+        raise HTTPException(409, detail="No remaining claim slots")
+    claim = Claim(user_id=user.id, drop_id=drop.id, claim_code=secrets.token_hex(8))
+    session.add(claim)
+    entry.status = "claimed"
+    session.commit()
+    return claim
+
+
+def run(database_url: str | None, users: int, stock: int, workers: int, churn: float, strategy: str) -> dict:
+    engine = make_engine(database_url, pool_size=workers, max_overflow=workers)
+    SessionFactory = sessionmaker(bind=engine, autoflush=False, future=True)
+    drop_id = create_open_drop(engine, stock=stock)
+    user_ids = populate_waitlist(engine, drop_id, users)
+    random.shuffle(user_ids)
+    claim_fn = waitlist_service.claim_drop if strategy == "atomic" else _naive_claim
+    outcomes: Counter[str] = Counter()
+
+    def attempt(user_id: uuid.UUID) -> str:
+        user = SimpleNamespace(id=user_id)
+        with SessionFactory() as session:
+            drop = session.get(Drop, drop_id)
+            try:
+                claim_fn(session, user, drop)
+            except HTTPException as exc:
+                session.rollback()
+                return f"http_{exc.status_code}"
+            except Exception as exc:  # lock timeouts, serialization failures, ...
+                session.rollback()
+                return type(exc).__name__
+            if random.random() < churn:
+                waitlist_service.leave_waitlist(session, user, drop)
+            return "claimed"
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for outcome in pool.map(attempt, user_ids):
+            outcomes[outcome] += 1
+    elapsed = time.perf_counter() - started
+
+    with SessionFactory() as session:
+        total_claims = session.scalar(select(func.count()).select_from(Claim).where(Claim.drop_id == drop_id)) or 0
+        claimed_count = session.scalar(select(Drop.claimed_count).where(Drop.id == drop_id))
+    engine.dispose()
+    return {
+        "backend": engine.dialect.name,
+        "strategy": strategy,
+        "attempts_per_s": users / elapsed,
+        "claims_per_s": outcomes["claimed"] / elapsed,
+        "claims": total_claims,
+        "claimed_count": claimed_count,
+        "oversell": max(total_claims - stock, 0),
+        "outcomes": dict(outcomes),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--churn", type=float, default=0.5, help="share of winners that leave right after claiming")
+    parser.add_argument("--strategy", choices=["atomic", "naive", "both"], default="both")
+    args = parser.parse_args()
+
+    strategies = ["atomic", "naive"] if args.strategy == "both" else [args.strategy]
+    results = [run(args.database_url, args.users, args.stock, args.workers, args.churn, s) for s in strategies]
+    print_table(
+        ["backend", "strategy", "attempts/s", "claims/s", "claims", "claimed_count", "oversell", "outcomes"],
+        [
+            [r["backend"], r["strategy"], r["attempts_per_s"], r["claims_per_s"], r["claims"], r["claimed_count"], r["oversell"], r["outcomes"]]
+            for r in results
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Row size and ranking cost of ``waitlist_entries`` before and after migration 0005.
+
+Builds a SQLite database at revision 0004 (hex-text UUIDs, ``NUMERIC(10, 4)`` scores,
+``VARCHAR`` statuses) holding one drop with ``--entries`` waitlist entries. It measures
+the table, then migrates it to head (16-byte UUIDs, scaled-integer scores, small-integer
+statuses) and measures again. Both phases run ``VACUUM`` first, so the sizes are those of
+freshly packed b-trees.
+
+Measured per phase:
+
+* bytes of the table and of each index (``dbstat``), and per row,
+* ``entry_rank``'s two range counts for sampled entries,
+* the window query that builds the allocation snapshot over the whole drop.
+
+    python -m benchmarks.compact_storage --entries 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+
+from ._common import bench_uuid, print_table, summarize_ms, temp_sqlite_url
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+RANK_SQL = text(
+    "SELECT (SELECT count(*) FROM waitlist_entries WHERE drop_id = :drop_id AND priority_score > :score)"
+    " + (SELECT count(*) FROM waitlist_entries"
+    " WHERE drop_id = :drop_id AND priority_score = :score AND joined_at < :joined_at)"
+)
+SNAPSHOT_SQL = text(
+    "SELECT count(*) FROM (SELECT row_number() OVER (ORDER BY priority_score DESC, joined_at) AS rank"
+    " FROM waitlist_entries WHERE drop_id = :drop_id)"
+)
+
+
+def _alembic_config(url: str) -> Config:
+    config = Config(str(BACKEND / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND / "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def _populate_legacy(conn: Connection, entries: int, batch_size: int = 50_000) -> None:
+    """Rows as the 0004 schema stored them; no users, since SQLite does not enforce the FKs."""
+    drop_id = bench_uuid().hex
+    started = datetime(2026, 1, 1)
+    for start in range(0, entries, batch_size):
+        conn.exec_driver_sql(
+            "INSERT INTO waitlist_entries (id, user_id, drop_id, joined_at, priority_score, status)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    bench_uuid().hex,
+                    bench_uuid().hex,
+                    drop_id,
+                    str(started + timedelta(microseconds=i * 37)),
+                    ((i * 7919) % 100_000) / 100,
+                    "waiting",
+                )
+                for i in range(start, min(entries, start + batch_size))
+            ],
+        )
+
+
+def _measure(url: str, samples: int) -> tuple[list[list[object]], dict[str, float]]:
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+        rows = conn.execute(text("SELECT count(*) FROM waitlist_entries")).scalar_one()
+        sizes = conn.execute(
+            text(
+                "SELECT name, sum(pgsize) FROM dbstat WHERE name IN"
+                " (SELECT name FROM sqlite_schema WHERE tbl_name = 'waitlist_entries') GROUP BY name ORDER BY name"
+            )
+        ).all()
+        picks = conn.execute(
+            text(f"SELECT drop_id, priority_score, joined_at FROM waitlist_entries ORDER BY random() LIMIT {samples}")
+        ).all()
+        rank_ms = []
+        for drop_id, score, joined_at in picks:
+            started = time.perf_counter()
+            conn.execute(RANK_SQL, {"drop_id": drop_id, "score": score, "joined_at": joined_at}).scalar_one()
+            rank_ms.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        conn.execute(SNAPSHOT_SQL, {"drop_id": picks[0].drop_id}).scalar_one()
+        snapshot_ms = (time.perf_counter() - started) * 1000
+    engine.dispose()
+
+    size_rows = [[name, size / 2**20, size / rows] for name, size in sizes]
+    size_rows.append(["total", sum(size for _, size in sizes) / 2**20, sum(size for _, size in sizes) / rows])
+    ranked = summarize_ms(rank_ms)
+    return size_rows, {"rank p50": ranked["p50"], "rank p99": ranked["p99"], "snapshot": snapshot_ms}
+
+
+def run(entries: int, samples: int) -> None:
+    url = temp_sqlite_url("dropspot-compact-")
+    config = _alembic_config(url)
+    command.upgrade(config, "0004")
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        _populate_legacy(conn, entries)
+    engine.dispose()
+
+    legacy_sizes, legacy_times = _measure(url, samples)
+    started = time.perf_counter()
+    command.upgrade(config, "head")
+    migration_s = time.perf_counter() - started
+    compact_sizes, compact_times = _measure(url, samples)
+
+    print(f"{entries} entries, migration 0004 -> head took {migration_s:.1f}s\n")
+    print_table(
+        ["b-tree", "0004 MiB", "0004 bytes/row", "head MiB", "head bytes/row"],
+        [[*legacy, *compact[1:]] for legacy, compact in zip(legacy_sizes, compact_sizes)],
+    )
+    print()
+    print_table(
+        ["query", "0004 ms", "head ms"],
+        [[name, legacy_times[name], compact_times[name]] for name in legacy_times],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=200_000)
+    parser.add_argument("--samples", type=int, default=500, help="rank lookups timed per phase")
+    args = parser.parse_args()
+    run(args.entries, args.samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Database load of the live drop event stream as the number of watchers grows.
+
+Connects ``--watchers`` subscribers to one drop's ``DropEventBroker`` and fires a burst
+of join events. It then reports the SQL statements the shared publisher issued and how
+long the last watcher waited for its update. The polling equivalent is one
+``GET /waitlist/me`` per watcher per poll, i.e. at least ``watchers`` queries per interval.
+
+    python -m benchmarks.event_fanout --watchers 100,1000,5000 --waitlist 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.events import DropEventBroker
+from app.models import Drop
+from app.services import waitlist as waitlist_service
+
+from ._common import bench_uuid, create_open_drop, make_engine, populate_waitlist, print_table
+
+
+def run(database_url: str | None, watchers: int, waitlist_size: int, joins: int) -> list[object]:
+    engine = make_engine(database_url)
+    drop_id = create_open_drop(engine, stock=100)
+    user_ids = populate_waitlist(engine, drop_id, max(waitlist_size, watchers))
+    SessionFactory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    with SessionFactory() as session:
+        drop = session.get(Drop, drop_id)
+        # measure the live (pre-snapshot) ranking, the more expensive of the two paths
+        drop.allocation_built_at = None
+        session.commit()
+        session.expunge(drop)
+
+    statements = 0
+
+    def count(*_: object) -> None:
+        nonlocal statements
+        statements += 1
+
+    broker = DropEventBroker(SessionFactory, debounce_ms=50, resync_seconds=3600)
+
+    async def scenario() -> tuple[int, float]:
+        nonlocal statements
+        subscribers = [await broker.subscribe(drop_id, user_id) for user_id in user_ids[:watchers]]
+        await asyncio.gather(*(s.next(timeout=30) for s in subscribers))
+
+        event.listen(engine, "before_cursor_execute", count)
+        started = time.perf_counter()
+        with SessionFactory() as session:
+            for _ in range(joins):
+                user = SimpleNamespace(id=bench_uuid(), created_at=drop.created_at)
+                entry = waitlist_service.new_entry(user, drop)
+                entry.priority_score = 10_000  # jump the queue so every watcher's rank moves
+                session.add(entry)
+                session.commit()
+                broker.publish(drop_id)
+        await asyncio.gather(*(s.next(timeout=30) for s in subscribers))
+        elapsed = (time.perf_counter() - started) * 1000
+        event.remove(engine, "before_cursor_execute", count)
+        for subscriber in subscribers:
+            broker.unsubscribe(subscriber)
+        return statements, elapsed
+
+    publisher_statements, fanout_ms = asyncio.run(scenario())
+    engine.dispose()
+    # the joins themselves issue one INSERT each; the rest is the shared publisher
+    return [watchers, joins, publisher_statements - joins, fanout_ms, watchers]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file per run")
+    parser.add_argument("--watchers", default="10,100,1000", help="comma separated watcher counts")
+    parser.add_argument("--waitlist", type=int, default=5_000)
+    parser.add_argument("--joins", type=int, default=50)
+    args = parser.parse_args()
+
+    rows = [run(args.database_url, int(w), args.waitlist, args.joins) for w in args.watchers.split(",")]
+    print_table(["watchers", "join events", "publisher SQL", "all updated ms", "polling SQL per interval"], rows)
+
+
+if __name__ == "__main__":
+    main()
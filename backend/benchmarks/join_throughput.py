@@ -0,0 +1,111 @@
+"""Waitlist join throughput during an opening burst, with and without group commit.
+
+``--joins`` distinct users join one drop from ``--concurrency`` threads, first through
+the unbuffered path (one transaction per join), then through ``JoinBuffer`` for each
+requested batching window. A tenth of the joins are repeats, so the ``already_joined``
+path is exercised too.
+
+    python -m benchmarks.join_throughput --joins 5000 --concurrency 64 --windows 2,5,10
+    python -m benchmarks.join_throughput --database-url postgresql://localhost/dropspot_bench
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Drop, User, WaitlistEntry
+from app.services import waitlist as waitlist_service
+from app.services.join_buffer import JoinBuffer
+
+from ._common import bench_uuid, make_engine, print_table, summarize_ms
+
+
+def _setup(database_url: str | None, joins: int, concurrency: int):
+    engine = make_engine(database_url, pool_size=concurrency, max_overflow=concurrency)
+    now = datetime.now(timezone.utc)
+    users = [SimpleNamespace(id=bench_uuid(), created_at=now - timedelta(days=i % 365)) for i in range(joins)]
+    drop = Drop(
+        id=bench_uuid(),
+        title="Join burst",
+        stock=100,
+        waitlist_open_at=now,
+        claim_open_at=now + timedelta(hours=1),
+        claim_close_at=now + timedelta(hours=2),
+        base_priority=0,
+    )
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [{"id": u.id, "email": f"join-{u.id.hex}@example.com", "password_hash": "x", "created_at": u.created_at} for u in users],
+        )
+    SessionFactory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    with SessionFactory() as session:
+        session.add(drop)
+        session.commit()
+        session.expunge(drop)
+    return engine, SessionFactory, drop, users
+
+
+def run(database_url: str | None, joins: int, concurrency: int, window_ms: float) -> list[object]:
+    engine, SessionFactory, drop, users = _setup(database_url, joins, concurrency)
+    requests = users + random.sample(users, joins // 10)
+    random.shuffle(requests)
+    buffer = JoinBuffer(SessionFactory, window_ms=window_ms, max_batch=1_000) if window_ms else None
+
+    def join(user) -> tuple[float, bool]:
+        started = time.perf_counter()
+        entry = waitlist_service.new_entry(user, drop)
+        if buffer is not None:
+            _, already = buffer.join(entry)
+        else:
+            with SessionFactory() as session:
+                _, already = waitlist_service.insert_entry(session, drop, entry)
+        return (time.perf_counter() - started) * 1000, already
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(join, requests))
+    elapsed = time.perf_counter() - started
+    stats = buffer.stats() if buffer is not None else {"avg_batch": 1.0}
+    if buffer is not None:
+        buffer.close()
+
+    with SessionFactory() as session:
+        stored = session.scalar(select(func.count()).select_from(WaitlistEntry).where(WaitlistEntry.drop_id == drop.id))
+    engine.dispose()
+
+    latency = summarize_ms([ms for ms, _ in results])
+    repeats = sum(already for _, already in results)
+    return [
+        f"{window_ms:g} ms" if window_ms else "unbuffered",
+        len(requests) / elapsed,
+        latency["p50"],
+        latency["p99"],
+        stats["avg_batch"],
+        stored == joins and repeats == len(requests) - joins,
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file per run")
+    parser.add_argument("--joins", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--windows", default="2,5", help="comma separated batching windows in ms")
+    args = parser.parse_args()
+
+    rows = [run(args.database_url, args.joins, args.concurrency, 0)]
+    rows += [run(args.database_url, args.joins, args.concurrency, float(w)) for w in args.windows.split(",")]
+    print_table(["mode", "joins/s", "p50 ms", "p99 ms", "avg batch", "answers correct"], rows)
+
+
+if __name__ == "__main__":
+    main()
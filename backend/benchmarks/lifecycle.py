@@ -0,0 +1,229 @@
+"""Thundering-herd load test for a full drop lifecycle.
+
+Scripts what production sees around a drop: ``--users`` people sign up, log in and join
+one drop's waitlist, then all of them hit ``POST /claim`` the moment ``claim_open_at``
+passes. Each request is timed and reported per endpoint: p50/p95/p99 latency, throughput
+and the status mix. At the end the number of successful claims is checked against the
+drop's stock.
+
+By default the real ``create_application()`` app runs in-process on ``httpx.ASGITransport``
+against a throwaway SQLite file. ``--database-url`` may be given more than once to run the
+same scenario against several databases in a row. ``--base-url`` instead targets a running
+server (e.g. ``uvicorn app.main:app``), using whatever database that server is configured
+with.
+
+    python -m benchmarks.lifecycle --users 500 --stock 50
+    python -m benchmarks.lifecycle --database-url sqlite:///./herd.db --database-url postgresql://localhost/dropspot_bench
+    python -m benchmarks.lifecycle --base-url http://127.0.0.1:8000 --users 200 --json results.json
+
+``--json`` writes the results to a file, so runs can be compared over time. In-process runs
+lower the bcrypt cost to ``--bcrypt-rounds`` (``0`` keeps the production cost). That keeps
+the signup phase short without touching the claim path, which is what is being measured.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from passlib.context import CryptContext
+from sqlalchemy import func, select
+
+from app import caching, database, hashing
+from app.main import create_application
+from app.models import Claim
+from app.services.join_buffer import shutdown_join_buffer
+
+from ._common import make_engine, print_table, summarize_ms
+
+PASSWORD = "HerdPass123!"
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter[str]] = defaultdict(Counter)
+        self.windows: dict[str, tuple[float, float]] = {}
+
+    async def call(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as exc:
+            outcome, response = type(exc).__name__, None
+        else:
+            outcome = str(response.status_code)
+        finished = time.perf_counter()
+        self.latencies[label].append((finished - started) * 1000)
+        self.statuses[label][outcome] += 1
+        first, last = self.windows.get(label, (started, finished))
+        self.windows[label] = (min(first, started), max(last, finished))
+        return response
+
+    def report(self) -> list[dict[str, object]]:
+        rows = []
+        for label, samples in self.latencies.items():
+            first, last = self.windows[label]
+            rows.append(
+                {
+                    "endpoint": label,
+                    **summarize_ms(samples),
+                    "rps": len(samples) / max(last - first, 1e-9),
+                    "statuses": dict(sorted(self.statuses[label].items())),
+                }
+            )
+        return rows
+
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+async def _scenario(client: httpx.AsyncClient, users: int, stock: int, concurrency: int, lead: float) -> dict[str, object]:
+    recorder = Recorder()
+    run = uuid.uuid4().hex[:8]
+    limit = asyncio.Semaphore(concurrency)
+
+    admin_email = f"herd-admin-{run}@example.com"
+    await client.post("/auth/signup", json={"email": admin_email, "password": PASSWORD, "is_admin": True})
+    admin_login = await client.post("/auth/login", data={"username": admin_email, "password": PASSWORD})
+    admin_headers = {"Authorization": f"Bearer {admin_login.json()['access_token']}"}
+
+    now = datetime.now(timezone.utc)
+    created = await client.post(
+        "/admin/drops",
+        json={
+            "title": f"Herd {run}",
+            "stock": stock,
+            "waitlist_open_at": _iso(now - timedelta(minutes=1)),
+            "claim_open_at": _iso(now + timedelta(days=1)),
+            "claim_close_at": _iso(now + timedelta(days=2)),
+        },
+        headers=admin_headers,
+    )
+    created.raise_for_status()
+    drop_id = created.json()["id"]
+
+    async def onboard(index: int) -> dict[str, str] | None:
+        email = f"herd-{run}-{index}@example.com"
+        async with limit:
+            await recorder.call(client, "POST /auth/signup", "POST", "/auth/signup", json={"email": email, "password": PASSWORD})
+            response = await recorder.call(
+                client, "POST /auth/login", "POST", "/auth/login", data={"username": email, "password": PASSWORD}
+            )
+            if response is None or response.status_code != 200:
+                return None
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            await recorder.call(client, "GET /drops", "GET", "/drops")
+            await recorder.call(client, "POST /drops/{id}/join", "POST", f"/drops/{drop_id}/join", headers=headers)
+            return headers
+
+    sessions = [headers for headers in await asyncio.gather(*(onboard(i) for i in range(users))) if headers]
+
+    # everyone is in line: open the claim window shortly and let the herd loose at once
+    claim_open_at = datetime.now(timezone.utc) + timedelta(seconds=lead)
+    opened = await client.put(f"/admin/drops/{drop_id}", json={"claim_open_at": _iso(claim_open_at)}, headers=admin_headers)
+    opened.raise_for_status()
+    await asyncio.sleep(max((claim_open_at - datetime.now(timezone.utc)).total_seconds(), 0))
+
+    claim_codes: list[str] = []
+
+    async def claim(headers: dict[str, str]) -> None:
+        response = await recorder.call(client, "POST /drops/{id}/claim", "POST", f"/drops/{drop_id}/claim", headers=headers)
+        if response is not None and response.status_code == 200:
+            claim_codes.append(response.json()["claim_code"])
+        await recorder.call(client, "GET /drops/{id}/waitlist/me", "GET", f"/drops/{drop_id}/waitlist/me", headers=headers)
+
+    await asyncio.gather(*(claim(headers) for headers in sessions))
+
+    return {
+        "drop_id": drop_id,
+        "users": users,
+        "joined": len(sessions),
+        "stock": stock,
+        "claims": len(set(claim_codes)),
+        "oversold": max(len(set(claim_codes)) - stock, 0),
+        "endpoints": recorder.report(),
+    }
+
+
+async def _run_remote(base_url: str, args: argparse.Namespace) -> dict[str, object]:
+    limits = httpx.Limits(max_connections=args.users + 10)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        return await _scenario(client, args.users, args.stock, args.concurrency, args.lead)
+
+
+def _run_in_process(database_url: str | None, args: argparse.Namespace) -> dict[str, object]:
+    engine = make_engine(database_url, pool_size=args.concurrency, max_overflow=args.users)
+    database.override_engine(engine)
+    caching.clear_all()
+    if args.bcrypt_rounds:
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.bcrypt_rounds)
+        hashing._pwd_context = lambda: context
+
+    async def drive() -> dict[str, object]:
+        transport = httpx.ASGITransport(app=create_application())
+        async with httpx.AsyncClient(transport=transport, base_url="http://herd", timeout=args.timeout) as client:
+            return await _scenario(client, args.users, args.stock, args.concurrency, args.lead)
+
+    try:
+        result = asyncio.run(drive())
+        # the client-side count can miss a claim whose response was lost; the table cannot
+        with engine.connect() as conn:
+            stored = conn.scalar(
+                select(func.count()).select_from(Claim).where(Claim.drop_id == uuid.UUID(result["drop_id"]))
+            )
+        result["claims"] = max(result["claims"], stored)
+        result["oversold"] = max(result["claims"] - result["stock"], 0)
+        return result
+    finally:
+        shutdown_join_buffer()
+        engine.dispose()
+
+
+def _print(target: str, result: dict[str, object]) -> None:
+    print(f"\n{target}: {result['joined']}/{result['users']} users joined, {result['claims']} claims for stock {result['stock']}")
+    print_table(
+        ["endpoint", "n", "rps", "p50 ms", "p95 ms", "p99 ms", "statuses"],
+        [[r["endpoint"], r["n"], r["rps"], r["p50"], r["p95"], r["p99"], r["statuses"]] for r in result["endpoints"]],
+    )
+    print(f"OVERSOLD by {result['oversold']}" if result["oversold"] else "oversell check: ok")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", action="append", default=None, help="repeatable; defaults to a temporary SQLite file")
+    parser.add_argument("--base-url", default=None, help="drive a running server instead of the in-process app")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--stock", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50, help="parallel users during signup/join; the claim herd is unbounded")
+    parser.add_argument("--lead", type=float, default=1.0, help="seconds between the last join and claim_open_at")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="in-process only; 0 keeps the configured cost")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, object]] = {}
+    if args.base_url:
+        results[args.base_url] = asyncio.run(_run_remote(args.base_url, args))
+    else:
+        for url in args.database_url or [None]:
+            results[url or "sqlite (temporary)"] = _run_in_process(url, args)
+
+    for target, result in results.items():
+        _print(target, result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump({"recorded_at": datetime.now(timezone.utc).isoformat(), "runs": results}, handle, indent=2)
+    if any(result["oversold"] for result in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
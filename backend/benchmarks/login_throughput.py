@@ -0,0 +1,113 @@
+"""Login storm throughput, and what it does to the rest of the worker.
+
+Fires ``--logins`` concurrent ``POST /auth/login`` requests at the in-process app while a
+probe keeps calling ``GET /health``. It runs once with bcrypt inline
+(``PASSWORD_HASH_WORKERS=0``) and once per requested process-pool size. Run it on a
+multi-core box; pool sizes above the core count only add queueing.
+
+    python -m benchmarks.login_throughput --logins 200 --concurrency 50 --workers 2,4,8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+
+import httpx
+
+from app import database, hashing
+from app.config import get_settings
+from app.models import User
+
+from ._common import make_engine, print_table, summarize_ms
+
+PASSWORD = "S3curePass!"
+
+
+async def _storm(app, logins: int, concurrency: int) -> dict[str, object]:
+    transport = httpx.ASGITransport(app=app)
+    login_ms: list[float] = []
+    probe_ms: list[float] = []
+    statuses: Counter[int] = Counter()
+    done = asyncio.Event()
+    remaining = iter(range(logins))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def login_worker() -> None:
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await client.post("/auth/login", data={"username": "bench@example.com", "password": PASSWORD})
+                login_ms.append((time.perf_counter() - started) * 1000)
+                statuses[response.status_code] += 1
+
+        async def probe() -> None:
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/health")
+                probe_ms.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return {
+        "logins_per_s": statuses[200] / elapsed,
+        "login": summarize_ms(login_ms),
+        "probe": summarize_ms(probe_ms),
+        "statuses": dict(statuses),
+    }
+
+
+def run(workers: int, logins: int, concurrency: int, max_pending: int) -> list[object]:
+    os.environ["PASSWORD_HASH_WORKERS"] = str(workers)
+    os.environ["PASSWORD_HASH_MAX_PENDING"] = str(max_pending)
+    get_settings.cache_clear()
+    hashing.shutdown_password_hasher()
+
+    engine = make_engine(None)
+    database.override_engine(engine)
+    with database.session_scope() as session:
+        session.add(User(email="bench@example.com", password_hash=hashing.get_password_hasher().hash(PASSWORD)))
+    if workers:
+        # warm the pool so process start-up is not billed to the first logins
+        hashing.get_password_hasher().hash(PASSWORD)
+
+    from app.main import create_application
+
+    result = asyncio.run(_storm(create_application(), logins, concurrency))
+    hashing.shutdown_password_hasher()
+    engine.dispose()
+    return [
+        workers or "inline",
+        result["logins_per_s"],
+        result["login"]["p50"],
+        result["login"]["p99"],
+        result["probe"]["p50"],
+        result["probe"]["p99"],
+        result["statuses"],
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--workers", default=str(os.cpu_count() or 2), help="comma separated process pool sizes")
+    parser.add_argument("--max-pending", type=int, default=64)
+    args = parser.parse_args()
+
+    rows = [run(0, args.logins, args.concurrency, args.max_pending)]
+    rows += [run(int(w), args.logins, args.concurrency, args.max_pending) for w in args.workers.split(",")]
+    print_table(["hash workers", "logins/s", "login p50", "login p99", "/health p50", "/health p99", "statuses"], rows)
+
+
+if __name__ == "__main__":
+    main()
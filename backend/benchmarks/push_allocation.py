@@ -0,0 +1,91 @@
+"""Claim-open cost of push allocation versus winners claiming on demand.
+
+For each stock size a drop gets a waitlist of ``--waitlist-factor`` x stock. In ``push``
+mode ``push_allocation.allocate_due`` builds the snapshot and issues every claim in one
+transaction. The table reports how long that took and the latency of a winner's
+``POST /claim`` afterwards (a read of the issued claim). In ``claim`` mode a sample of
+winners claims one by one; the table shows the per-claim latency and that rate projected
+over the whole stock.
+
+    python -m benchmarks.push_allocation --stocks 1000,10000,100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Allocation, Drop
+from app.services import allocation as allocation_service
+from app.services import waitlist as waitlist_service
+from app.services.push_allocation import allocate_due
+
+from ._common import create_open_drop, make_engine, populate_waitlist, print_table, summarize_ms
+
+
+def _claim_latencies(SessionFactory, drop_id, sample: int) -> list[float]:
+    with SessionFactory() as session:
+        winners = session.scalars(
+            select(Allocation.user_id).where(Allocation.drop_id == drop_id).order_by(Allocation.rank).limit(sample)
+        ).all()
+    latencies = []
+    for user_id in winners:
+        started = time.perf_counter()
+        with SessionFactory() as session:
+            drop = session.get(Drop, drop_id)
+            waitlist_service.claim_drop(session, SimpleNamespace(id=user_id), drop)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def run(database_url: str | None, stock: int, factor: int, sample: int) -> list[list[object]]:
+    rows = []
+    for mode in ("claim", "push"):
+        engine = make_engine(database_url)
+        drop_id = create_open_drop(engine, stock=stock)
+        populate_waitlist(engine, drop_id, stock * factor)
+        SessionFactory = sessionmaker(bind=engine, autoflush=False)
+        with engine.begin() as conn:
+            conn.execute(update(Drop).where(Drop.id == drop_id).values(allocation_mode=mode))
+
+        started = time.perf_counter()
+        if mode == "push":
+            [report] = allocate_due(SessionFactory)
+            open_ms, issued = report.elapsed_ms, report.issued
+        else:
+            with SessionFactory() as session:
+                allocation_service.ensure_snapshot(session, session.get(Drop, drop_id))
+            open_ms, issued = (time.perf_counter() - started) * 1000, 0
+
+        latencies = _claim_latencies(SessionFactory, drop_id, min(sample, stock))
+        per_claim = summarize_ms(latencies)
+        projected = per_claim["mean"] * stock if mode == "claim" else open_ms
+        rows.append([stock, mode, open_ms, issued, per_claim["p50"], per_claim["p99"], projected])
+        engine.dispose()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file per run")
+    parser.add_argument("--stocks", default="1000,10000", help="comma separated stock sizes")
+    parser.add_argument("--waitlist-factor", type=int, default=2)
+    parser.add_argument("--sample", type=int, default=200, help="claims timed per run")
+    args = parser.parse_args()
+
+    rows = [
+        row
+        for stock in args.stocks.split(",")
+        for row in run(args.database_url, int(stock), args.waitlist_factor, args.sample)
+    ]
+    print_table(
+        ["stock", "mode", "claim-open ms", "issued", "claim p50 ms", "claim p99 ms", "all winners served ms"], rows
+    )
+
+
+if __name__ == "__main__":
+    main()
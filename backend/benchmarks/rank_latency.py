@@ -0,0 +1,90 @@
+"""Waitlist rank lookup latency as the waitlist grows.
+
+Compares the old single ``count(*)`` with an OR predicate against the two index range
+scans used by ``allocation.entry_rank``, both exact and capped at ``stock`` (the claim path).
+
+    python -m benchmarks.rank_latency --sizes 10000,100000,1000000
+    python -m benchmarks.rank_latency --database-url postgresql://localhost/dropspot_bench
+
+On a throwaway SQLite file the legacy query is also timed without the composite index,
+which is what every deployment ran before it existed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from collections.abc import Callable
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.models import WaitlistEntry
+from app.services import allocation as allocation_service
+
+from ._common import create_open_drop, make_engine, populate_waitlist, print_table, summarize_ms
+
+
+def _legacy_rank(session: Session, entry: WaitlistEntry, **_: object) -> int:
+    stmt = (
+        select(func.count())
+        .select_from(WaitlistEntry)
+        .where(WaitlistEntry.drop_id == entry.drop_id)
+        .where(
+            (WaitlistEntry.priority_score > entry.priority_score)
+            | ((WaitlistEntry.priority_score == entry.priority_score) & (WaitlistEntry.joined_at < entry.joined_at))
+        )
+    )
+    return session.scalar(stmt) or 0
+
+
+def _time(session: Session, entries: list[WaitlistEntry], fn: Callable[..., int], **kwargs: object) -> list[float]:
+    samples = []
+    for entry in entries:
+        started = time.perf_counter()
+        fn(session, entry, **kwargs)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def run(database_url: str | None, size: int, stock: int, samples: int) -> list[list[object]]:
+    engine = make_engine(database_url)
+    drop_id = create_open_drop(engine, stock=stock)
+    populate_waitlist(engine, drop_id, size)
+    rows: list[list[object]] = []
+    with Session(engine) as session:
+        ids = session.scalars(select(WaitlistEntry.id).where(WaitlistEntry.drop_id == drop_id)).all()
+        entries = [session.get(WaitlistEntry, entry_id) for entry_id in random.sample(ids, min(samples, len(ids)))]
+
+        cases: list[tuple[str, Callable[..., int], dict[str, object]]] = [
+            ("legacy OR count", _legacy_rank, {}),
+            ("indexed exact", allocation_service.entry_rank, {}),
+            (f"indexed capped@{stock}", allocation_service.entry_rank, {"limit": stock}),
+        ]
+        if database_url is None:
+            session.execute(text("DROP INDEX ix_waitlist_drop_rank"))
+            rows.append([size, "legacy, no index", *summarize_ms(_time(session, entries, _legacy_rank)).values()])
+            session.execute(text("CREATE INDEX ix_waitlist_drop_rank ON waitlist_entries (drop_id, priority_score DESC, joined_at)"))
+        for label, fn, kwargs in cases:
+            rows.append([size, label, *summarize_ms(_time(session, entries, fn, **kwargs)).values()])
+    engine.dispose()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file per size")
+    parser.add_argument("--sizes", default="10000,100000", help="comma separated waitlist sizes, e.g. 10000,100000,1000000")
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--samples", type=int, default=200, help="random entries to rank per size")
+    args = parser.parse_args()
+
+    rows: list[list[object]] = []
+    for size in (int(value) for value in args.sizes.split(",")):
+        rows.extend(run(args.database_url, size, args.stock, args.samples))
+    print_table(["entries", "strategy", "n", "mean ms", "p50 ms", "p95 ms", "p99 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
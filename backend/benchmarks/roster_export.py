@@ -0,0 +1,69 @@
+"""Memory and throughput of the admin waitlist export by waitlist size.
+
+Streams ``roster.export_rows`` for one drop and tracks the Python heap with
+``tracemalloc``. The ``all()`` row loads every row into the session, the way an
+unpaginated listing would. The ``stream`` row is the ``yield_per`` export, whose peak
+should stay flat as the size grows.
+
+    python -m benchmarks.roster_export --sizes 10000,100000,1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+
+from sqlalchemy.orm import sessionmaker
+
+from app.services import roster
+
+from ._common import create_open_drop, make_engine, populate_waitlist, print_table
+
+
+def _measure(fn) -> tuple[float, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def run(database_url: str | None, size: int, fmt: str) -> list[list[object]]:
+    engine = make_engine(database_url)
+    drop_id = create_open_drop(engine, stock=100)
+    populate_waitlist(engine, drop_id, size)
+    SessionFactory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    def load_all() -> None:
+        with SessionFactory() as session:
+            session.execute(roster._waitlist_select(drop_id)).all()
+
+    def stream() -> None:
+        with SessionFactory() as session:
+            for _chunk in roster.export_rows(session, "waitlist", drop_id, fmt):
+                pass
+
+    rows = []
+    for mode, fn in (("all()", load_all), ("stream", stream)):
+        elapsed, peak_mib = _measure(fn)
+        rows.append([size, mode, size / elapsed, peak_mib])
+    engine.dispose()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file per run")
+    parser.add_argument("--sizes", default="10000,100000", help="comma separated waitlist sizes")
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    args = parser.parse_args()
+
+    rows = [row for size in args.sizes.split(",") for row in run(args.database_url, int(size), args.format)]
+    print_table(["entries", "mode", "rows/s", "peak MiB"], rows)
+
+
+if __name__ == "__main__":
+    main()
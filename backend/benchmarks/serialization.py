@@ -0,0 +1,94 @@
+"""Per-request serialization cost of a drop list, default path versus ``FAST_JSON_RESPONSES``.
+
+Builds ``--drops`` in-memory ``Drop`` rows and times each way of turning them into a
+response body, best of ``--repeat`` runs:
+
+* ``response_model``: what FastAPI does for a returned list: validate against
+  ``list[DropRead]`` from attributes, dump to JSON-compatible Python, ``json.dumps``,
+* ``pydantic dump_json``: the same validation with Pydantic's own encoder (the catalog's
+  default cache-miss path),
+* ``fast``: ``responses.drop_payload`` dicts encoded by ``responses.dumps`` (orjson when
+  installed).
+
+    python -m benchmarks.serialization --drops 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pydantic import TypeAdapter
+
+from app import responses
+from app.models import Drop
+from app.schemas import DropRead
+
+from ._common import print_table
+
+
+def _drops(count: int) -> list[Drop]:
+    now = datetime.now(timezone.utc)
+    return [
+        Drop(
+            id=uuid.uuid4(),
+            title=f"Drop {index}",
+            description="Limited run sneaker drop with a fairly ordinary description.",
+            stock=100 + index,
+            waitlist_open_at=now,
+            claim_open_at=now + timedelta(hours=1),
+            claim_close_at=now + timedelta(hours=2),
+            base_priority=index % 7,
+            allocation_mode="claim",
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(count)
+    ]
+
+
+def _best_us(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drops", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    drops = _drops(args.drops)
+    adapter = TypeAdapter(list[DropRead])
+
+    def response_model() -> bytes:
+        content = adapter.dump_python(adapter.validate_python(drops, from_attributes=True), mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+    def pydantic_dump_json() -> bytes:
+        return adapter.dump_json(adapter.validate_python(drops, from_attributes=True))
+
+    def fast() -> bytes:
+        return responses.dumps([responses.drop_payload(drop) for drop in drops])
+
+    assert json.loads(fast()) == json.loads(response_model())
+    encoder = "orjson" if responses.orjson is not None else "json"
+    rows = []
+    baseline = None
+    paths = (("response_model", response_model), ("pydantic dump_json", pydantic_dump_json), (f"fast ({encoder})", fast))
+    for name, fn in paths:
+        cost = _best_us(fn, args.repeat)
+        baseline = baseline or cost
+        rows.append([name, args.drops, cost, cost / args.drops, baseline / cost])
+    print_table(["path", "drops", "us/request", "us/drop", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""SQLite write throughput with the default connection settings versus the engine profile.
+
+Writer threads each join one drop's waitlist through ``waitlist.insert_entry`` (one
+transaction per join), while reader threads poll the drop catalog query. The run is made
+once with a bare ``create_engine`` (rollback journal, ``synchronous=FULL``, the driver's
+5s busy timeout) and once with ``database.build_engine``, which sets WAL,
+``synchronous=NORMAL``, busy_timeout, mmap and cache size on connect.
+
+    python -m benchmarks.sqlite_profile --joins 1500 --writers 4 --readers 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, build_engine
+from app.models import Drop, User
+from app.services import waitlist as waitlist_service
+
+from ._common import bench_uuid, print_table, summarize_ms, temp_sqlite_url
+
+
+def run(profile: str, joins: int, writers: int, readers: int) -> list[object]:
+    url = temp_sqlite_url()
+    if profile == "default":
+        engine = create_engine(url, connect_args={"check_same_thread": False}, pool_size=writers + readers)
+    else:
+        engine = build_engine(url, pool_size=writers + readers)
+    Base.metadata.create_all(bind=engine)
+
+    now = datetime.now(timezone.utc)
+    users = [SimpleNamespace(id=bench_uuid(), created_at=now) for _ in range(joins)]
+    drop = Drop(
+        id=bench_uuid(),
+        title="Profile",
+        stock=10,
+        waitlist_open_at=now,
+        claim_open_at=now + timedelta(hours=1),
+        claim_close_at=now + timedelta(hours=2),
+        base_priority=0,
+    )
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [{"id": u.id, "email": f"p-{u.id.hex}@example.com", "password_hash": "x", "created_at": now} for u in users],
+        )
+    SessionFactory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    with SessionFactory() as session:
+        session.add(drop)
+        session.commit()
+        session.expunge(drop)
+
+    errors = 0
+    reads = 0
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def write(user) -> float:
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            with SessionFactory() as session:
+                waitlist_service.insert_entry(session, drop, waitlist_service.new_entry(user, drop))
+        except OperationalError:
+            with lock:
+                errors += 1
+        return (time.perf_counter() - started) * 1000
+
+    def read() -> None:
+        nonlocal reads
+        while not done.is_set():
+            with SessionFactory() as session:
+                session.scalars(select(Drop).where(Drop.claim_close_at >= now)).all()
+            with lock:
+                reads += 1
+
+    reader_threads = [threading.Thread(target=read) for _ in range(readers)]
+    for thread in reader_threads:
+        thread.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        latencies = list(pool.map(write, users))
+    elapsed = time.perf_counter() - started
+    done.set()
+    for thread in reader_threads:
+        thread.join()
+    engine.dispose()
+
+    summary = summarize_ms(latencies)
+    return [profile, (joins - errors) / elapsed, summary["p50"], summary["p99"], errors, reads / elapsed]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--joins", type=int, default=1_500)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    rows = [run(profile, args.joins, args.writers, args.readers) for profile in ("default", "profile")]
+    print_table(["engine", "commits/s", "p50 ms", "p99 ms", "locked errors", "reads/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Cost of a claim on a sold-out drop with each stock ledger backend.
+
+A drop of ``--stock`` units gets a waitlist of ``--waitlist`` users and every winner
+claims, so the drop is sold out. Then a sample of the remaining users claims, as they do
+when a drop sells out under load. With the ``database`` ledger each of those claims runs the
+allocation lookup before it learns there is no stock. With ``shared_memory`` it runs one
+indexed read for the caller's own claim. The table reports latency and SQL statements per
+rejected claim.
+
+    python -m benchmarks.stock_ledger --waitlist 20000 --sample 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import uuid
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import event, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Allocation, Drop
+from app.services import allocation as allocation_service
+from app.services import stock_ledger
+from app.services import waitlist as waitlist_service
+from app.services.stock_ledger import DatabaseLedger, SharedMemoryLedger
+
+from ._common import create_open_drop, make_engine, populate_waitlist, print_table, summarize_ms
+
+
+def _claim(SessionFactory, drop_id, user_id) -> bool:
+    with SessionFactory() as session:
+        drop = session.get(Drop, drop_id)
+        try:
+            waitlist_service.claim_drop(session, SimpleNamespace(id=user_id), drop)
+        except HTTPException:
+            return False
+    return True
+
+
+def run(database_url: str | None, stock: int, waitlist: int, sample: int) -> list[list[object]]:
+    rows = []
+    for name in ("database", "shared_memory"):
+        engine = make_engine(database_url)
+        drop_id = create_open_drop(engine, stock=stock)
+        users = populate_waitlist(engine, drop_id, waitlist)
+        SessionFactory = sessionmaker(bind=engine, autoflush=False)
+        if name == "database":
+            ledger = DatabaseLedger()
+        else:
+            ledger = SharedMemoryLedger(f"dropspot-bench-{uuid.uuid4().hex[:12]}")
+        stock_ledger._ledger = ledger
+        ledger.reconcile(SessionFactory)
+
+        with SessionFactory() as session:
+            drop = session.get(Drop, drop_id)
+            allocation_service.ensure_snapshot(session, drop)
+            session.commit()
+            winners = set(
+                session.scalars(
+                    select(Allocation.user_id).where(Allocation.drop_id == drop_id, Allocation.eligible.is_(True))
+                )
+            )
+        for user_id in winners:
+            _claim(SessionFactory, drop_id, user_id)
+        losers = [user_id for user_id in users if user_id not in winners][:sample]
+
+        statements = 0
+
+        def count(*_args) -> None:
+            nonlocal statements
+            statements += 1
+
+        event.listen(engine, "before_cursor_execute", count)
+        latencies = []
+        for user_id in losers:
+            started = time.perf_counter()
+            assert not _claim(SessionFactory, drop_id, user_id)
+            latencies.append((time.perf_counter() - started) * 1000)
+        event.remove(engine, "before_cursor_execute", count)
+
+        summary = summarize_ms(latencies)
+        rows.append([name, len(losers), summary["p50"], summary["p99"], statements / max(len(losers), 1)])
+        stock_ledger.shutdown_stock_ledger()
+        if isinstance(ledger, SharedMemoryLedger):
+            ledger.unlink()
+        engine.dispose()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file per run")
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--waitlist", type=int, default=5_000)
+    parser.add_argument("--sample", type=int, default=1_000, help="sold-out claims timed per backend")
+    args = parser.parse_args()
+
+    rows = run(args.database_url, args.stock, args.waitlist, args.sample)
+    print_table(["ledger", "claims", "p50 ms", "p99 ms", "statements/claim"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Live-table size and waitlist latency before and after archiving closed drops.
+
+``--closed`` drops of ``--entries`` users each have their claim window closed; one open drop
+has ``--open-entries``. The script measures the live ``waitlist_entries`` table (rows and,
+on SQLite, the pages of the table plus its indexes via ``dbstat``), join latency into the
+open drop and ``entry_rank`` latency on it. Then it runs ``archive_closed_drops`` and
+measures again.
+
+    python -m benchmarks.waitlist_archive --closed 20 --entries 50000
+    python -m benchmarks.waitlist_archive --database-url postgresql://localhost/dropspot_bench
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import Drop, User, WaitlistArchive, WaitlistEntry
+from app.services import allocation as allocation_service
+from app.services import archive as archive_service
+from app.services import waitlist as waitlist_service
+
+from ._common import bench_uuid, create_open_drop, make_engine, populate_waitlist, print_table, summarize_ms
+
+
+def _live_kib(engine: Engine) -> float | None:
+    """Pages held by the live tables and their indexes; None off SQLite or without ``dbstat``."""
+    if engine.dialect.name != "sqlite":
+        return None
+    stmt = text(
+        "SELECT sum(pgsize) FROM dbstat WHERE name IN "
+        "(SELECT name FROM sqlite_schema WHERE tbl_name IN ('waitlist_entries', 'drop_allocations'))"
+    )
+    with engine.connect() as conn:
+        try:
+            size = conn.scalar(stmt)
+        except Exception:
+            # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+            return None
+    return (size or 0) / 1024
+
+
+def _new_users(engine: Engine, count: int) -> list[User]:
+    now = datetime.now(timezone.utc) - timedelta(days=30)
+    run = bench_uuid().hex[:8]
+    rows = [
+        {
+            "id": bench_uuid(),
+            "email": f"joiner-{run}-{i}@example.com",
+            "password_hash": "x",
+            "is_admin": False,
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(User), rows)
+    with Session(engine) as session:
+        return list(session.scalars(select(User).where(User.id.in_([row["id"] for row in rows]))))
+
+
+def _measure(engine: Engine, open_drop_id, joins: int, samples: int) -> list[object]:
+    joiners = _new_users(engine, joins)
+    join_ms = []
+    with Session(engine) as session:
+        drop = session.get(Drop, open_drop_id)
+        for user in joiners:
+            started = time.perf_counter()
+            waitlist_service.join_waitlist(session, user, drop)
+            session.commit()
+            join_ms.append((time.perf_counter() - started) * 1000)
+
+        ids = session.scalars(select(WaitlistEntry.id).where(WaitlistEntry.drop_id == open_drop_id)).all()
+        rank_ms = []
+        for entry_id in random.sample(ids, min(samples, len(ids))):
+            entry = session.get(WaitlistEntry, entry_id)
+            started = time.perf_counter()
+            allocation_service.entry_rank(session, entry)
+            rank_ms.append((time.perf_counter() - started) * 1000)
+        live = session.scalar(select(func.count()).select_from(WaitlistEntry))
+        archived = session.scalar(select(func.count()).select_from(WaitlistArchive))
+
+    kib = _live_kib(engine)
+    joined, ranked = summarize_ms(join_ms), summarize_ms(rank_ms)
+    return [live, archived, "n/a" if kib is None else kib, joined["p50"], joined["p99"], ranked["p50"], ranked["p99"]]
+
+
+def run(database_url: str | None, closed: int, entries: int, open_entries: int, joins: int, samples: int):
+    engine = make_engine(database_url)
+    closed_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+    for index in range(closed):
+        drop_id = create_open_drop(engine, stock=100, title=f"Closed drop {index}")
+        populate_waitlist(engine, drop_id, entries)
+        with engine.begin() as conn:
+            conn.execute(update(Drop).where(Drop.id == drop_id).values(claim_close_at=closed_at))
+    open_drop_id = create_open_drop(engine, stock=100, title="Open drop")
+    populate_waitlist(engine, open_drop_id, open_entries)
+
+    rows = [["before", *_measure(engine, open_drop_id, joins, samples)]]
+    with Session(engine) as session:
+        started = time.perf_counter()
+        reports = archive_service.archive_closed_drops(session)
+        elapsed = time.perf_counter() - started
+    moved = sum(report.entries for report in reports)
+    print(f"archived {moved} entries of {len(reports)} drops in {elapsed:.2f}s ({moved / elapsed:,.0f} rows/s)")
+    rows.append(["after", *_measure(engine, open_drop_id, joins, samples)])
+    engine.dispose()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--closed", type=int, default=10, help="closed drops to archive")
+    parser.add_argument("--entries", type=int, default=20_000, help="waitlist entries per closed drop")
+    parser.add_argument("--open-entries", type=int, default=20_000)
+    parser.add_argument("--joins", type=int, default=500, help="joins into the open drop timed per phase")
+    parser.add_argument("--samples", type=int, default=500, help="rank lookups timed per phase")
+    args = parser.parse_args()
+
+    rows = run(args.database_url, args.closed, args.entries, args.open_entries, args.joins, args.samples)
+    print_table(
+        ["phase", "live rows", "archived rows", "live KiB", "join p50 ms", "join p99 ms", "rank p50 ms", "rank p99 ms"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Alembic environment: runs migrations against the app's configured database.
+
+The URL is ``DATABASE_URL`` (the same default as the app) unless the caller put one on the
+Alembic config, e.g. ``config.set_main_option("sqlalchemy.url", ...)`` in tests.
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app import models  # noqa: F401  (registers the tables on Base.metadata)
+from app.column_types import GUID
+from app.database import Base, database_url
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def _compare_type(context, inspected_column, metadata_column, inspected_type, metadata_type):
+    # GUID columns created before 0005 are still declared UUID (NUMERIC affinity) on SQLite;
+    # affinity never touches blobs, so they hold the same 16 bytes as a BLOB column would
+    if context.dialect.name == "sqlite" and isinstance(metadata_type, GUID):
+        return False
+    return None  # default comparison
+
+
+def _url() -> str:
+    return config.get_main_option("sqlalchemy.url") or database_url()
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=_url().startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        compare_type=_compare_type,
+        # SQLite cannot ALTER most things; batch mode rebuilds the table instead
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    engine = create_engine(_url(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        _run(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,83 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Exactly the tables the original ``init_db()`` created before migrations existed. A database
+that was built that way is brought under Alembic with ``alembic stamp 0001`` and then
+``alembic upgrade head``.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: str | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "drops",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("title", sa.String(length=255), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("stock", sa.Integer(), nullable=False),
+        sa.Column("waitlist_open_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("claim_open_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("claim_close_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("base_priority", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "users",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("email", sa.String(length=255), nullable=False),
+        sa.Column("password_hash", sa.String(length=255), nullable=False),
+        sa.Column("is_admin", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_users_email"), "users", ["email"], unique=True)
+
+    op.create_table(
+        "claims",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("drop_id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("claim_code", sa.String(length=32), nullable=False),
+        sa.Column("claimed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["drop_id"], ["drops.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("claim_code", name="uq_claim_code"),
+        sa.UniqueConstraint("drop_id", "user_id", name="uq_claim_drop_user"),
+    )
+
+    op.create_table(
+        "waitlist_entries",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("drop_id", sa.UUID(), nullable=False),
+        sa.Column("joined_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("priority_score", sa.Numeric(precision=10, scale=4), nullable=False),
+        sa.Column("status", sa.String(length=50), nullable=False),
+        sa.ForeignKeyConstraint(["drop_id"], ["drops.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "drop_id", name="uq_waitlist_user_drop"),
+    )
+    op.create_index(op.f("ix_waitlist_entries_joined_at"), "waitlist_entries", ["joined_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("waitlist_entries")
+    op.drop_table("claims")
+    op.drop_table("users")
+    op.drop_table("drops")
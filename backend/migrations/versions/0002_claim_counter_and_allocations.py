@@ -0,0 +1,64 @@
+"""claim counter and allocation snapshot
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+Everything the schema gained on top of the original ``init_db()`` tables before the
+idempotency table: the ``drops.claimed_count`` stock counter, the allocation snapshot
+(``drops.allocation_mode``, ``drops.allocation_built_at`` and ``drop_allocations``) and
+the rank and claims-page indexes. ``claimed_count`` is backfilled from ``claims``, so a
+database that already has claims does not start its counters at zero and oversell.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0002"
+down_revision: str | None = "0001"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # batch mode so SQLite can drop the columns again on downgrade
+    with op.batch_alter_table("drops") as batch_op:
+        batch_op.add_column(sa.Column("claimed_count", sa.Integer(), server_default="0", nullable=False))
+        batch_op.add_column(sa.Column("allocation_mode", sa.String(length=16), server_default="claim", nullable=False))
+        batch_op.add_column(sa.Column("allocation_built_at", sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        "UPDATE drops SET claimed_count = (SELECT COUNT(*) FROM claims WHERE claims.drop_id = drops.id)"
+    )
+
+    op.create_index("ix_claims_drop_claimed", "claims", ["drop_id", "claimed_at", "id"])
+    op.create_index(
+        "ix_waitlist_drop_rank",
+        "waitlist_entries",
+        ["drop_id", sa.literal_column("priority_score DESC"), "joined_at", "id"],
+    )
+
+    op.create_table(
+        "drop_allocations",
+        sa.Column("drop_id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("entry_id", sa.UUID(), nullable=False),
+        sa.Column("rank", sa.Integer(), nullable=False),
+        sa.Column("eligible", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(["drop_id"], ["drops.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["entry_id"], ["waitlist_entries.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("drop_id", "user_id"),
+    )
+    op.create_index("ix_drop_allocations_rank", "drop_allocations", ["drop_id", "rank"])
+
+
+def downgrade() -> None:
+    op.drop_table("drop_allocations")
+    op.drop_index("ix_waitlist_drop_rank", table_name="waitlist_entries")
+    op.drop_index("ix_claims_drop_claimed", table_name="claims")
+    with op.batch_alter_table("drops") as batch_op:
+        batch_op.drop_column("allocation_built_at")
+        batch_op.drop_column("allocation_mode")
+        batch_op.drop_column("claimed_count")
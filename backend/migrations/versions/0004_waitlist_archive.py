@@ -0,0 +1,50 @@
+"""waitlist archive
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+Cold table for the waitlist entries of closed drops (``services.archive``), with an index
+in the order the admin archive pages read it.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0004"
+down_revision: str | None = "0003"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "waitlist_archive",
+        sa.Column("drop_id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("rank", sa.Integer(), nullable=True),
+        sa.Column("status", sa.SmallInteger(), nullable=False),
+        sa.Column("priority_score", sa.Integer(), nullable=False),
+        sa.Column("joined_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["drop_id"], ["drops.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("drop_id", "user_id"),
+        sqlite_with_rowid=False,
+    )
+    op.create_index(
+        "ix_waitlist_archive_rank",
+        "waitlist_archive",
+        ["drop_id", sa.literal_column("priority_score DESC"), "joined_at", "user_id"],
+    )
+    # batch mode so SQLite can drop the column again on downgrade
+    with op.batch_alter_table("drops") as batch_op:
+        batch_op.add_column(sa.Column("archived_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("drops") as batch_op:
+        batch_op.drop_column("archived_at")
+    op.drop_index("ix_waitlist_archive_rank", table_name="waitlist_archive")
+    op.drop_table("waitlist_archive")
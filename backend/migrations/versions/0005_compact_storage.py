@@ -0,0 +1,113 @@
+"""compact storage
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+``waitlist_entries.priority_score`` becomes an integer count of ten-thousandths and
+``status`` a small-integer code (``models.WAITLIST_STATUSES``). On SQLite every UUID column
+is rewritten from 32 hex characters to 16 raw bytes in place. PostgreSQL already stores
+``uuid`` natively, so its UUID columns are left alone. ``waitlist_archive`` already used
+these encodings.
+"""
+
+import uuid
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0005"
+down_revision: str | None = "0004"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+UUID_COLUMNS = {
+    "users": ("id",),
+    "drops": ("id",),
+    "waitlist_entries": ("id", "user_id", "drop_id"),
+    "claims": ("id", "drop_id", "user_id"),
+    "drop_allocations": ("drop_id", "user_id", "entry_id"),
+    "waitlist_archive": ("drop_id", "user_id"),
+}
+RANK_INDEX_COLUMNS = ["drop_id", sa.literal_column("priority_score DESC"), "joined_at", "id"]
+
+
+def _to_bytes(value):
+    if isinstance(value, str):
+        return uuid.UUID(value).bytes
+    if isinstance(value, bytes) and len(value) == 32:
+        return uuid.UUID(value.decode("ascii")).bytes
+    return value
+
+
+def _to_hex(value):
+    return uuid.UUID(bytes=value).hex if isinstance(value, bytes) and len(value) == 16 else value
+
+
+def _rewrite_uuids(function) -> None:
+    connection = op.get_bind().connection.driver_connection
+    connection.create_function("dropspot_uuid", 1, function, deterministic=True)
+    for table, columns in UUID_COLUMNS.items():
+        op.execute(f"UPDATE {table} SET " + ", ".join(f"{column} = dropspot_uuid({column})" for column in columns))
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        op.alter_column(
+            "waitlist_entries",
+            "priority_score",
+            type_=sa.Integer(),
+            existing_type=sa.Numeric(precision=10, scale=4),
+            postgresql_using="round(priority_score * 10000)::integer",
+        )
+        op.alter_column(
+            "waitlist_entries",
+            "status",
+            type_=sa.SmallInteger(),
+            existing_type=sa.String(length=50),
+            postgresql_using="CASE status WHEN 'claimed' THEN 1 ELSE 0 END",
+        )
+        return
+
+    _rewrite_uuids(_to_bytes)
+    op.execute(
+        "UPDATE waitlist_entries SET priority_score = CAST(round(priority_score * 10000) AS INTEGER), "
+        "status = CASE status WHEN 'claimed' THEN 1 ELSE 0 END"
+    )
+    # the table is rebuilt; recreate the DESC index explicitly rather than trust reflection
+    op.drop_index("ix_waitlist_drop_rank", table_name="waitlist_entries")
+    with op.batch_alter_table("waitlist_entries") as batch_op:
+        batch_op.alter_column("priority_score", type_=sa.Integer(), existing_type=sa.Numeric(precision=10, scale=4))
+        batch_op.alter_column("status", type_=sa.SmallInteger(), existing_type=sa.String(length=50))
+    op.create_index("ix_waitlist_drop_rank", "waitlist_entries", RANK_INDEX_COLUMNS)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        op.alter_column(
+            "waitlist_entries",
+            "status",
+            type_=sa.String(length=50),
+            existing_type=sa.SmallInteger(),
+            postgresql_using="CASE status WHEN 1 THEN 'claimed' ELSE 'waiting' END",
+        )
+        op.alter_column(
+            "waitlist_entries",
+            "priority_score",
+            type_=sa.Numeric(precision=10, scale=4),
+            existing_type=sa.Integer(),
+            postgresql_using="priority_score / 10000.0",
+        )
+        return
+
+    op.drop_index("ix_waitlist_drop_rank", table_name="waitlist_entries")
+    with op.batch_alter_table("waitlist_entries") as batch_op:
+        batch_op.alter_column("status", type_=sa.String(length=50), existing_type=sa.SmallInteger())
+        batch_op.alter_column("priority_score", type_=sa.Numeric(precision=10, scale=4), existing_type=sa.Integer())
+    op.execute(
+        "UPDATE waitlist_entries SET priority_score = priority_score / 10000.0, "
+        "status = CASE status WHEN '1' THEN 'claimed' ELSE 'waiting' END"
+    )
+    op.create_index("ix_waitlist_drop_rank", "waitlist_entries", RANK_INDEX_COLUMNS)
+    _rewrite_uuids(_to_hex)
@@ -1,6 +1,7 @@
 import os
 import tempfile
-from collections.abc import Generator
+from collections.abc import Generator, Iterator
+from contextlib import contextmanager
 
 os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
 os.environ.setdefault("DROPSPOT_SEED", "testseed1234")
@@ -8,11 +9,13 @@ os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 
 os.environ.setdefault("DATABASE_URL", "sqlite:///./test-suite.db")
 
+from app import caching
+from app.ratelimit import get_action_tracker
 from app.database import Base, override_engine
 from app.main import create_application
 
@@ -49,6 +52,8 @@ def db_session(db_engine) -> Generator[Session, None, None]:
 
 @pytest.fixture(scope="function")
 def client(db_engine, db_session):
+    caching.clear_all()
+    get_action_tracker().clear()
     app = create_application()
 
     def _get_session_override():
@@ -57,11 +62,50 @@ def client(db_engine, db_session):
         finally:
             pass
 
-    from app.database import get_session
+    from app.database import get_read_session, get_session
 
     app.dependency_overrides[get_session] = _get_session_override
+    app.dependency_overrides[get_read_session] = _get_session_override
 
     with TestClient(app) as test_client:
         yield test_client
 
     app.dependency_overrides.clear()
+
+
+# route -> (budget, statements the last measured request issued), for the terminal summary
+_query_counts: dict[str, tuple[int, int]] = {}
+
+
+@pytest.fixture
+def query_budget(db_engine):
+    """``with query_budget("POST /drops/{drop_id}/claim", 3) as statements:`` around one request.
+
+    Counts the SQL statements sent to the test engine inside the block and fails the test
+    when they exceed the budget. Every measured route is listed at the end of the run.
+    """
+
+    @contextmanager
+    def measure(route: str, budget: int) -> Iterator[list[str]]:
+        statements: list[str] = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+        event.listen(db_engine, "before_cursor_execute", listener)
+        try:
+            yield statements
+        finally:
+            event.remove(db_engine, "before_cursor_execute", listener)
+        _query_counts[route] = (budget, len(statements))
+        assert len(statements) <= budget, (
+            f"{route} issued {len(statements)} statements, budget is {budget}:\n" + "\n".join(statements)
+        )
+
+    return measure
+
+
+def pytest_terminal_summary(terminalreporter) -> None:
+    if not _query_counts:
+        return
+    terminalreporter.section("SQL statements per request")
+    width = max(len(route) for route in _query_counts)
+    for route, (budget, count) in sorted(_query_counts.items()):
+        terminalreporter.write_line(f"{route:<{width}}  {count:>3} / {budget}")
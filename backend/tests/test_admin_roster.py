@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+
+from utils import auth_headers, create_drop, login, signup
+
+
+def _setup(client, users: int) -> tuple[str, str, list[str]]:
+    password = "S3curePass!"
+    signup(client, "roster-admin@example.com", password, is_admin=True)
+    admin_token = login(client, "roster-admin@example.com", password)
+    drop_id = create_drop(client, admin_token, stock=2)["id"]
+    emails = []
+    for index in range(users):
+        email = f"roster-{index}@example.com"
+        signup(client, email, password)
+        token = login(client, email, password)
+        assert client.post(f"/drops/{drop_id}/join", headers=auth_headers(token)).status_code == 200
+        if index < 2:
+            assert client.post(f"/drops/{drop_id}/claim", headers=auth_headers(token)).status_code == 200
+        emails.append(email)
+    return admin_token, drop_id, emails
+
+
+def test_waitlist_pages_follow_queue_order_without_gaps(client):
+    admin_token, drop_id, emails = _setup(client, 5)
+    headers = auth_headers(admin_token)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get(f"/admin/drops/{drop_id}/waitlist", params=params, headers=headers).json()
+        seen.extend(page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert sorted(item["email"] for item in seen) == sorted(emails)
+    keys = [(-item["priority_score"], item["joined_at"]) for item in seen]
+    assert keys == sorted(keys)
+    for item in seen:
+        rank = client.get(
+            f"/drops/{drop_id}/waitlist/me", headers=auth_headers(login(client, item["email"], "S3curePass!"))
+        ).json()["rank"]
+        assert seen[rank]["entry_id"] == item["entry_id"]
+
+    claims = client.get(f"/admin/drops/{drop_id}/claims", params={"limit": 1}, headers=headers).json()
+    assert [item["email"] for item in claims["items"]] == [emails[0]]
+    rest = client.get(
+        f"/admin/drops/{drop_id}/claims", params={"cursor": claims["next_cursor"]}, headers=headers
+    ).json()
+    assert [item["email"] for item in rest["items"]] == [emails[1]]
+    assert rest["next_cursor"] is None
+
+    bad = client.get(f"/admin/drops/{drop_id}/waitlist", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert bad.status_code == 400
+
+
+def test_exports_stream_every_row_as_csv_and_ndjson(client):
+    admin_token, drop_id, emails = _setup(client, 3)
+    headers = auth_headers(admin_token)
+
+    response = client.get(f"/admin/drops/{drop_id}/waitlist/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    page = client.get(f"/admin/drops/{drop_id}/waitlist", headers=headers).json()
+    assert [row["entry_id"] for row in rows] == [item["entry_id"] for item in page["items"]]
+
+    response = client.get(f"/admin/drops/{drop_id}/claims/export", params={"format": "ndjson"}, headers=headers)
+    claims = [json.loads(line) for line in response.text.splitlines()]
+    assert [claim["email"] for claim in claims] == emails[:2]
+    assert set(claims[0]) == {"claim_id", "user_id", "email", "claim_code", "claimed_at"}
@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models import Allocation, Claim, Drop, User
+from app.services import allocation as allocation_service
+from app.services import waitlist
+from app.services.push_allocation import allocate_due
+from utils import auth_headers, create_drop, iso, login, signup
+
+PASSWORD = "S3curePass!"
+
+
+def _status(client, drop_id: str, token: str) -> dict:
+    response = client.get(f"/drops/{drop_id}/waitlist/me", headers=auth_headers(token))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _ranked_tokens(client, drop_id: str, tokens: list[str]) -> list[str]:
+    return sorted(tokens, key=lambda token: _status(client, drop_id, token)["rank"])
+
+
+def test_snapshot_tracks_stock_edits_leaves_and_late_joins(client):
+    signup(client, "alloc-admin@example.com", PASSWORD, is_admin=True)
+    admin_token = login(client, "alloc-admin@example.com", PASSWORD)
+    drop_id = create_drop(client, admin_token, stock=1)["id"]
+
+    tokens = []
+    for index in range(3):
+        email = f"alloc-{index}@example.com"
+        signup(client, email, PASSWORD)
+        token = login(client, email, PASSWORD)
+        assert client.post(f"/drops/{drop_id}/join", headers=auth_headers(token)).status_code == 200
+        tokens.append(token)
+
+    first, second, third = _ranked_tokens(client, drop_id, tokens)
+    assert [_status(client, drop_id, t)["eligible"] for t in (first, second, third)] == [True, False, False]
+    assert client.post(f"/drops/{drop_id}/claim", headers=auth_headers(second)).status_code == 409
+
+    update = client.put(f"/admin/drops/{drop_id}", json={"stock": 2}, headers=auth_headers(admin_token))
+    assert update.status_code == 200, update.text
+    assert _status(client, drop_id, second)["eligible"] is True
+    assert _status(client, drop_id, third)["eligible"] is False
+
+    assert client.post(f"/drops/{drop_id}/leave", headers=auth_headers(first)).json()["status"] == "left"
+    assert _status(client, drop_id, second)["rank"] == 0
+    third_status = _status(client, drop_id, third)
+    assert (third_status["rank"], third_status["eligible"]) == (1, True)
+
+    signup(client, "alloc-late@example.com", PASSWORD)
+    late = login(client, "alloc-late@example.com", PASSWORD)
+    assert client.post(f"/drops/{drop_id}/join", headers=auth_headers(late)).status_code == 200
+    ranks = sorted(_status(client, drop_id, t)["rank"] for t in (second, third, late))
+    assert ranks == [0, 1, 2]
+
+    winner = _ranked_tokens(client, drop_id, [second, third, late])[0]
+    claim = client.post(f"/drops/{drop_id}/claim", headers=auth_headers(winner))
+    assert claim.status_code == 200, claim.text
+    assert _status(client, drop_id, winner)["status"] == "claimed"
+
+
+def test_push_mode_issues_claims_to_the_top_n_at_claim_open(client, db_session, query_budget):
+    signup(client, "push-admin@example.com", PASSWORD, is_admin=True)
+    admin_token = login(client, "push-admin@example.com", PASSWORD)
+    now = datetime.now(timezone.utc)
+    drop = create_drop(
+        client, admin_token, stock=2, allocation_mode="push", claim_open_at=now + timedelta(minutes=5)
+    )
+    assert drop["allocation_mode"] == "push"
+    drop_id = drop["id"]
+
+    tokens = []
+    for index in range(3):
+        email = f"push-{index}@example.com"
+        signup(client, email, PASSWORD)
+        token = login(client, email, PASSWORD)
+        assert client.post(f"/drops/{drop_id}/join", headers=auth_headers(token)).status_code == 200
+        tokens.append(token)
+    assert allocate_due(lambda: db_session) == []
+
+    opened = client.put(
+        f"/admin/drops/{drop_id}",
+        json={"claim_open_at": iso(now - timedelta(seconds=1))},
+        headers=auth_headers(admin_token),
+    )
+    assert opened.status_code == 200, opened.text
+    [report] = allocate_due(lambda: db_session)
+    assert (str(report.drop_id), report.issued) == (drop_id, 2)
+    issued = {claim.user_id: claim.claim_code for claim in db_session.query(Claim).all()}
+    assert len(issued) == 2
+
+    first, second, third = _ranked_tokens(client, drop_id, tokens)
+    for token in (first, second):
+        assert _status(client, drop_id, token)["status"] == "claimed"
+        # the issued code is only read back; the hot drop row is not written
+        with query_budget("POST /drops/{drop_id}/claim (push)", 1):
+            claim = client.post(f"/drops/{drop_id}/claim", headers=auth_headers(token))
+        assert claim.status_code == 200, claim.text
+        assert claim.json()["claim_code"] in issued.values()
+    assert client.post(f"/drops/{drop_id}/claim", headers=auth_headers(third)).status_code == 409
+    assert allocate_due(lambda: db_session) == []
+
+
+def test_push_drop_reopened_after_issue_keeps_its_claims(client, db_session):
+    signup(client, "reopen-admin@example.com", PASSWORD, is_admin=True)
+    admin_token = login(client, "reopen-admin@example.com", PASSWORD)
+    admin = auth_headers(admin_token)
+    now = datetime.now(timezone.utc)
+    drop_id = create_drop(client, admin_token, stock=2, allocation_mode="push")["id"]
+    tokens = []
+    for index in range(3):
+        email = f"reopen-{index}@example.com"
+        signup(client, email, PASSWORD)
+        tokens.append(login(client, email, PASSWORD))
+        assert client.post(f"/drops/{drop_id}/join", headers=auth_headers(tokens[-1])).status_code == 200
+    assert len(allocate_due(lambda: db_session)) == 1
+    issued = {claim.user_id: claim.claim_code for claim in db_session.query(Claim).all()}
+    assert len(issued) == 2
+
+    for opens in (now + timedelta(minutes=5), now - timedelta(seconds=1)):
+        moved = client.put(f"/admin/drops/{drop_id}", json={"claim_open_at": iso(opens)}, headers=admin)
+        assert moved.status_code == 200, moved.text
+    # the rebuilt snapshot finds the stock already issued and adds nothing
+    [report] = allocate_due(lambda: db_session)
+    assert report.issued == 2
+    assert {claim.user_id: claim.claim_code for claim in db_session.query(Claim).all()} == issued
+    statuses = [_status(client, drop_id, token)["status"] for token in tokens]
+    assert sorted(statuses) == ["claimed", "claimed", "waiting"]
+
+
+def test_losing_the_snapshot_race_keeps_the_callers_transaction(db_session):
+    now = datetime.now(timezone.utc)
+    drop = Drop(
+        title="Raced",
+        stock=1,
+        waitlist_open_at=now - timedelta(hours=1),
+        claim_open_at=now - timedelta(seconds=1),
+        claim_close_at=now + timedelta(hours=1),
+    )
+    db_session.add(drop)
+    db_session.flush()
+    # another worker builds the snapshot after this session loaded the drop
+    db_session.execute(
+        update(Drop)
+        .where(Drop.id == drop.id)
+        .values(allocation_built_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    pending = User(email="raced-pending@example.com", password_hash="x")
+    db_session.add(pending)
+    db_session.flush()
+
+    assert allocation_service.ensure_snapshot(db_session, drop) is False
+    assert drop.allocation_built_at is not None
+    assert db_session.get(User, pending.id) is pending
+
+
+def test_a_join_placed_after_the_snapshot_it_did_not_see_still_gets_a_rank(db_session):
+    now = datetime.now(timezone.utc)
+    drop = Drop(
+        title="Stale",
+        stock=2,
+        waitlist_open_at=now - timedelta(hours=1),
+        claim_open_at=now - timedelta(seconds=1),
+        claim_close_at=now + timedelta(hours=1),
+    )
+    early = User(email="stale-early@example.com", password_hash="x")
+    late = User(email="stale-late@example.com", password_hash="x")
+    db_session.add_all([drop, early, late])
+    db_session.flush()
+    waitlist.insert_entry(db_session, drop, waitlist.new_entry(early, drop))
+
+    assert allocation_service.ensure_snapshot(db_session, drop) is True
+    # the join request loaded the drop before that snapshot committed
+    set_committed_value(drop, "allocation_built_at", None)
+    waitlist.insert_entry(db_session, drop, waitlist.new_entry(late, drop))
+
+    ranked = db_session.scalars(select(Allocation.user_id).where(Allocation.drop_id == drop.id))
+    assert set(ranked) == {early.id, late.id}
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from app.models import Allocation, WaitlistArchive, WaitlistEntry
+from app.services import archive as archive_service
+from utils import auth_headers, create_drop, login, signup
+
+
+def test_closed_drops_move_to_the_archive_and_stay_readable(client, db_session):
+    password = "S3curePass!"
+    signup(client, "archive-admin@example.com", password, is_admin=True)
+    admin_headers = auth_headers(login(client, "archive-admin@example.com", password))
+    drop_id = create_drop(client, admin_headers["Authorization"].split()[1], stock=1)["id"]
+    tokens = {}
+    for name in ("archive-a", "archive-b", "archive-c"):
+        signup(client, f"{name}@example.com", password)
+        tokens[name] = auth_headers(login(client, f"{name}@example.com", password))
+        assert client.post(f"/drops/{drop_id}/join", headers=tokens[name]).status_code == 200
+    live = {
+        name: client.get(f"/drops/{drop_id}/waitlist/me", headers=headers).json() for name, headers in tokens.items()
+    }
+    winner = next(name for name, status in live.items() if status["rank"] == 0)
+    assert client.post(f"/drops/{drop_id}/claim", headers=tokens[winner]).status_code == 200
+
+    after_close = datetime.now(timezone.utc) + timedelta(days=1)
+    [report] = archive_service.archive_closed_drops(db_session, batch_size=2, now=after_close)
+    assert (str(report.drop_id), report.entries) == (drop_id, 3)
+    assert archive_service.archive_closed_drops(db_session, now=after_close) == []
+    for model in (WaitlistEntry, Allocation):
+        assert db_session.scalar(select(func.count()).select_from(model)) == 0
+    assert db_session.scalar(select(func.count()).select_from(WaitlistArchive)) == 3
+
+    for name, headers in tokens.items():
+        archived = client.get(f"/drops/{drop_id}/waitlist/me", headers=headers).json()
+        assert archived["archived"] is True
+        assert archived["rank"] == live[name]["rank"]
+        assert archived["priority_score"] == live[name]["priority_score"]
+        assert archived["status"] == ("claimed" if name == winner else "waiting")
+
+    first = client.get(f"/admin/drops/{drop_id}/archive", params={"limit": 2}, headers=admin_headers).json()
+    rest = client.get(
+        f"/admin/drops/{drop_id}/archive", params={"cursor": first["next_cursor"]}, headers=admin_headers
+    ).json()
+    assert [item["rank"] for item in first["items"] + rest["items"]] == [0, 1, 2]
+    assert rest["next_cursor"] is None
+
+    export = client.get(f"/admin/drops/{drop_id}/archive/export", headers=admin_headers)
+    assert export.text.splitlines()[0] == "user_id,email,rank,priority_score,joined_at,status"
+    assert len(export.text.splitlines()) == 4
+    assert client.post("/admin/drops/archive", headers=admin_headers).json() == []
+
+
+def test_join_and_leave_are_refused_once_the_drop_has_closed(client):
+    password = "S3curePass!"
+    signup(client, "closed-admin@example.com", password, is_admin=True)
+    admin_token = login(client, "closed-admin@example.com", password)
+    now = datetime.now(timezone.utc)
+    drop_id = create_drop(
+        client,
+        admin_token,
+        waitlist_open_at=now - timedelta(hours=2),
+        claim_open_at=now - timedelta(hours=1),
+        claim_close_at=now - timedelta(minutes=1),
+    )["id"]
+    signup(client, "closed-user@example.com", password)
+    headers = auth_headers(login(client, "closed-user@example.com", password))
+
+    for action in ("join", "leave"):
+        response = client.post(f"/drops/{drop_id}/{action}", headers=headers)
+        assert response.status_code == 409
+        assert response.json()["detail"] == "Waitlist closed"
@@ -0,0 +1,75 @@
+import os
+import tempfile
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import database
+from app.config import get_settings
+from app.main import create_application
+from utils import auth_headers, create_drop, login, signup
+
+
+@pytest.fixture()
+def async_client(db_engine):
+    tmpdir = tempfile.mkdtemp(prefix="dropspot-async-")
+    db_path = os.path.join(tmpdir, "test.db")
+    sync_engine = create_engine(f"sqlite:///{db_path}", future=True)
+    database.Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+
+    previous_engine, previous_factory = database.async_engine, database.AsyncSessionLocal
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    database.override_async_engine(async_engine)
+    os.environ["DATABASE_MODE"] = "async"
+    get_settings.cache_clear()
+    try:
+        app = create_application()
+        with TestClient(app) as test_client:
+            yield test_client
+            test_client.portal.call(async_engine.dispose)
+    finally:
+        os.environ.pop("DATABASE_MODE", None)
+        get_settings.cache_clear()
+        database.async_engine, database.AsyncSessionLocal = previous_engine, previous_factory
+
+
+def test_async_mode_serves_waitlist_flow(async_client):
+    password = "S3curePass!"
+    signup(async_client, "async-admin@example.com", password, is_admin=True)
+    admin_token = login(async_client, "async-admin@example.com", password)
+    drop_id = create_drop(async_client, admin_token, stock=1)["id"]
+
+    listed = async_client.get("/drops")
+    assert [drop["id"] for drop in listed.json()] == [drop_id]
+
+    signup(async_client, "async-user@example.com", password)
+    token = login(async_client, "async-user@example.com", password)
+    assert async_client.get("/auth/me", headers=auth_headers(token)).json()["email"] == "async-user@example.com"
+
+    join = async_client.post(f"/drops/{drop_id}/join", headers=auth_headers(token))
+    assert join.json() == {"status": "joined", "already_joined": False}
+
+    claim = async_client.post(f"/drops/{drop_id}/claim", headers=auth_headers(token))
+    assert claim.status_code == 200, claim.text
+    repeat = async_client.post(f"/drops/{drop_id}/claim", headers=auth_headers(token))
+    assert repeat.json()["claim_code"] == claim.json()["claim_code"]
+
+    status_resp = async_client.get(f"/drops/{drop_id}/waitlist/me", headers=auth_headers(token))
+    assert status_resp.json()["status"] == "claimed"
+    assert status_resp.json()["rank"] == 0
+
+    page = async_client.get(f"/admin/drops/{drop_id}/claims", headers=auth_headers(admin_token)).json()
+    assert [item["email"] for item in page["items"]] == ["async-user@example.com"]
+    export = async_client.get(f"/admin/drops/{drop_id}/waitlist/export", headers=auth_headers(admin_token))
+    assert export.text.splitlines()[1].split(",")[2] == "async-user@example.com"
+
+    update = async_client.put(f"/admin/drops/{drop_id}", json={"stock": 3}, headers=auth_headers(admin_token))
+    assert update.json()["stock"] == 3
+    assert async_client.delete(f"/admin/drops/{drop_id}", headers=auth_headers(admin_token)).status_code == 204
@@ -0,0 +1,47 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from utils import auth_headers, create_drop, login, signup
+
+
+def _admin_token(client) -> str:
+    signup(client, "catalog-admin@example.com", "AdminPass123!", is_admin=True)
+    return login(client, "catalog-admin@example.com", "AdminPass123!")
+
+
+def test_catalog_etag_revalidation_and_admin_invalidation(client):
+    admin_token = _admin_token(client)
+    drop = create_drop(client, admin_token, title="Cached Drop")
+
+    first = client.get("/drops")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert [item["title"] for item in first.json()] == ["Cached Drop"]
+
+    not_modified = client.get("/drops", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    detail = client.get(f"/drops/{drop['id']}")
+    assert detail.status_code == 200
+    assert client.get(f"/drops/{drop['id']}", headers={"If-None-Match": detail.headers["etag"]}).status_code == 304
+
+    response = client.put(f"/admin/drops/{drop['id']}", json={"title": "Renamed"}, headers=auth_headers(admin_token))
+    assert response.status_code == 200, response.text
+
+    refreshed = client.get("/drops", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+    assert refreshed.json()[0]["title"] == "Renamed"
+    assert client.get(f"/drops/{drop['id']}").json()["title"] == "Renamed"
+
+
+def test_active_list_expires_at_next_claim_close(client):
+    admin_token = _admin_token(client)
+    closes_at = datetime.now(timezone.utc) + timedelta(seconds=1)
+    create_drop(client, admin_token, title="Closing Soon", claim_close_at=closes_at)
+
+    assert [item["title"] for item in client.get("/drops").json()] == ["Closing Soon"]
+
+    time.sleep(max((closes_at - datetime.now(timezone.utc)).total_seconds(), 0) + 0.1)
+    assert client.get("/drops").json() == []
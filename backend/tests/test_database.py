@@ -0,0 +1,26 @@
+from sqlalchemy import text
+
+from app.config import Settings
+from app.database import build_engine, engine_options
+
+
+def test_sqlite_profile_applies_pragmas_on_connect(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'profile.db'}", Settings(SQLITE_BUSY_TIMEOUT_MS=1234))
+    try:
+        with engine.connect() as conn:
+            assert conn.scalar(text("PRAGMA journal_mode")) == "wal"
+            assert conn.scalar(text("PRAGMA synchronous")) == 1  # NORMAL
+            assert conn.scalar(text("PRAGMA busy_timeout")) == 1234
+            assert conn.scalar(text("PRAGMA cache_size")) == -64_000
+    finally:
+        engine.dispose()
+
+
+def test_server_profile_sets_pool_options():
+    settings = Settings(DB_POOL_SIZE=7, DB_MAX_OVERFLOW=3, DATABASE_ECHO=False)
+    options = engine_options("postgresql://db.internal/dropspot", settings)
+    assert options["pool_size"] == 7
+    assert options["max_overflow"] == 3
+    assert options["pool_pre_ping"] is True
+    assert options["echo"] is False
+    assert "pool_size" not in engine_options("sqlite://", settings)
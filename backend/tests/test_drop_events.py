@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.events import DropEventBroker
+from app.models import Drop, User
+from app.services import allocation, waitlist
+from utils import auth_headers, login, signup
+
+
+def test_watchers_share_one_coalesced_refresh(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'events.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    now = datetime.now(timezone.utc)
+    with SessionFactory() as session:
+        drop = Drop(
+            title="Live",
+            stock=1,
+            waitlist_open_at=now - timedelta(minutes=1),
+            claim_open_at=now + timedelta(hours=1),
+            claim_close_at=now + timedelta(hours=2),
+        )
+        users = [User(email=f"live-{i}@example.com", password_hash="x") for i in range(3)]
+        session.add_all([drop, *users])
+        session.commit()
+    principals = [SimpleNamespace(id=user.id, created_at=user.created_at) for user in users]
+    with SessionFactory() as session:
+        waitlist.insert_entry(session, drop, waitlist.new_entry(principals[0], drop))
+
+    broker = DropEventBroker(SessionFactory, debounce_ms=20, resync_seconds=60)
+
+    async def scenario():
+        first = await broker.subscribe(drop.id, principals[0].id)
+        second = await broker.subscribe(drop.id, principals[1].id)
+        initial = await first.next(timeout=2)
+        # before the snapshot exists the rank is the live position
+        assert (initial["status"], initial["rank"], initial["eligible"]) == ("waiting", 0, True)
+        assert initial["remaining_stock"] == 1 and initial["claim_window"] == "upcoming"
+        assert (await second.next(timeout=2))["status"] == "not_registered"
+        refreshes = broker.refreshes
+
+        with SessionFactory() as session:
+            waitlist.insert_entry(session, drop, waitlist.new_entry(principals[1], drop))
+        for _ in range(20):
+            broker.publish(drop.id)
+        joined = await second.next(timeout=2)
+        assert joined["status"] == "waiting"
+        # one refresh pushed to both, so the first watcher's latest state is already current
+        live = sorted((state["rank"], state["eligible"]) for state in (joined, first.latest))
+        assert live == [(0, True), (1, False)]
+        assert broker.refreshes - refreshes == 1
+
+        with SessionFactory() as session:
+            stored = session.get(Drop, drop.id)
+            stored.claim_open_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+            session.commit()
+            assert allocation.ensure_snapshot(session, stored)
+        broker.publish(drop.id)
+        ranked = [await watcher.next(timeout=2) for watcher in (first, second)]
+        assert sorted((state["rank"], state["eligible"]) for state in ranked) == [(0, True), (1, False)]
+
+        broker.unsubscribe(first)
+        broker.unsubscribe(second)
+        assert broker.watcher_count() == 0
+
+    asyncio.run(scenario())
+    engine.dispose()
+
+
+def test_event_stream_requires_auth_and_existing_drop(client):
+    assert client.get(f"/drops/{uuid4()}/events").status_code == 401
+    signup(client, "watcher@example.com", "WatchPass123!")
+    token = login(client, "watcher@example.com", "WatchPass123!")
+    assert client.get(f"/drops/{uuid4()}/events", params={"access_token": token}).status_code == 404
+    assert client.get(f"/drops/{uuid4()}/events", headers=auth_headers(token)).status_code == 404
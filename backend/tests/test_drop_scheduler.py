@@ -0,0 +1,88 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app import caching
+from app.models import Claim, Drop
+from app.services.drop_scheduler import DropScheduler
+from utils import auth_headers, create_drop, iso, login, signup
+
+PASSWORD = "S3curePass!"
+
+
+def _pending(scheduler: DropScheduler) -> list[str]:
+    return [item.kind for item in scheduler.pending()]
+
+
+def test_transitions_fire_in_order_and_follow_admin_edits(client, db_session):
+    signup(client, "sched-admin@example.com", PASSWORD, is_admin=True)
+    admin_token = login(client, "sched-admin@example.com", PASSWORD)
+    admin = auth_headers(admin_token)
+    now = datetime.now(timezone.utc)
+    drop_id = create_drop(
+        client,
+        admin_token,
+        waitlist_open_at=now + timedelta(hours=1),
+        claim_open_at=now + timedelta(hours=2),
+        claim_close_at=now + timedelta(hours=3),
+    )["id"]
+    scheduler = DropScheduler(lambda: db_session, resync_seconds=0)
+    assert scheduler.load() == 3
+    assert _pending(scheduler) == ["waitlist_open", "claim_open", "claim_close"]
+    assert scheduler.run_due() == []
+
+    moved = client.put(
+        f"/admin/drops/{drop_id}", json={"claim_close_at": iso(now + timedelta(hours=5))}, headers=admin
+    )
+    assert moved.status_code == 200, moved.text
+    scheduler.reschedule(db_session.get(Drop, uuid.UUID(drop_id)))
+    assert [(item.kind, item.at) for item in scheduler.pending()][-1] == ("claim_close", now + timedelta(hours=5))
+    assert len(scheduler.pending()) == 3
+
+    # the waitlist opened: only that transition fires, and it warms the catalog
+    caching.clear_all()
+    [report] = scheduler.run_due(now + timedelta(hours=1, minutes=1))
+    assert (str(report.drop_id), report.kind) == (drop_id, "waitlist_open")
+    assert caching.stats()["catalog"]["size"] == 2
+    assert _pending(scheduler) == ["claim_open", "claim_close"]
+
+    assert client.delete(f"/admin/drops/{drop_id}", headers=admin).status_code == 204
+    scheduler.unschedule(uuid.UUID(drop_id))
+    assert scheduler.pending() == []
+    assert scheduler.run_due(now + timedelta(days=1)) == []
+
+
+def test_claim_open_builds_the_snapshot_before_any_request(client, db_session):
+    signup(client, "sched-push@example.com", PASSWORD, is_admin=True)
+    admin_token = login(client, "sched-push@example.com", PASSWORD)
+    now = datetime.now(timezone.utc)
+    drop_id = create_drop(
+        client, admin_token, stock=1, allocation_mode="push", claim_open_at=now + timedelta(minutes=5)
+    )["id"]
+    tokens = []
+    for index in range(2):
+        signup(client, f"sched-{index}@example.com", PASSWORD)
+        tokens.append(login(client, f"sched-{index}@example.com", PASSWORD))
+        assert client.post(f"/drops/{drop_id}/join", headers=auth_headers(tokens[-1])).status_code == 200
+
+    scheduler = DropScheduler(lambda: db_session, resync_seconds=0)
+    scheduler.load()
+    assert scheduler.run_due() == []
+    opened = client.put(
+        f"/admin/drops/{drop_id}",
+        json={"claim_open_at": iso(now - timedelta(seconds=1))},
+        headers=auth_headers(admin_token),
+    )
+    assert opened.status_code == 200, opened.text
+
+    # a drop whose window opened without a snapshot is due at once, on rebuild as on edit
+    scheduler.load()
+    assert _pending(scheduler) == ["claim_open", "claim_close"]
+    [report] = scheduler.run_due()
+    assert (str(report.drop_id), report.kind) == (drop_id, "claim_open")
+    drop = db_session.get(Drop, uuid.UUID(drop_id))
+    assert drop.allocation_built_at is not None and drop.claimed_count == 1
+    assert db_session.query(Claim).count() == 1
+    assert _pending(scheduler) == ["claim_close"]
+
+    scheduler.load()
+    assert _pending(scheduler) == ["claim_close"]
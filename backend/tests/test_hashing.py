@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app import hashing
+from utils import auth_headers, login, signup
+
+
+def test_inline_hasher_round_trip_records_latency():
+    hasher = hashing.PasswordHasher(workers=0, max_pending=4)
+    hashed = hasher.hash("S3curePass!")
+    assert hasher.verify("S3curePass!", hashed)
+    assert not hasher.verify("wrong-password", hashed)
+
+    stats = hasher.stats()
+    assert stats["completed"] == 3
+    assert stats["queue_depth"] == 0
+    assert stats["latency_max_ms"] > 0
+
+
+def test_inline_hasher_keeps_async_callers_off_the_event_loop(monkeypatch):
+    hash_threads = []
+
+    def recording_hash(password: str) -> str:
+        hash_threads.append(threading.get_ident())
+        return "hashed"
+
+    monkeypatch.setattr(hashing, "_hash", recording_hash)
+    hasher = hashing.PasswordHasher(workers=0, max_pending=4)
+
+    async def hash_on_loop():
+        return threading.get_ident(), await hasher.hash_async("S3curePass!")
+
+    loop_thread, hashed = asyncio.run(hash_on_loop())
+    assert hashed == "hashed"
+    assert hash_threads and loop_thread not in hash_threads
+    assert hasher.stats()["completed"] == 1
+
+
+def test_hasher_rejects_with_503_when_queue_is_full(monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking_hash(password: str) -> str:
+        started.set()
+        release.wait(timeout=5)
+        return "hashed"
+
+    monkeypatch.setattr(hashing, "_hash", blocking_hash)
+    hasher = hashing.PasswordHasher(workers=0, max_pending=1)
+    holder = threading.Thread(target=hasher.hash, args=("first",))
+    holder.start()
+    assert started.wait(timeout=5)
+
+    with pytest.raises(HTTPException) as excinfo:
+        hasher.hash("second")
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.headers["Retry-After"] == "1"
+    assert hasher.stats()["queue_depth"] == 1
+
+    release.set()
+    holder.join(timeout=5)
+    stats = hasher.stats()
+    assert (stats["queue_depth"], stats["completed"], stats["rejected"]) == (0, 1, 1)
+
+
+def test_process_pool_hasher_verifies_inline_hashes():
+    hasher = hashing.PasswordHasher(workers=1, max_pending=2)
+    try:
+        hashed = hashing.PasswordHasher(workers=0, max_pending=0).hash("S3curePass!")
+        assert hasher.verify("S3curePass!", hashed)
+    finally:
+        hasher.shutdown()
+
+
+def test_hasher_stats_are_admin_only_and_health_stays_a_liveness_answer(client):
+    assert client.get("/health").json() == {"status": "ok"}
+
+    signup(client, "stats-user@example.com", "S3curePass!")
+    user = login(client, "stats-user@example.com", "S3curePass!")
+    assert client.get("/admin/stats").status_code == 401
+    assert client.get("/admin/stats", headers=auth_headers(user)).status_code == 403
+
+    signup(client, "stats-admin@example.com", "S3curePass!", is_admin=True)
+    admin = login(client, "stats-admin@example.com", "S3curePass!")
+    stats = client.get("/admin/stats", headers=auth_headers(admin))
+    assert stats.status_code == 200, stats.text
+    assert stats.json()["password_hasher"]["completed"] >= 4
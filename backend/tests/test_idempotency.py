@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from sqlalchemy import delete, event
+
+from app import database, idempotency, metrics
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.models import IdempotencyRecord
+from app.singleton import Singleton
+from utils import auth_headers, create_drop, login, signup
+
+
+def test_retry_with_the_same_key_replays_the_response_without_running_it(client, db_engine):
+    password = "S3curePass!"
+    signup(client, "idem-admin@example.com", password, is_admin=True)
+    drop_id = create_drop(client, login(client, "idem-admin@example.com", password), stock=1)["id"]
+    signup(client, "idem-user@example.com", password)
+    headers = auth_headers(login(client, "idem-user@example.com", password))
+
+    first = client.post(f"/drops/{drop_id}/join", headers={**headers, "Idempotency-Key": "join-1"})
+    assert first.json()["status"] == "joined"
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    replays = metrics.IDEMPOTENT_REPLAYS.value(action="join")
+    event.listen(db_engine, "before_cursor_execute", listener)
+    try:
+        retry = client.post(f"/drops/{drop_id}/join", headers={**headers, "Idempotency-Key": "join-1"})
+    finally:
+        event.remove(db_engine, "before_cursor_execute", listener)
+    assert (retry.status_code, retry.content, retry.headers) == (first.status_code, first.content, first.headers)
+    assert statements == []
+    assert metrics.IDEMPOTENT_REPLAYS.value(action="join") == replays + 1
+
+    # a new key is a new request
+    again = client.post(f"/drops/{drop_id}/join", headers={**headers, "Idempotency-Key": "join-2"})
+    assert again.json()["status"] == "already_joined"
+    too_long = client.post(f"/drops/{drop_id}/join", headers={**headers, "Idempotency-Key": "k" * 256})
+    assert too_long.status_code == 400
+
+
+@pytest.fixture()
+def persisted_store(db_engine, monkeypatch):
+    store = IdempotencyStore(maxsize=100, ttl=60, persist=True)
+    monkeypatch.setattr(idempotency, "_store", Singleton(lambda: store))
+    yield store
+    with database.SessionLocal() as session:
+        session.execute(delete(IdempotencyRecord))
+        session.commit()
+
+
+async def _post_claim(middleware):
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/drops/d/claim",
+        "headers": [(b"authorization", b"Bearer t"), (b"idempotency-key", b"claim-1")],
+    }
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, None, send)
+    return messages[0]["status"], messages[1]["body"]
+
+
+def test_concurrent_duplicates_wait_for_the_first_and_other_workers_read_the_table(persisted_store, monkeypatch):
+    calls = 0
+
+    async def app(scope, receive, send):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": f"call {calls}".encode()})
+
+    async def burst():
+        middleware = IdempotencyMiddleware(app)
+        return await asyncio.gather(*(_post_claim(middleware) for _ in range(5)))
+
+    assert asyncio.run(burst()) == [(200, b"call 1")] * 5
+    assert calls == 1
+
+    # a worker with an empty cache finds the stored response in the database
+    store = IdempotencyStore(maxsize=100, ttl=60, persist=True)
+    monkeypatch.setattr(idempotency, "_store", Singleton(lambda: store))
+    assert asyncio.run(_post_claim(IdempotencyMiddleware(app))) == (200, b"call 1")
+    assert calls == 1
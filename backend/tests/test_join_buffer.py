@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import Base
+from app.models import Drop, User, WaitlistEntry
+from app.services import allocation, waitlist
+from app.services.join_buffer import JoinBuffer
+
+
+@pytest.fixture
+def buffer_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'joins.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def _seed(engine, users: int) -> tuple[Drop, list[SimpleNamespace]]:
+    now = datetime.now(timezone.utc)
+    with Session(engine, expire_on_commit=False) as session:
+        drop = Drop(
+            title="Opening burst",
+            stock=5,
+            waitlist_open_at=now - timedelta(seconds=1),
+            claim_open_at=now + timedelta(hours=1),
+            claim_close_at=now + timedelta(hours=2),
+        )
+        accounts = [User(email=f"burst-{i}@example.com", password_hash="x") for i in range(users)]
+        session.add_all([drop, *accounts])
+        session.commit()
+        principals = [SimpleNamespace(id=user.id, created_at=user.created_at) for user in accounts]
+    return drop, principals
+
+
+def test_buffered_joins_match_unbuffered_answers(buffer_engine):
+    drop, users = _seed(buffer_engine, 20)
+    SessionFactory = sessionmaker(bind=buffer_engine, autoflush=False)
+
+    # one user joined before the buffer existed, through the normal path
+    with SessionFactory() as session:
+        _, already = waitlist.insert_entry(session, drop, waitlist.new_entry(users[0], drop))
+        assert already is False
+
+    buffer = JoinBuffer(SessionFactory, window_ms=50, max_batch=100)
+    entries = [waitlist.new_entry(user, drop) for user in users] + [waitlist.new_entry(users[1], drop)]
+    try:
+        with ThreadPoolExecutor(max_workers=len(entries)) as pool:
+            results = list(pool.map(buffer.join, entries))
+    finally:
+        buffer.close()
+
+    assert [already for _, already in results] == [True] + [False] * 19 + [True]
+    assert results[-1][0].id == results[1][0].id
+    assert buffer.stats()["batches"] < len(entries)
+
+    with SessionFactory() as session:
+        assert session.scalar(select(func.count()).select_from(WaitlistEntry)) == 20
+        stored = session.get(WaitlistEntry, entries[5].id)
+        assert stored.joined_at.replace(tzinfo=timezone.utc) == entries[5].joined_at
+        assert float(stored.priority_score) == pytest.approx(entries[5].priority_score)
+
+
+def test_join_racing_a_snapshot_build_is_slotted_in(buffer_engine):
+    drop, users = _seed(buffer_engine, 2)
+    SessionFactory = sessionmaker(bind=buffer_engine, autoflush=False)
+    with SessionFactory() as session:
+        waitlist.insert_entry(session, drop, waitlist.new_entry(users[0], drop))
+        stored = session.get(Drop, drop.id)
+        stored.claim_open_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        session.commit()
+        assert allocation.ensure_snapshot(session, stored)
+
+    # the caller saw no snapshot when it chose the buffer
+    buffer = JoinBuffer(SessionFactory, window_ms=0, max_batch=10)
+    try:
+        _, already = buffer.join(waitlist.new_entry(users[1], drop))
+    finally:
+        buffer.close()
+
+    assert already is False
+    with SessionFactory() as session:
+        ranks = sorted(waitlist.waitlist_status(session, user, drop.id)["rank"] for user in users)
+    assert ranks == [0, 1]
+
+
+def test_a_failing_join_does_not_fail_the_rest_of_its_batch(buffer_engine):
+    drop, users = _seed(buffer_engine, 4)
+    SessionFactory = sessionmaker(bind=buffer_engine, autoflush=False)
+    with SessionFactory() as session:
+        taken, _ = waitlist.insert_entry(session, drop, waitlist.new_entry(users[0], drop))
+
+    buffer = JoinBuffer(SessionFactory, window_ms=200, max_batch=3)
+    entries = [waitlist.new_entry(user, drop) for user in users[1:]]
+    # collides with an existing entry's primary key, which ON CONFLICT (user_id, drop_id) does not cover
+    entries[1].id = taken.id
+    try:
+        futures = [buffer._submit(entry) for entry in entries]
+        outcomes = [future.exception() or future.result() for future in futures]
+    finally:
+        buffer.close()
+
+    assert isinstance(outcomes[1], IntegrityError)
+    assert [outcomes[0][1], outcomes[2][1]] == [False, False]
+    with SessionFactory() as session:
+        assert session.scalar(select(func.count()).select_from(WaitlistEntry)) == 3
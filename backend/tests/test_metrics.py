@@ -0,0 +1,53 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.config import get_settings
+from app.main import create_application
+from utils import auth_headers, create_drop, login, signup
+
+
+@pytest.fixture(autouse=True)
+def metrics_enabled(monkeypatch):
+    monkeypatch.setenv("METRICS_ENABLED", "true")
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+def test_metrics_endpoint_reports_routes_sql_and_domain_counters(client):
+    signup(client, "metrics-admin@example.com", "AdminPass123!", is_admin=True)
+    admin_token = login(client, "metrics-admin@example.com", "AdminPass123!")
+    drop_id = create_drop(client, admin_token, stock=1)["id"]
+
+    tokens = []
+    for index in range(2):
+        email = f"metrics-{index}@example.com"
+        signup(client, email, "UserPass123!")
+        tokens.append(login(client, email, "UserPass123!"))
+        assert client.post(f"/drops/{drop_id}/join", headers=auth_headers(tokens[-1])).status_code == 200
+    conflicts_before = sum(metrics.CLAIM_CONFLICTS.value(reason=r) for r in ("sold_out", "not_eligible", "race"))
+    statuses = sorted(client.post(f"/drops/{drop_id}/claim", headers=auth_headers(t)).status_code for t in tokens)
+    assert statuses == [200, 409]
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+
+    assert 'http_request_duration_seconds_count{method="POST",route="/drops/{drop_id}/join",status="200"}' in body
+    assert 'http_request_sql_statements_bucket{method="POST",route="/drops/{drop_id}/claim",le="+Inf"}' in body
+    assert "db_statement_duration_seconds_bucket" in body
+    assert "db_pool_checkout_wait_seconds_count" in body
+    assert 'dropspot_waitlist_joins_total{result="joined"}' in body
+    assert 'dropspot_claims_total{result="created"}' in body
+    assert 'dropspot_cache_hits_total{cache="principal"}' in body
+    conflicts_after = sum(metrics.CLAIM_CONFLICTS.value(reason=r) for r in ("sold_out", "not_eligible", "race"))
+    assert conflicts_after == conflicts_before + 1
+    assert metrics.REQUEST_SQL_STATEMENTS.count(method="POST", route="/drops/{drop_id}/claim") >= 2
+
+
+def test_metrics_endpoint_is_off_unless_enabled(monkeypatch):
+    monkeypatch.setenv("METRICS_ENABLED", "false")
+    get_settings.cache_clear()
+    assert TestClient(create_application()).get("/metrics").status_code == 404
@@ -0,0 +1,118 @@
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app.models import User, WaitlistEntry
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def _config(url: str) -> Config:
+    config = Config(str(BACKEND / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND / "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def test_migrations_build_the_model_schema_and_downgrade_cleanly(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    config = _config(url)
+
+    command.upgrade(config, "head")
+    # fails with the pending operations if app/models.py changed without a migration
+    command.check(config)
+
+    command.downgrade(config, "base")
+    engine = create_engine(url)
+    assert inspect(engine).get_table_names() == ["alembic_version"]
+    engine.dispose()
+
+
+def test_compact_storage_migration_converts_existing_rows(tmp_path):
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    config = _config(url)
+    command.upgrade(config, "0004")
+    engine = create_engine(url)
+    user_id, drop_id, entry_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO users (id, email, password_hash, is_admin, created_at)"
+                " VALUES (:id, 'a@b.c', 'x', 0, :now)"
+            ),
+            {"id": user_id.hex, "now": now},
+        )
+        conn.execute(
+            text(
+                "INSERT INTO drops (id, title, stock, waitlist_open_at, claim_open_at, claim_close_at, base_priority,"
+                " claimed_count, allocation_mode, created_at, updated_at)"
+                " VALUES (:id, 'Drop', 1, :now, :now, :now, 0, 0, 'claim', :now, :now)"
+            ),
+            {"id": drop_id.hex, "now": now},
+        )
+        conn.execute(
+            text(
+                "INSERT INTO waitlist_entries (id, user_id, drop_id, joined_at, priority_score, status)"
+                " VALUES (:id, :user_id, :drop_id, :now, 12.3456, 'claimed')"
+            ),
+            {"id": entry_id.hex, "user_id": user_id.hex, "drop_id": drop_id.hex, "now": now},
+        )
+
+    command.upgrade(config, "head")
+    with Session(engine) as session:
+        entry = session.get(WaitlistEntry, entry_id)
+        assert (entry.user_id, entry.drop_id) == (user_id, drop_id)
+        assert (entry.priority_score, entry.status) == (12.3456, "claimed")
+        assert session.get(User, user_id).email == "a@b.c"
+
+    command.downgrade(config, "0004")
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT id, user_id, priority_score, status FROM waitlist_entries")).one()
+    assert (row.id, row.user_id) == (entry_id.hex, user_id.hex)
+    assert (float(row.priority_score), row.status) == (12.3456, "claimed")
+    engine.dispose()
+
+
+def test_a_baseline_database_upgrades_with_its_claim_counters_filled(tmp_path):
+    url = f"sqlite:///{tmp_path / 'baseline.db'}"
+    config = _config(url)
+    command.upgrade(config, "0001")
+    engine = create_engine(url)
+    now = datetime.now(timezone.utc)
+    drop_id = uuid.uuid4()
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO drops (id, title, stock, waitlist_open_at, claim_open_at, claim_close_at, base_priority,"
+                " created_at, updated_at) VALUES (:id, 'Drop', 3, :now, :now, :now, 0, :now, :now)"
+            ),
+            {"id": drop_id.hex, "now": now},
+        )
+        for code in ("a", "b"):
+            user_id = uuid.uuid4()
+            conn.execute(
+                text(
+                    "INSERT INTO users (id, email, password_hash, is_admin, created_at)"
+                    " VALUES (:id, :email, 'x', 0, :now)"
+                ),
+                {"id": user_id.hex, "email": f"{code}@b.c", "now": now},
+            )
+            conn.execute(
+                text(
+                    "INSERT INTO claims (id, drop_id, user_id, claim_code, claimed_at)"
+                    " VALUES (:id, :drop_id, :user_id, :code, :now)"
+                ),
+                {"id": uuid.uuid4().hex, "drop_id": drop_id.hex, "user_id": user_id.hex, "code": code, "now": now},
+            )
+
+    command.upgrade(config, "0002")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT claimed_count, allocation_mode FROM drops")).one() == (2, "claim")
+    engine.dispose()
@@ -0,0 +1,47 @@
+from sqlalchemy import event
+
+from app import caching
+from app.models import User
+from utils import auth_headers, login, signup
+
+
+def test_authenticated_requests_reuse_cached_principal(client, db_engine):
+    signup(client, "cached@example.com", "S3curePass!")
+    token = login(client, "cached@example.com", "S3curePass!")
+    assert client.get("/auth/me", headers=auth_headers(token)).status_code == 200
+
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", _count)
+    try:
+        response = client.get("/auth/me", headers=auth_headers(token))
+    finally:
+        event.remove(db_engine, "before_cursor_execute", _count)
+
+    assert response.json()["email"] == "cached@example.com"
+    assert statements == []
+    assert caching.stats()["principal"]["hits"] >= 1
+
+
+def test_principal_cache_invalidated_when_user_changes(client, db_session):
+    signup(client, "promoted@example.com", "S3curePass!")
+    token = login(client, "promoted@example.com", "S3curePass!")
+    assert client.get("/auth/me", headers=auth_headers(token)).json()["is_admin"] is False
+    assert client.get("/admin/drops", headers=auth_headers(token)).status_code == 403
+
+    user = db_session.query(User).filter_by(email="promoted@example.com").one()
+    user.is_admin = True
+    db_session.flush()
+    # flushed, not committed: the cached principal stays
+    assert client.get("/auth/me", headers=auth_headers(token)).json()["is_admin"] is False
+    db_session.commit()
+
+    assert client.get("/auth/me", headers=auth_headers(token)).json()["is_admin"] is True
+    assert client.get("/admin/drops", headers=auth_headers(token)).status_code == 200
+
+    db_session.delete(user)
+    db_session.commit()
+    assert client.get("/auth/me", headers=auth_headers(token)).status_code == 401
@@ -0,0 +1,53 @@
+import re
+
+import pytest
+
+from app import caching
+from app.config import get_settings
+from app.profiling import get_profile_store
+from app.services import catalog
+from utils import auth_headers, create_drop, login, signup
+
+
+@pytest.fixture(autouse=True)
+def profiler_enabled(monkeypatch):
+    monkeypatch.setenv("PROFILER_ENABLED", "true")
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+def test_admins_profile_single_requests_into_collapsed_stacks(client):
+    get_profile_store().clear()
+    password = "S3curePass!"
+    signup(client, "profiler-admin@example.com", password, is_admin=True)
+    signup(client, "profiler-user@example.com", password)
+    admin_token = login(client, "profiler-admin@example.com", password)
+    user_headers = auth_headers(login(client, "profiler-user@example.com", password))
+    drop_id = create_drop(client, admin_token)["id"]
+
+    unprofiled = client.post(f"/drops/{drop_id}/join", headers={**user_headers, "X-Profile": "1"})
+    assert unprofiled.status_code == 200
+    assert "x-profile-id" not in unprofiled.headers
+
+    # the admin check only reads the principal cache: a token this worker has not seen is not profiled
+    caching.clear_all()
+    cold = client.get(f"/drops/{drop_id}", headers={**auth_headers(admin_token), "X-Profile": "1"})
+    assert cold.status_code == 200
+    assert "x-profile-id" not in cold.headers
+    assert client.get("/auth/me", headers=auth_headers(admin_token)).status_code == 200
+    catalog.invalidate()
+
+    response = client.get(f"/drops/{drop_id}", headers={**auth_headers(admin_token), "X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    [summary] = client.get("/admin/profiles", headers=auth_headers(admin_token)).json()
+    assert (summary["id"], summary["path"], summary["status"]) == (profile_id, f"/drops/{drop_id}", 200)
+    assert any(statement["sql"].lstrip().upper().startswith("SELECT") for statement in summary["statements"])
+
+    collapsed = client.get(f"/admin/profiles/{profile_id}", headers=auth_headers(admin_token))
+    assert collapsed.headers["content-type"].startswith("text/plain")
+    assert all(re.fullmatch(r"thread:[^;]+(;[^;]+)* \d+", line) for line in collapsed.text.splitlines())
+    assert client.get(f"/admin/profiles/{profile_id}", headers=user_headers).status_code == 403
+    assert client.get("/admin/profiles/missing", headers=auth_headers(admin_token)).status_code == 404
@@ -0,0 +1,45 @@
+from app import caching
+from utils import auth_headers, create_drop, login, signup
+
+# SQL statements one request may issue, with the caller's principal already cached.
+# The per-route counts are printed at the end of every test run.
+BUDGETS = {
+    "GET /drops": 1,
+    "GET /drops/{drop_id}": 1,
+    "POST /drops/{drop_id}/join": 4,
+    "GET /drops/{drop_id}/waitlist/me": 1,
+    "POST /drops/{drop_id}/claim": 4,
+    "POST /drops/{drop_id}/leave": 6,
+}
+
+
+def test_hot_endpoints_stay_within_query_budgets(client, query_budget):
+    password = "S3curePass!"
+    signup(client, "budget-admin@example.com", password, is_admin=True)
+    drop_id = create_drop(client, login(client, "budget-admin@example.com", password), stock=2)["id"]
+    users = []
+    for name in ("budget-first", "budget-second"):
+        signup(client, f"{name}@example.com", password)
+        users.append(auth_headers(login(client, f"{name}@example.com", password)))
+    first, second = users
+    assert client.post(f"/drops/{drop_id}/join", headers=second).status_code == 200
+
+    def request(method: str, route: str, headers=None):
+        # cold catalog and drop caches, warm principal cache
+        caching.clear_all()
+        for user in users:
+            assert client.get("/auth/me", headers=user).status_code == 200
+        key = f"{method} {route}"
+        with query_budget(key, BUDGETS[key]):
+            response = client.request(method, route.format(drop_id=drop_id), headers=headers)
+        assert response.status_code == 200, response.text
+        return response
+
+    request("GET", "/drops")
+    request("GET", "/drops/{drop_id}")
+    assert request("POST", "/drops/{drop_id}/join", first).json()["status"] == "joined"
+    # the first status read builds the allocation snapshot; budgets cover the steady state
+    assert client.get(f"/drops/{drop_id}/waitlist/me", headers=first).status_code == 200
+    assert request("GET", "/drops/{drop_id}/waitlist/me", first).json()["eligible"] is True
+    assert request("POST", "/drops/{drop_id}/claim", first).json()["claim_code"]
+    assert request("POST", "/drops/{drop_id}/leave", second).json()["status"] == "left"
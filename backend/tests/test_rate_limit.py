@@ -0,0 +1,49 @@
+import pytest
+
+from app import ratelimit
+from app.ratelimit import ActionTracker
+from app.singleton import Singleton
+from utils import auth_headers, create_drop, login, signup
+
+
+def test_sliding_window_weights_the_previous_window_and_evicts_lru():
+    tracker = ActionTracker(window_seconds=10, limit=0, max_keys=2, shards=1)
+    for _ in range(4):
+        tracker.record("bot", now=5.0)
+    assert tracker.count("bot", now=9.9) == 4
+    # halfway into the next window half of the previous one still counts
+    assert tracker.record("bot", now=15.0) == 3
+    assert tracker.count("bot", now=35.0) == 0
+
+    tracker.record("a", now=1.0)
+    tracker.record("b", now=1.0)
+    assert tracker.count("bot", now=15.0) == 0
+    assert tracker.stats() == {"tracked": 2, "evictions": 1, "limited": 0}
+
+
+@pytest.fixture()
+def strict_tracker(monkeypatch):
+    tracker = ActionTracker(window_seconds=60, limit=3, max_keys=100)
+    monkeypatch.setattr(ratelimit, "_tracker", Singleton(lambda: tracker))
+    return tracker
+
+
+def test_waitlist_actions_past_the_cap_get_429_before_touching_the_drop(client, strict_tracker):
+    password = "S3curePass!"
+    signup(client, "rl-admin@example.com", password, is_admin=True)
+    admin_token = login(client, "rl-admin@example.com", password)
+    drop_id = create_drop(client, admin_token, stock=1)["id"]
+    signup(client, "rl-user@example.com", password)
+    headers = auth_headers(login(client, "rl-user@example.com", password))
+
+    assert client.post(f"/drops/{drop_id}/join", headers=headers).json()["status"] == "joined"
+    assert client.post(f"/drops/{drop_id}/leave", headers=headers).json()["status"] == "left"
+    assert client.post(f"/drops/{drop_id}/join", headers=headers).json()["status"] == "joined"
+
+    limited = client.post(f"/drops/{drop_id}/leave", headers=headers)
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "60"
+    assert client.get(f"/drops/{drop_id}/waitlist/me", headers=headers).json()["status"] == "waiting"
+    # unknown drops are rejected by the limiter too: it runs before the drop lookup
+    assert client.post("/drops/00000000-0000-4000-8000-000000000000/claim", headers=headers).status_code == 429
+    assert strict_tracker.stats()["limited"] == 2
@@ -0,0 +1,75 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import caching, database
+from app.database import Base, build_engine
+from app.main import create_application
+from utils import auth_headers, create_drop, login, signup
+
+
+@pytest.fixture()
+def replicated(db_engine, tmp_path):
+    """A primary and two replica SQLite files; replicas only change when ``sync`` copies the primary."""
+    paths = [tmp_path / name for name in ("primary.db", "replica-1.db", "replica-2.db")]
+    primary, *replicas = [build_engine(f"sqlite:///{path}") for path in paths]
+    for target in (primary, *replicas):
+        Base.metadata.create_all(bind=target)
+
+    def sync(index: int) -> None:
+        replicas[index].dispose()
+        with sqlite3.connect(paths[0]) as source, sqlite3.connect(paths[index + 1]) as destination:
+            source.backup(destination)
+
+    previous = database.engine, database.SessionLocal, database.read_engines, database._read_sessions
+    database.override_engine(primary)
+    database.override_read_engines(replicas)
+    caching.clear_all()
+    try:
+        with TestClient(create_application()) as client:
+            yield client, sync
+    finally:
+        database.engine, database.SessionLocal, database.read_engines, database._read_sessions = previous
+        caching.clear_all()
+        for target in (primary, *replicas):
+            target.dispose()
+
+
+def test_reads_rotate_over_replicas_and_writers_read_the_primary(replicated):
+    client, sync = replicated
+    password = "S3curePass!"
+    signup(client, "replica-admin@example.com", password, is_admin=True)
+    admin_token = login(client, "replica-admin@example.com", password)
+    drop_id = create_drop(client, admin_token, claim_open_at=datetime.now(timezone.utc) + timedelta(hours=1))["id"]
+    signup(client, "replica-user@example.com", password)
+    headers = auth_headers(login(client, "replica-user@example.com", password))
+    sync(0)  # replica 1 has caught up with the drop, replica 2 lags behind
+
+    caching.clear_all()  # lift the admin's read-your-writes pin
+    admin = auth_headers(admin_token)
+    listed = sorted(len(client.get("/admin/drops", headers=admin).json()) for _ in range(2))
+    assert listed == [0, 1]
+
+    assert client.post(f"/drops/{drop_id}/join", headers=headers).json()["status"] == "joined"
+    # pinned to the primary right after the write, whatever replica is next
+    for _ in range(2):
+        assert client.get(f"/drops/{drop_id}/waitlist/me", headers=headers).json()["status"] == "waiting"
+
+    caching.clear_all()  # the pin expires: back on the lagging replicas
+    statuses = {client.get(f"/drops/{drop_id}/waitlist/me", headers=headers).json()["status"] for _ in range(2)}
+    assert statuses == {"not_registered"}
+
+
+def test_the_catalog_fills_from_the_primary_while_the_replicas_lag(replicated):
+    client, _ = replicated
+    signup(client, "catalog-admin@example.com", "S3curePass!", is_admin=True)
+    admin_token = login(client, "catalog-admin@example.com", "S3curePass!")
+    assert client.get("/drops").json() == []
+
+    # neither replica has seen the drop, and the anonymous readers were never pinned
+    drop_id = create_drop(client, admin_token)["id"]
+    for _ in range(2):
+        assert [drop["id"] for drop in client.get("/drops").json()] == [drop_id]
+        assert client.get(f"/drops/{drop_id}").status_code == 200
@@ -0,0 +1,31 @@
+from app import caching, responses
+from utils import auth_headers, create_drop, login, signup
+
+
+def test_fast_mode_serves_the_same_json_and_schema(client, monkeypatch):
+    password = "S3curePass!"
+    signup(client, "fast-admin@example.com", password, is_admin=True)
+    admin_token = login(client, "fast-admin@example.com", password)
+    drop_id = create_drop(client, admin_token, stock=2, description="fast")["id"]
+    signup(client, "fast-user@example.com", password)
+    headers = auth_headers(login(client, "fast-user@example.com", password))
+    assert client.post(f"/drops/{drop_id}/join", headers=headers).status_code == 200
+
+    def snapshot() -> dict:
+        caching.clear_all()
+        return {
+            "list": client.get("/drops").json(),
+            "detail": client.get(f"/drops/{drop_id}").json(),
+            "join": client.post(f"/drops/{drop_id}/join", headers=headers).json(),
+            "status": client.get(f"/drops/{drop_id}/waitlist/me", headers=headers).json(),
+            "openapi": client.get("/openapi.json").json(),
+        }
+
+    default = snapshot()
+    monkeypatch.setattr(responses, "enabled", lambda: True)
+    fast = snapshot()
+    assert fast == default
+
+    claim = client.post(f"/drops/{drop_id}/claim", headers=headers)
+    assert claim.headers["content-type"] == "application/json"
+    assert set(claim.json()) == {"claim_code", "claimed_at"}
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+# Runs in a fresh interpreter so nothing imported by the test session leaks in.
+_PROBE = r"""
+import json, os, sys, time
+
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+from app import database
+
+result = {
+    "import_ms": (imported - started) * 1000,
+    "engine_at_import": database.engine is not None,
+    "heavy_modules": sorted(m for m in ("jose", "passlib", "sqlalchemy.ext.asyncio") if m in sys.modules),
+}
+before = time.perf_counter()
+with TestClient(app.main.app):
+    result["startup_ms"] = (time.perf_counter() - before) * 1000
+    result["engine_after_startup"] = database.engine is not None
+result["db_file_created"] = os.path.exists(os.environ["PROBE_DB"])
+print(json.dumps(result))
+"""
+
+
+def test_import_and_startup_do_no_database_or_auth_work(tmp_path, record_property):
+    db_path = tmp_path / "never-created.db"
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "PROBE_DB": str(db_path),
+        "ENVIRONMENT": "production",
+        "DROP_SCHEDULER_ENABLED": "false",
+    }
+    env.pop("AUTO_CREATE_SCHEMA", None)
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    record_property("import_ms", round(result["import_ms"], 1))
+    record_property("startup_ms", round(result["startup_ms"], 1))
+    print(f"import app.main: {result['import_ms']:.0f} ms, lifespan startup: {result['startup_ms']:.0f} ms")
+
+    assert result["engine_at_import"] is False
+    assert result["heavy_modules"] == []
+    assert result["engine_after_startup"] is False
+    assert result["db_file_created"] is False
@@ -0,0 +1,146 @@
+import multiprocessing
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import Drop
+from app.services import allocation as allocation_service
+from app.services import stock_ledger
+from app.services.stock_ledger import SharedMemoryLedger
+from app.singleton import Singleton
+from utils import auth_headers, create_drop, login, signup
+
+
+@pytest.fixture()
+def shared_ledger(monkeypatch):
+    ledger = SharedMemoryLedger(f"dropspot-test-{uuid.uuid4().hex[:12]}", slots=64)
+    monkeypatch.setattr(stock_ledger, "_ledger", Singleton(lambda: ledger, close=SharedMemoryLedger.close))
+    yield ledger
+    ledger.unlink()
+
+
+def _sell_out(segment: str, drop_id: uuid.UUID) -> None:
+    worker = SharedMemoryLedger(segment)
+    worker.observe(drop_id, 0)
+    worker.close()
+
+
+def test_shared_memory_ledger_is_visible_across_processes(shared_ledger):
+    drop_id = uuid.uuid4()
+    assert shared_ledger.remaining(drop_id) is None
+    shared_ledger.observe(drop_id, 5)
+    shared_ledger.observe(drop_id, 7)  # stale, larger counts never raise it
+    assert shared_ledger.remaining(drop_id) == 5
+
+    worker = multiprocessing.get_context("fork").Process(target=_sell_out, args=(shared_ledger._shm.name, drop_id))
+    worker.start()
+    worker.join(10)
+    assert worker.exitcode == 0
+    assert shared_ledger.remaining(drop_id) == 0
+
+    shared_ledger.forget(drop_id)
+    assert shared_ledger.remaining(drop_id) is None
+
+
+def test_sold_out_claims_are_rejected_without_the_allocation_lookup(client, db_engine, shared_ledger):
+    password = "S3curePass!"
+    signup(client, "ledger-admin@example.com", password, is_admin=True)
+    admin_headers = auth_headers(login(client, "ledger-admin@example.com", password))
+    drop_id = create_drop(client, admin_headers["Authorization"].split()[1], stock=1)["id"]
+    users = []
+    for name in ("ledger-a", "ledger-b"):
+        signup(client, f"{name}@example.com", password)
+        users.append(auth_headers(login(client, f"{name}@example.com", password)))
+        assert client.post(f"/drops/{drop_id}/join", headers=users[-1]).status_code == 200
+
+    results = [client.post(f"/drops/{drop_id}/claim", headers=headers) for headers in users]
+    assert sorted(r.status_code for r in results) == [200, 409]
+    won = [r.status_code for r in results].index(200)
+    winner, loser = users[won], users[1 - won]
+    assert shared_ledger.remaining(uuid.UUID(drop_id)) == 0
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(db_engine, "before_cursor_execute", listener)
+    try:
+        assert client.post(f"/drops/{drop_id}/claim", headers=loser).status_code == 409
+        repeat = client.post(f"/drops/{drop_id}/claim", headers=winner)
+    finally:
+        event.remove(db_engine, "before_cursor_execute", listener)
+    assert repeat.status_code == 200
+    assert repeat.json()["claim_code"] == results[won].json()["claim_code"]
+    assert not [s for s in statements if "drop_allocations" in s or s.lstrip().upper().startswith("UPDATE")]
+
+    # a restock makes the ledger ask the database again
+    assert client.put(f"/admin/drops/{drop_id}", json={"stock": 2}, headers=admin_headers).status_code == 200
+    assert shared_ledger.remaining(uuid.UUID(drop_id)) is None
+    assert client.post(f"/drops/{drop_id}/claim", headers=loser).status_code == 200
+    assert shared_ledger.remaining(uuid.UUID(drop_id)) == 0
+
+
+def test_forget_voids_observations_made_before_an_edit(shared_ledger):
+    drop_id = uuid.uuid4()
+    _, generation = shared_ledger.state(drop_id)
+    shared_ledger.forget(drop_id)  # an admin edit lands while a claim is in flight
+    shared_ledger.observe(drop_id, 0, generation)
+    assert shared_ledger.remaining(drop_id) is None
+
+    _, generation = shared_ledger.state(drop_id)
+    shared_ledger.observe(drop_id, 0, generation)
+    assert shared_ledger.remaining(drop_id) == 0
+
+
+def test_restock_during_a_claim_does_not_leave_the_drop_sold_out(client, db_session, shared_ledger, monkeypatch):
+    password = "S3curePass!"
+    signup(client, "restock-admin@example.com", password, is_admin=True)
+    admin_headers = auth_headers(login(client, "restock-admin@example.com", password))
+    drop_id = create_drop(client, admin_headers["Authorization"].split()[1], stock=1)["id"]
+    users = []
+    for name in ("restock-a", "restock-b"):
+        signup(client, f"{name}@example.com", password)
+        users.append(auth_headers(login(client, f"{name}@example.com", password)))
+        assert client.post(f"/drops/{drop_id}/join", headers=users[-1]).status_code == 200
+    eligible = [client.get(f"/drops/{drop_id}/waitlist/me", headers=h).json()["eligible"] for h in users]
+    winner, runner_up = users if eligible[0] else users[::-1]
+
+    observe = shared_ledger.observe
+
+    def restock_then_observe(observed_id, remaining, generation=None):
+        # the claim committed the last unit; an admin raises the stock (and forgets the
+        # drop) before the claim gets to record remaining == 0
+        monkeypatch.setattr(shared_ledger, "observe", observe)
+        drop = db_session.get(Drop, observed_id)
+        drop.stock = 2
+        allocation_service.apply_drop_update(db_session, drop, {"stock"})
+        db_session.commit()
+        shared_ledger.forget(observed_id)
+        observe(observed_id, remaining, generation)
+
+    monkeypatch.setattr(shared_ledger, "observe", restock_then_observe)
+    assert client.post(f"/drops/{drop_id}/claim", headers=winner).status_code == 200
+    assert shared_ledger.remaining(uuid.UUID(drop_id)) is None
+    claim = client.post(f"/drops/{drop_id}/claim", headers=runner_up)
+    assert claim.status_code == 200, claim.text
+
+
+def test_reconcile_leaves_a_drop_forgotten_while_it_ran_unknown(shared_ledger, db_session):
+    now = datetime.now(timezone.utc)
+    drop = Drop(
+        title="Restocked", stock=1, waitlist_open_at=now, claim_open_at=now, claim_close_at=now + timedelta(hours=1)
+    )
+    db_session.add(drop)
+    db_session.flush()
+    connection = db_session.connection()
+
+    def restock_during_query(*args):
+        shared_ledger.forget(drop.id)  # an admin edits the stock while a worker starts up
+
+    event.listen(connection, "before_cursor_execute", restock_during_query, once=True)
+    assert shared_ledger.reconcile(lambda: Session(bind=connection)) == 1
+    assert shared_ledger.remaining(drop.id) is None
+
+    assert shared_ledger.reconcile(lambda: Session(bind=connection)) == 1
+    assert shared_ledger.remaining(drop.id) == 1
@@ -72,3 +72,39 @@ def test_waitlist_claim_idempotency(client):
     denied_claim = client.post(f"/drops/{drop_id}/claim", headers=_auth_headers(other_token))
     assert denied_claim.status_code == 409
     assert "No remaining" in denied_claim.text
+
+
+def test_claim_counter_never_oversells_after_leave(client):
+    password = "S3curePass!"
+    _signup(client, "admin2@example.com", password, is_admin=True)
+    admin_token = _login(client, "admin2@example.com", password)
+
+    now = datetime.now(timezone.utc)
+    payload = {
+        "title": "Single Unit Drop",
+        "stock": 1,
+        "waitlist_open_at": _iso(now - timedelta(hours=1)),
+        "claim_open_at": _iso(now - timedelta(minutes=5)),
+        "claim_close_at": _iso(now + timedelta(hours=1)),
+    }
+    drop_id = client.post("/admin/drops", json=payload, headers=_auth_headers(admin_token)).json()["id"]
+
+    tokens = []
+    for email in ("first@example.com", "second@example.com"):
+        _signup(client, email, password)
+        token = _login(client, email, password)
+        assert client.post(f"/drops/{drop_id}/join", headers=_auth_headers(token)).status_code == 200
+        tokens.append(token)
+
+    winner, runner_up = tokens
+    # whoever ranks first claims and then leaves, promoting the other user to rank 0
+    first_claim = client.post(f"/drops/{drop_id}/claim", headers=_auth_headers(winner))
+    if first_claim.status_code == 409:
+        winner, runner_up = runner_up, winner
+        first_claim = client.post(f"/drops/{drop_id}/claim", headers=_auth_headers(winner))
+    assert first_claim.status_code == 200, first_claim.text
+    assert client.post(f"/drops/{drop_id}/leave", headers=_auth_headers(winner)).json()["status"] == "left"
+
+    promoted_claim = client.post(f"/drops/{drop_id}/claim", headers=_auth_headers(runner_up))
+    assert promoted_claim.status_code == 409
+    assert "No remaining" in promoted_claim.text
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta, timezone
+
+
+def iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def signup(client, email: str, password: str, is_admin: bool = False):
+    payload = {"email": email, "password": password, "is_admin": is_admin}
+    response = client.post("/auth/signup", json=payload)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def login(client, email: str, password: str) -> str:
+    response = client.post("/auth/login", data={"username": email, "password": password})
+    assert response.status_code == 200, response.text
+    return response.json()["access_token"]
+
+
+def auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def create_drop(client, admin_token: str, **overrides) -> dict:
+    now = datetime.now(timezone.utc)
+    payload = {
+        "title": "Test Drop",
+        "stock": 1,
+        "waitlist_open_at": iso(now - timedelta(hours=1)),
+        "claim_open_at": iso(now - timedelta(minutes=5)),
+        "claim_close_at": iso(now + timedelta(hours=1)),
+    }
+    payload.update({key: iso(value) if isinstance(value, datetime) else value for key, value in overrides.items()})
+    response = client.post("/admin/drops", json=payload, headers=auth_headers(admin_token))
+    assert response.status_code == 201, response.text
+    return response.json()